@@ -20,10 +20,10 @@ from datetime import datetime
 from typing import Optional, Tuple
 from uuid import UUID
 
-from fastapi import Depends, FastAPI, File, Query, UploadFile
+from fastapi import Depends, FastAPI, File, Header, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.requests import Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import ValidationError
 from redis import Redis
 from sqlalchemy import Engine
@@ -55,7 +55,7 @@ from app.utils.exc import (
 )
 
 from ..libs import device_parameters as props_lib
-from ..libs.queues.dtos import Job, JobStatus, QueueContext
+from ..libs.queues.dtos import Job, JobResult, JobStatus, QueueContext
 from ..services.booking import get_user
 from ..services.scheduler.dtos import RecalibrationInfo
 from ..services.scheduler.queues import QueuePool
@@ -67,6 +67,7 @@ from ..utils.api import (
     TokenResponse,
     encrypt_mss_jwt_token,
     get_request_logs_store,
+    parse_fields,
     to_http_error,
 )
 from ..utils.redis_store import ItemNotFoundError
@@ -89,6 +90,8 @@ from .dependencies import (
     validate_job_file,
 )
 
+_NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 # application
 app = FastAPI(
     title="Backend Control Computer",
@@ -482,6 +485,7 @@ async def view_bookings_config() -> BookingsConfig:
 
 @app.post("/jobs")
 async def submit_job(
+    request: Request,
     context: QueueContext = Depends(get_cached_queue_context),
     upload_file: Annotated[UploadFile, Depends(validate_job_file)] = File(...),
     token_claims: MSSTokenClaims = Depends(get_mss_token_claims_dep(job_exists=False)),
@@ -491,6 +495,7 @@ async def submit_job(
     """Receives quantum jobs to process. This can be done by any IP address
 
     Args:
+        request: the FastAPI request object
         upload_file: the quantum job file uploaded
         token_claims: the user_id and job_id associated with this request
         queue_pool: the collection of queues to run the jobs on
@@ -508,6 +513,55 @@ async def submit_job(
         queues=queue_pool,
         upload_file=upload_file,
         credentials=token_claims,
+        job_file_hash=request.state.job_file_hash,
+    )
+
+
+@app.get("/jobs/events")
+async def stream_job_events(
+    request: Request,
+    context: QueueContext = Depends(get_cached_queue_context),
+    user_id: str = Depends(get_verified_mss_user_id),
+    job_id: Optional[str] = Query(default=None),
+    after: Optional[str] = Query(default=None),
+    last_event_id: Optional[str] = Header(default=None),
+) -> StreamingResponse:
+    """Streams the changes in the statuses and stages of the current user's jobs as server-sent events
+
+    Each event has the id of the event in the job events stream, so clients can resume
+    after the last event they received via the Last-Event-ID header or the after param.
+
+    Args:
+        request: the HTTP request
+        context: the queue context for the jobs in the queue
+        user_id: the unique identifier of the currently logged in user
+        job_id: the job whose events are to be streamed; default = None i.e. all the user's jobs
+        after: the id of the event after which to resume; default = None i.e. only new events
+        last_event_id: the Last-Event-ID header sent by server-sent event clients on reconnecting
+
+    Returns:
+        the stream of server-sent events
+    """
+    batches = scheduler.iter_job_events(
+        context, user_id=user_id, job_id=job_id, after=after or last_event_id
+    )
+
+    async def to_server_sent_events():
+        async for events in batches:
+            if await request.is_disconnected():
+                break
+
+            if len(events) == 0:
+                yield ": keep-alive\n\n"
+
+            for event in events:
+                data = event.model_dump_json(exclude={"event_id"}, exclude_none=True)
+                yield f"id: {event.event_id}\nevent: job\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        to_server_sent_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
     )
 
 
@@ -534,6 +588,29 @@ async def view_job(
     )
 
 
+@app.get("/jobs/{job_id}/result")
+async def view_job_result(
+    job_id: str,
+    user_id: str = Depends(get_verified_mss_user_id),
+    is_mss_admin: bool = Depends(get_unverified_mss_is_admin),
+    context: QueueContext = Depends(get_cached_queue_context),
+) -> JobResult:
+    """View the results of the job of given job_id if job belongs to current user or if user is admin
+
+    Args:
+        context: the queue context for the job in the queue
+        job_id: the unique identifier of the job
+        user_id: the user_id as provided by MSS
+        is_mss_admin: whether the user is an mss admin or not
+
+    Returns:
+        the results of the job of the given job_id
+    """
+    return scheduler.get_job_result(
+        context, job_id=job_id, user_id=user_id, is_mss_admin=is_mss_admin
+    )
+
+
 @app.post("/jobs/{job_id}/cancel")
 async def cancel_job(
     job_id: str,
@@ -605,29 +682,57 @@ async def remove_job(
 
 @app.get("/jobs")
 async def view_jobs(
+    request: Request,
     context: QueueContext = Depends(get_cached_queue_context),
     user_id: str = Depends(get_verified_mss_user_id),
     status: Optional[JobStatus] = Query(default=None),
     skip: int = Query(default=0),
     limit: Optional[int] = Query(default=None),
-) -> dict:
-    """Views all jobs that belong to the current user
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+):
+    """Views all jobs that belong to the current user, newest first
+
+    If the request accepts "application/x-ndjson", the jobs are streamed
+    one JSON object per line as they are read from the store.
 
     Args:
+        request: the HTTP request
         context: the queue context for the jobs in the queue
         user_id: the unique identifier of the currently logged in user
         status: the status of the jobs to return; default = None, i.e. all statuses
         skip: number of records to ignore at the top of the returned results; default is 0
         limit: maximum number of records to return; default is None.
+        cursor: the next_cursor returned with the previous page; default is None i.e. the top
+        fields: the comma-separated fields of the jobs to return; default is None i.e. all fields
 
     Returns:
-        the paginated list of the available bookings
+        the paginated list of the jobs, with the next_cursor if there are more pages
     """
-    data = scheduler.get_many_jobs(
-        context, user_id=user_id, status=status, skip=skip, limit=limit
+    include = parse_fields(fields, model=Job)
+
+    if _NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        jobs = scheduler.iter_jobs(
+            context,
+            user_id=user_id,
+            status=status,
+            cursor=cursor,
+            skip=skip,
+            limit=limit,
+        )
+        lines = (
+            f"{job.model_dump_json(include=include, exclude_none=True)}\n"
+            for job in jobs
+        )
+        return StreamingResponse(lines, media_type=_NDJSON_MEDIA_TYPE)
+
+    data, next_cursor = scheduler.get_jobs_page(
+        context, user_id=user_id, status=status, cursor=cursor, skip=skip, limit=limit
+    )
+    results = PaginatedListResponse[Job](
+        skip=skip, limit=limit, data=data, next_cursor=next_cursor
     )
-    results = PaginatedListResponse[Job](skip=skip, limit=limit, data=data)
-    return results.model_dump(mode="json")
+    return results.model_dump(mode="json", include=include)
 
 
 @app.post("/recalibration/init", dependencies=[Depends(get_verified_mss_admin_user_id)])
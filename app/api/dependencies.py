@@ -34,14 +34,21 @@ from ..libs.quantum_executor.base.executor import QuantumExecutor
 from ..libs.queues.dtos import ExecutorOptions, JobFile, QueueContext
 from ..services.booking.models import MSSTokenClaims
 from ..services.booking.service import get_user_job_id_pair_from_token
-from ..services.booking.store import get_bookings_sql_engine
+from ..services.booking.store import (
+    get_bookings_sql_engine,
+    init_bookings_sql_engine,
+)
 from ..services.external.mss.service import AsyncMssClientPipe, connect_to_mss
 from ..services.scheduler import get_job, init_recalibration, stop_recalibration
 from ..services.scheduler.queues import QueuePool
 from ..services.scheduler.utils import (
     init_executor,
 )
-from ..utils.api import get_request_logs_store, verify_mss_signature
+from ..utils.api import (
+    get_request_logs_store,
+    read_uploaded_file_with_hash,
+    verify_mss_signature,
+)
 from ..utils.datetime import get_utc_now
 from ..utils.exc import (
     ConflictError,
@@ -65,7 +72,7 @@ async def lifespan(app: FastAPI):
     """Handles functions to run before and after the application"""
     global DB_ENGINE, QUEUE_POOL, QUEUE_CONTEXT, _REDIS_CONNECTION
 
-    DB_ENGINE = get_bookings_sql_engine(settings.BOOKING_DB_URL)
+    DB_ENGINE = init_bookings_sql_engine(settings.BOOKING_DB_URL)
     QUEUE_POOL = QueuePool.from_settings()
     executor, executor_options = _get_executor_and_options(
         executor_type=settings.EXECUTOR_TYPE,
@@ -214,11 +221,16 @@ async def get_job_id_from_uploaded_file(
         InvalidJobIdInUploadedFileError: f"The job does not have a valid UUID4 {job_id_field}"
     """
     try:
-        form = await request.form()
-        upload_file: UploadFile = form["upload_file"]
-        job_dict = json.load(upload_file.file)
+        # the job file is already parsed if it was validated by validate_job_file
+        job_file: Optional[JobFile] = getattr(request.state, "job_file", None)
+        if hasattr(job_file, job_id_field):
+            job_id = getattr(job_file, job_id_field)
+        else:
+            form = await request.form()
+            upload_file: UploadFile = form["upload_file"]
+            job_dict = json.load(upload_file.file)
+            job_id = job_dict[job_id_field]
 
-        job_id = job_dict[job_id_field]
         if validate_uuid4_str(job_id):
             return job_id
     except KeyError:
@@ -383,23 +395,25 @@ def get_mss_token_claims_dep(
     return dependency_injector
 
 
-async def validate_job_file(upload_file: UploadFile) -> UploadFile:
+async def validate_job_file(request: Request, upload_file: UploadFile) -> UploadFile:
     """Validates a job file input and returns the original upload file
 
     Validations:
     - Follows the JobFile structure
 
+    The validated job file and the SHA-256 digest of its contents, computed while
+    it is read, are kept on the request state so that neither the other dependencies
+    of the request nor the preprocessing of the job parse or hash the file again.
+
     Args:
+        request: the FastAPI request object
         upload_file: the UploadFile instance that is uploaded
     """
     try:
-        upload_file.file.seek(0)
-        content = await upload_file.read()
-
-        JobFile.model_validate_json(content)
+        content, content_hash = read_uploaded_file_with_hash(upload_file)
 
-        # optional: reset stream for reuse
-        upload_file.file.seek(0)
+        request.state.job_file = JobFile.model_validate_json(content)
+        request.state.job_file_hash = content_hash
         return upload_file
     except (ValidationError, KeyError, TypeError) as exp:
         raise HTTPException(
@@ -19,6 +19,7 @@
 # - Stefan Hill, 2024
 # - Adilet Tuleuov, 2025
 #
+import asyncio
 from typing import TYPE_CHECKING
 
 from redis import Redis
@@ -179,10 +180,11 @@ async def send_device_params_to_mss(
         data=calibration_info,
     )
 
-    await mss_client_pipe.send_event(
-        initialization_event, error_prefix="error sending initialization info: "
-    )
-
-    await mss_client_pipe.send_event(
-        recalibration_event, error_prefix="error sending recalibration info: "
+    await asyncio.gather(
+        mss_client_pipe.send_event(
+            initialization_event, error_prefix="error sending initialization info: "
+        ),
+        mss_client_pipe.send_event(
+            recalibration_event, error_prefix="error sending recalibration info: "
+        ),
     )
@@ -672,6 +672,7 @@ class DeviceCalibration(Schema, CalibrationValueSet):
             coupler=scalars["couplers"],
             readout_resonator=scalars["resonators"],
             discriminators=self.discriminators,
+            last_calibrated=self.last_calibrated,
         )
 
         file_data = {
@@ -704,7 +705,7 @@ class DeviceCalibration(Schema, CalibrationValueSet):
             resonators=ResonatorCalibration.from_calib_config(calib_config),
             couplers=CouplerCalibration.from_calib_config(calib_config),
             discriminators=calib_config.discriminators,
-            last_calibrated=utc_now_str(),
+            last_calibrated=calib_config.last_calibrated or utc_now_str(),
         )
 
     @classmethod
@@ -852,6 +853,8 @@ class _BackendCalibrationConfig(BaseModel):
     readout_resonator: List[Dict[str, Union[float, str]]] = []
     discriminators: Dict[str, Dict[str, Dict[str, Union[float, str]]]] = {}
     coupler: List[Dict[str, Union[float, str]]] = []
+    # only set in the seed files written after a recalibration
+    last_calibrated: Optional[str] = None
 
 
 class BackendConfig(Schema):
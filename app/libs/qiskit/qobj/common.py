@@ -24,6 +24,7 @@
 # that they have been altered from the originals.
 
 """Module providing definitions of common Qobj classes."""
+import copyreg
 from types import SimpleNamespace
 
 
@@ -71,6 +72,14 @@ class QobjDictField(SimpleNamespace):
                 return True
         return False
 
+    def __reduce__(self):
+        """Pickles this object without calling __init__ on unpickling
+
+        SimpleNamespace otherwise unpickles by calling the class without args,
+        which fails for subclasses with required args e.g. PulseQobjConfig.
+        """
+        return copyreg.__newobj__, (self.__class__,), self.__dict__
+
 
 class QobjHeader(QobjDictField):
     """A class used to represent a dictionary header in Qobj objects."""
@@ -510,16 +510,17 @@ class PulseLibraryItem:
 
         Args:
             name (str): A name for the pulse.
-            samples (list[complex]): A list of complex values defining pulse
-                shape.
+            samples (list[complex] | list[list[float]] | numpy.ndarray): The complex
+                values, or [re, im] pairs, defining pulse shape. These are kept
+                as a contiguous complex128 array.
         """
         self.name = name
-        if isinstance(samples[0], list):
-            self.samples = numpy.array(
-                [complex(sample[0], sample[1]) for sample in samples]
-            )
-        else:
-            self.samples = samples
+        samples = numpy.asarray(samples)
+        if samples.ndim == 2:
+            # [[re, im], ...] -> [re + i*im, ...] by viewing each pair as a complex
+            samples = numpy.ascontiguousarray(samples, dtype=numpy.float64)
+            samples = samples.view(numpy.complex128)[:, 0]
+        self.samples = numpy.ascontiguousarray(samples, dtype=numpy.complex128)
 
     def to_dict(self):
         """Return a dictionary format representation of the pulse library item.
@@ -549,7 +550,9 @@ class PulseLibraryItem:
 
     def __eq__(self, other):
         if isinstance(other, PulseLibraryItem):
-            if self.to_dict() == other.to_dict():
+            if self.name == other.name and numpy.array_equal(
+                self.samples, other.samples
+            ):
                 return True
         return False
 
@@ -38,12 +38,12 @@ from .converters import utc_to_local
 def decode_pulse_qobj(pulse_qobj: Dict) -> None:
     """Decode a pulse Qobj.
 
+    The samples of the pulse library are left as they are since ``PulseLibraryItem``
+    converts them into complex arrays in one go.
+
     Args:
         pulse_qobj: Qobj to be decoded.
     """
-    for item in pulse_qobj["config"]["pulse_library"]:
-        _decode_pulse_library_item(item)
-
     for exp in pulse_qobj["experiments"]:
         for instr in exp["instructions"]:
             _decode_pulse_qobj_instr(instr)
@@ -12,30 +12,55 @@
 # that they have been altered from the originals.
 
 import abc
+import functools
+import json
+import multiprocessing
 import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from traceback import format_exc
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Type
 
+import h5py
 import numpy as np
 
 from app.libs.device_parameters import BackendConfig, DeviceCalibration
-from app.libs.qiskit.qobj import PulseQobj
+from app.libs.qiskit.qobj import PulseQobj, PulseQobjConfig, PulseQobjExperiment
+from app.libs.qiskit_providers.utils import json_decoder
+from app.libs.qiskit_providers.utils.json_encoder import IQXJsonEncoder
 from app.libs.quantum_executor.base.experiment import NativeExperiment
 from app.libs.quantum_executor.base.quantum_job import (
+    get_experiment_name,
     save_job_in_hdf5,
     to_native_qobj_config,
 )
 from app.libs.quantum_executor.base.quantum_job.dtos import NativeQobjConfig, QuantumJob
 from app.libs.quantum_executor.base.quantum_job.typing import QExperimentResult
+from app.libs.quantum_executor.utils.connections import ExecutorLease
 from app.libs.quantum_executor.utils.logger import ExperimentLogger
 from app.utils.compat import TUID, create_exp_folder, gen_tuid
-from settings import PREPROCESSED_JOB_POOL
+from settings import PREPROCESSED_JOB_POOL, PREPROCESSING_POOL_SIZE
+
+# the version of the layout of the HDF5 files of preprocessed jobs
+_PREPROCESSED_JOB_FORMAT_VERSION = 1
+
+# the process pools for translating experiments in parallel, by their sizes
+_PREPROCESSING_POOLS: Dict[int, ProcessPoolExecutor] = {}
 
 
 class QuantumExecutor(abc.ABC):
+    # the class of the native experiments got from _to_native_experiments()
+    native_experiment_cls: Type[NativeExperiment]
+    # the number of processes translating the experiments of a job in parallel
+    # during preprocessing; 0 or 1 translates them in the current process
+    preprocessing_pool_size: int = PREPROCESSING_POOL_SIZE
+
+    # the lease on the executor while experiments are run
+    _lease: Optional[ExecutorLease] = None
+
     def __init__(
         self,
         hardware_map: Optional[Dict[str, Tuple[str, str]]] = None,
@@ -60,6 +85,24 @@ class QuantumExecutor(abc.ABC):
         """
         pass
 
+    def _get_native_experiment_kwargs(
+        self, native_config: NativeQobjConfig, /
+    ) -> Optional[Dict[str, Any]]:
+        """Gets the extra key-word args of native_experiment_cls.from_qobj_expt()
+
+        These are all args other than the experiment, its name and the qobj config.
+        They are sent to other processes when translating experiments in parallel
+        so they should be picklable.
+
+        Args:
+            native_config: the native config for the qobj
+
+        Returns:
+            the key-word args or None if the experiments can only be translated
+            in the current process via _to_native_experiments()
+        """
+        return None
+
     @abc.abstractmethod
     def _run_native(
         self,
@@ -105,6 +148,47 @@ class QuantumExecutor(abc.ABC):
         """
         pass
 
+    def _run_native_experiments(
+        self,
+        experiments: List[NativeExperiment],
+        /,
+        *,
+        native_config: NativeQobjConfig,
+        logger: ExperimentLogger,
+    ) -> Dict[str, QExperimentResult]:
+        """Runs all the native experiments of a qobj, returning their results by name
+
+        By default, the experiments are run one after the other via _run_native().
+        Executors that can overlap the work done for different experiments
+        should override this.
+
+        Args:
+            experiments: the native experiments to run
+            native_config: native config for the qobj
+            logger: the logger for the given experiment which logs data in a specific folder
+
+        Returns:
+            dict of experiment name and the xarray.Dataset of results of that experiment
+        """
+        results = {}
+        for expt in experiments:
+            self._ensure_lease_held()
+            results[expt.header.name] = self._run_native(
+                expt, native_config=native_config, logger=logger
+            )
+        return results
+
+    def _ensure_lease_held(self):
+        """Checks, before the hardware is used, that the lease on the executor is still held
+
+        It does nothing if the experiments are run without a lease.
+
+        Raises:
+            ExecutorLeaseLostError: executor lease {token} lost
+        """
+        if self._lease is not None:
+            self._lease.ensure_held()
+
     def preprocess(
         self, qobj: PulseQobj, job_id: str, results_folder: Path = PREPROCESSED_JOB_POOL
     ) -> Tuple[float, str]:
@@ -116,7 +200,7 @@ class QuantumExecutor(abc.ABC):
             results_folder: the folder to store the experiment resulting files
 
         Returns:
-            tuple of the duration and the path to the pickle file containing the native experiments metadata
+            tuple of the duration and the path to the HDF5 file containing the native experiments metadata
         """
         tuid = gen_tuid()
         qobj_header = qobj.header.to_dict()
@@ -128,28 +212,31 @@ class QuantumExecutor(abc.ABC):
 
         try:
             # unwrap pulse library
+            pulse_library = qobj.config.pulse_library
             qobj.config.pulse_library = {
-                i.name: np.asarray(i.samples) for i in qobj.config.pulse_library
+                i.name: np.asarray(i.samples) for i in pulse_library
             }
 
             # translate qobj experiments to quantify schedules
             logger.info(f"Started compilation for job id: {job_id} at {datetime.now()}")
             native_config = to_native_qobj_config(qobj.config)
-            native_expts = self._to_native_experiments(qobj, native_config)
-            total_duration = sum([expt.duration for expt in native_expts])
+            native_expts = self._to_native_experiment_dicts(qobj, native_config)
+            total_duration = sum([expt["duration"] for expt in native_expts])
+            # the pulse library is saved as it was received i.e. as a list
+            qobj.config.pulse_library = pulse_library
 
             data = NativeExptMetadata(
                 native_config=native_config,
                 tuid=tuid,
                 qobj=qobj,
                 qobj_tag=qobj_tag,
+                native_expts=native_expts,
             )
 
             results_file_path = _get_preprocessed_expt_file(
                 job_id, folder=results_folder
             )
-            with open(results_file_path, "wb") as file:
-                pickle.dump(data.to_dict(), file)
+            data.to_hdf5(results_file_path)
 
             logger.info(f"Translated to {len(native_expts)} native experiments.")
             return total_duration, str(results_file_path)
@@ -158,28 +245,92 @@ class QuantumExecutor(abc.ABC):
             logger.error(f"\nFailed job: {job_id}, tuid: {tuid}\n{format_exc()}")
             raise e
 
+    def _to_native_experiment_dicts(
+        self, qobj: PulseQobj, native_config: NativeQobjConfig, /
+    ) -> List[dict]:
+        """Constructs native experiments from the PulseQobj instance, as got from NativeExperiment.to_dict()
+
+        If preprocessing_pool_size is more than 1 and the executor has
+        _get_native_experiment_kwargs(), the experiments are translated
+        in parallel in a pool of processes.
+
+        Args:
+            qobj: the Pulse qobject containing the experiments
+            native_config: the native config for the qobj
+
+        Returns:
+            list of the dicts of the native experiments
+        """
+        pool_size = self.preprocessing_pool_size
+        kwargs = self._get_native_experiment_kwargs(native_config)
+        expts_count = len(qobj.experiments)
+
+        if pool_size > 1 and kwargs is not None and expts_count > 1:
+            to_native_experiment_dict = functools.partial(
+                _to_native_experiment_dict,
+                self.native_experiment_cls,
+                qobj.config,
+                kwargs,
+            )
+            # a few chunks per process to spread experiments of uneven sizes
+            chunksize = max(1, expts_count // (pool_size * 4))
+            try:
+                return list(
+                    _get_preprocessing_pool(pool_size).map(
+                        to_native_experiment_dict,
+                        range(expts_count),
+                        qobj.experiments,
+                        chunksize=chunksize,
+                    )
+                )
+            except BrokenProcessPool:
+                # a worker process died; a new pool is created for the next job
+                _PREPROCESSING_POOLS.pop(pool_size, None)
+
+        return [
+            expt.to_dict() for expt in self._to_native_experiments(qobj, native_config)
+        ]
+
     @abc.abstractmethod
     def recalibrate(self, **kwargs) -> DeviceCalibration | None:
         """Recalibrates the executor"""
 
-    def run(self, job_id: str, inputs_folder: Path = PREPROCESSED_JOB_POOL) -> str:
+    def run(
+        self,
+        job_id: str,
+        inputs_folder: Path = PREPROCESSED_JOB_POOL,
+        lease: Optional[ExecutorLease] = None,
+    ) -> str:
         """Runs the experiments and returns the results file path
 
+        The executor is only connected to the hardware while the experiments are run,
+        and is disconnected afterwards even on errors.
+
         Args:
             job_id: the ID of the job
             inputs_folder: the path to the folder where the input files for this run can be found
+            lease: the lease on the executor held while running; if it is lost,
+                no more experiments are run
 
         Returns:
             the path to the results obtained after measurement
         """
         logger: Optional[ExperimentLogger] = None
+        self._lease = lease
         try:
             preprocessed_file = _get_preprocessed_expt_file(
                 job_id, folder=inputs_folder
             )
-            with open(preprocessed_file, "rb") as file:
-                expt_metadata_dict = pickle.load(file)
-                expt_metadata = NativeExptMetadata.from_dict(expt_metadata_dict)
+            if preprocessed_file.exists():
+                expt_metadata = NativeExptMetadata.from_hdf5(preprocessed_file)
+            else:
+                # pickle files written by older versions
+                preprocessed_file = _get_legacy_preprocessed_expt_file(
+                    job_id, folder=inputs_folder
+                )
+                with open(preprocessed_file, "rb") as file:
+                    expt_metadata_dict = pickle.load(file)
+                    expt_metadata = NativeExptMetadata.from_dict(expt_metadata_dict)
 
             tuid = expt_metadata.tuid
             qobj = expt_metadata.qobj
@@ -191,16 +342,23 @@ class QuantumExecutor(abc.ABC):
             logger.info(f"Starting job: {tuid}")
 
             logger.info(f"Running experiments for job id: {job_id}")
-
-            # we recompile these because pickling them seems to break the schedules
-            # FIXME: If compilation is expensive, removing this duplication is a good place to start
-            native_expts = self._to_native_experiments(qobj, native_config)
-            experiment_results = {
-                expt.header.name: self._run_native(
-                    expt, native_config=native_config, logger=logger
-                )
-                for expt in native_expts
-            }
+            if lease is not None:
+                logger.info(f"Executor lease token: {lease.token}")
+
+            if expt_metadata.native_expts is None:
+                # metadata files written before native experiments were persisted
+                native_expts = self._to_native_experiments(qobj, native_config)
+            else:
+                native_expts = [
+                    self.native_experiment_cls.from_dict(item, config=qobj.config)
+                    for item in expt_metadata.native_expts
+                ]
+
+            # the hardware is only connected to while the lease is held
+            self.connect()
+            experiment_results = self._run_native_experiments(
+                native_expts, native_config=native_config, logger=logger
+            )
 
             job = QuantumJob(
                 job_id=job_id,
@@ -212,6 +370,7 @@ class QuantumExecutor(abc.ABC):
                 memory_slot_size=qobj.config.memory_slot_size,
                 qobj=qobj,
                 raw_results=experiment_results,
+                result_format=native_config.result_format,
             )
 
             results_file_path = experiment_folder / f"{job_id}.hdf5"
@@ -229,9 +388,26 @@ class QuantumExecutor(abc.ABC):
                 # record exceptions
                 logger.error(f"\nFailed job: {job_id}\n{format_exc()}")
             raise e
+        finally:
+            try:
+                self.disconnect()
+            finally:
+                self._lease = None
 
         return str(results_file_path)
 
+    def connect(self):
+        """Connects to the hardware that runs the experiments
+
+        Executors without any hardware e.g. simulators do nothing.
+        """
+
+    def disconnect(self):
+        """Disconnects from the hardware that runs the experiments, if connected
+
+        Executors without any hardware e.g. simulators do nothing.
+        """
+
     @abc.abstractmethod
     def close(self):
         pass
@@ -248,12 +424,21 @@ class NativeExptMetadata:
     """Metadata on the experiments
 
     This is passed between processes doing preprocessing and those doing execution
+    so that the execution process does not have to recompile the experiments.
+
+    Attributes:
+        native_config: the native config for the qobj
+        tuid: the unique identifier of the experiment folder
+        qobj: the original Qobject
+        qobj_tag: the tag of the Qobject
+        native_expts: the serialized native experiments as got from NativeExperiment.to_dict()
     """
 
     native_config: NativeQobjConfig
     tuid: TUID
     qobj: PulseQobj
     qobj_tag: str
+    native_expts: Optional[List[dict]] = None
 
     def to_dict(self) -> dict:
         """Converts this experiment metadata to JSON serializable dict"""
@@ -262,6 +447,7 @@ class NativeExptMetadata:
             "qobj": self.qobj.to_dict(),
             "native_config": self.native_config.to_dict(),
             "qobj_tag": self.qobj_tag,
+            "native_expts": self.native_expts,
         }
 
     @classmethod
@@ -281,12 +467,100 @@ class NativeExptMetadata:
         }
         return cls(**kwargs)
 
+    def to_hdf5(self, file: Path):
+        """Saves this experiment metadata to an HDF5 file
+
+        The samples of the pulse library are saved as raw complex arrays,
+        the rest of the qobj and the native config as JSON and the native
+        experiments as a pickled blob.
+
+        Args:
+            file: the path to the file where the metadata is to be saved
+        """
+        qobj_dict = self.qobj.to_dict()
+        qobj_dict["config"]["pulse_library"] = []
+
+        with h5py.File(file, mode="w") as hdf5_file:
+            hdf5_file.attrs["format_version"] = _PREPROCESSED_JOB_FORMAT_VERSION
+            hdf5_file.attrs["tuid"] = str(self.tuid)
+            hdf5_file.attrs["qobj_tag"] = self.qobj_tag
+            hdf5_file.attrs["qobj"] = json.dumps(qobj_dict, cls=IQXJsonEncoder)
+            hdf5_file.attrs["native_config"] = json.dumps(self.native_config.to_dict())
+
+            pulse_library = hdf5_file.create_group("pulse_library")
+            for index, item in enumerate(self.qobj.config.pulse_library):
+                # datasets are named by index to keep the order of the pulse library
+                dataset = pulse_library.create_dataset(
+                    str(index), data=np.asarray(item.samples, dtype=np.complex128)
+                )
+                dataset.attrs["name"] = item.name
+
+            if self.native_expts is not None:
+                blob = pickle.dumps(self.native_expts)
+                hdf5_file.create_dataset(
+                    "native_expts", data=np.frombuffer(blob, dtype=np.uint8)
+                )
+
+    @classmethod
+    def from_hdf5(cls, file: Path) -> "NativeExptMetadata":
+        """Loads an instance of this class from an HDF5 file got from to_hdf5()
+
+        The samples of the pulse library are memory-mapped from the file.
+
+        Args:
+            file: the path to the HDF5 file
+
+        Returns:
+            the instance of this class
+        """
+        with h5py.File(file, mode="r") as hdf5_file:
+            qobj_dict = json.loads(hdf5_file.attrs["qobj"])
+            json_decoder.decode_pulse_qobj(qobj_dict)
+
+            datasets = sorted(
+                hdf5_file["pulse_library"].values(),
+                key=lambda dataset: int(dataset.name.rsplit("/", 1)[-1]),
+            )
+            qobj_dict["config"]["pulse_library"] = [
+                {"name": dataset.attrs["name"], "samples": _read_samples(file, dataset)}
+                for dataset in datasets
+            ]
+
+            native_expts = None
+            if "native_expts" in hdf5_file:
+                native_expts = pickle.loads(hdf5_file["native_expts"][()].tobytes())
+
+            return cls(
+                native_config=NativeQobjConfig.from_dict(
+                    json.loads(hdf5_file.attrs["native_config"])
+                ),
+                tuid=TUID(hdf5_file.attrs["tuid"]),
+                qobj=PulseQobj.from_dict(qobj_dict),
+                qobj_tag=hdf5_file.attrs["qobj_tag"],
+                native_expts=native_expts,
+            )
+
 
 def _get_preprocessed_expt_file(
     job_id: str, folder: Path = PREPROCESSED_JOB_POOL
 ) -> Path:
     """Gets the path to the file containing the preprocessed experiments
 
+    Args:
+        job_id: the unique identifier of the job
+        folder: the folder containing the preprocessed experiment files
+
+    Returns:
+        the path to the file
+    """
+    return folder / f"{job_id}-expt-metadata.hdf5"
+
+
+def _get_legacy_preprocessed_expt_file(
+    job_id: str, folder: Path = PREPROCESSED_JOB_POOL
+) -> Path:
+    """Gets the path to the pickle file of preprocessed experiments written by older versions
+
     Args:
         job_id: the unique identifier of the job
         folder: the folder containing the preprocessed experiment files
@@ -295,3 +569,77 @@ def _get_preprocessed_expt_file(
         the path to the file
     """
     return folder / f"{job_id}-expt-metadata.json"
+
+
+def _get_preprocessing_pool(size: int) -> ProcessPoolExecutor:
+    """Gets the process pool of the given size for translating experiments, creating it if need be
+
+    The pools are kept for the lifetime of the current process so that
+    the worker processes do not have to import the executor libraries for every job.
+
+    Args:
+        size: the number of processes in the pool
+
+    Returns:
+        the process pool
+    """
+    try:
+        return _PREPROCESSING_POOLS[size]
+    except KeyError:
+        # forkserver avoids forking the threads of the current process e.g. of redis connections
+        pool = ProcessPoolExecutor(
+            max_workers=size, mp_context=multiprocessing.get_context("forkserver")
+        )
+        _PREPROCESSING_POOLS[size] = pool
+        return pool
+
+
+def _to_native_experiment_dict(
+    native_experiment_cls: Type[NativeExperiment],
+    qobj_config: PulseQobjConfig,
+    kwargs: Dict[str, Any],
+    index: int,
+    expt: PulseQobjExperiment,
+) -> dict:
+    """Translates one experiment of a qobj into the dict of its native experiment
+
+    This runs in the worker processes of the preprocessing pool.
+
+    Args:
+        native_experiment_cls: the class of the native experiment
+        qobj_config: the config of the qobj
+        kwargs: the extra key-word args of native_experiment_cls.from_qobj_expt()
+        index: the index of the experiment in the qobj
+        expt: the experiment to translate
+
+    Returns:
+        the dict of the native experiment as got from NativeExperiment.to_dict()
+    """
+    experiment = native_experiment_cls.from_qobj_expt(
+        name=get_experiment_name(expt.header.name, index + 1),
+        expt=expt,
+        qobj_config=qobj_config,
+        **kwargs,
+    )
+    return experiment.to_dict()
+
+
+def _read_samples(file: Path, dataset: h5py.Dataset) -> np.ndarray:
+    """Reads the samples in the given dataset, memory-mapping them if possible
+
+    Only non-empty datasets that are stored contiguously in the file can be memory-mapped.
+
+    Args:
+        file: the path to the HDF5 file containing the dataset
+        dataset: the dataset of the samples
+
+    Returns:
+        the array of the samples
+    """
+    offset = dataset.id.get_offset()
+    if offset is None or dataset.size == 0:
+        return dataset[()]
+
+    return np.memmap(
+        file, mode="r", dtype=dataset.dtype, shape=dataset.shape, offset=offset
+    )
@@ -16,7 +16,7 @@
 import abc
 import copy
 from dataclasses import dataclass
-from typing import Generic, TypeVar
+from typing import Any, Generic, Self, TypeVar
 
 from app.libs.qiskit.qobj import PulseQobjConfig, QobjExperimentHeader
 
@@ -39,6 +39,65 @@ class NativeExperiment(abc.ABC, Generic[T]):
     schedule: T
     duration: float
 
+    def to_dict(self) -> dict:
+        """Converts this experiment into a dict that can be safely pickled
+
+        The schedule is serialized using the native library's own serializer
+        because pickling the schedule objects directly breaks them.
+        The config is left out since it is shared by all experiments in the qobj.
+
+        Returns:
+            the dict representation of this experiment
+        """
+        return {
+            "header": self.header.to_dict(),
+            "schedule": self._dump_schedule(self.schedule),
+            "duration": self.duration,
+        }
+
+    @classmethod
+    def from_dict(cls, value: dict, *, config: PulseQobjConfig) -> Self:
+        """Gets an instance of this class from a dict got from to_dict()
+
+        Args:
+            value: the dict to be converted
+            config: the Qobject config for this experiment
+
+        Returns:
+            the instance of this class
+        """
+        kwargs = {
+            **value,
+            "header": QobjExperimentHeader.from_dict(value["header"]),
+            "schedule": cls._load_schedule(value["schedule"]),
+            "config": config,
+        }
+        return cls(**kwargs)
+
+    @staticmethod
+    @abc.abstractmethod
+    def _dump_schedule(schedule: T) -> Any:
+        """Serializes the schedule into a value that can be pickled
+
+        Args:
+            schedule: the native schedule to serialize
+
+        Returns:
+            the serialized schedule
+        """
+
+    @staticmethod
+    @abc.abstractmethod
+    def _load_schedule(value: Any) -> T:
+        """Deserializes the schedule from the value got from _dump_schedule()
+
+        Args:
+            value: the serialized schedule
+
+        Returns:
+            the native schedule
+        """
+
 
 def copy_expt_header_with(header: QobjExperimentHeader, **kwargs):
     """Copies a new header from the old header with new kwargs set
@@ -19,6 +19,8 @@ from pathlib import Path
 from typing import (
     Any,
     Callable,
+    Dict,
+    Iterator,
     List,
     Literal,
     Match,
@@ -52,6 +54,7 @@ from .dtos import (
     QobjMetadata,
     QobjSweepData,
     QuantumJob,
+    ResultFormat,
     SweepParamMetadata,
 )
 from .typing import (
@@ -64,13 +67,19 @@ from .typing import (
 
 T = TypeVar("T")
 
-IQPoint: TypeAlias = Tuple[float, float]  # [re, im]  (len = 2)
+IQPoint: TypeAlias = Tuple[float, float] | List[float]  # [re, im]  (len = 2)
 IQMemory: TypeAlias = List[List[List[IQPoint]]]  # exp → shot → IQ points
 HexMatrix = List[List[str]]
+HexCounts = List[Dict[str, int]]  # exp → hex string → number of shots
+BatchDiscriminator: TypeAlias = Callable[
+    [List[int], npt.NDArray[np.complexfloating]], npt.NDArray[np.int_]
+]
 AcqParams = namedtuple("AcqParams", "qubits memory_slots")
 
 
 _KEY_DELIMITER = "~"
+# the maximum register value for which counts are computed with np.bincount
+_MAX_BINCOUNT_LENGTH = 2**16
 _HDF5_JOB_RESULTS_PATH_REGEX = re.compile(
     rf"experiments/(.*)/slot{_KEY_DELIMITER}(\d+)/measurement"
 )
@@ -108,6 +117,9 @@ def read_job_from_hdf5(file: Path) -> QuantumJob:
         meas_level = MeasLvl(hdf5_file.attrs["meas_level"])
         meas_return_cols = hdf5_file.attrs["meas_return_cols"]
         n_qubits = hdf5_file.attrs["n_qubits"]
+        result_format = ResultFormat(
+            hdf5_file.attrs.get("result_format", ResultFormat.MEMORY.value)
+        )
         job_id = hdf5_file.attrs.get("job_id")
         local = hdf5_file.attrs.get("local")
         raw_results = _extract_results_from_hdf5(hdf5_file)
@@ -131,6 +143,7 @@ def read_job_from_hdf5(file: Path) -> QuantumJob:
         metadata=metadata,
         job_id=job_id,
         qobj=qobj,
+        result_format=result_format,
     )
 
 
@@ -150,6 +163,7 @@ def save_job_in_hdf5(job: QuantumJob, file: Path):
         hdf5_file.attrs["memory_slot_size"] = job.memory_slot_size
         hdf5_file.attrs["job_id"] = job.job_id
         hdf5_file.attrs["local"] = job.local
+        hdf5_file.attrs["result_format"] = job.result_format.value
 
         header_dict = job.qobj.header.to_dict()
         _save_qobj_header_to_hdf5(hdf5_file, header_dict=header_dict)
@@ -281,41 +295,54 @@ def _parse_exp_index_from_name(expt_name: str, delimiter: str = "~") -> Optional
 
 def discriminate_results(
     job: QuantumJob,
-    discriminator: Callable[[int, npt.NDArray[np.complexfloating]], int],
+    discriminator: Optional[
+        Callable[[int, npt.NDArray[np.complexfloating]], int]
+    ] = None,
     *,
+    batch_discriminator: Optional[BatchDiscriminator] = None,
     num_of_states: Union[Literal[2], Literal[3]] = 2,
     byteorder: ByteOrder = ByteOrder.LITTLE_ENDIAN,
     calibration: DeviceCalibration = None,
+    output: Literal["memory", "counts"] = "memory",
     **kwargs,
-) -> HexMatrix:
+) -> Union[HexMatrix, HexCounts]:
     """
     Convert raw IQ data in `job.raw_results` into hexadecimal read-outs.
 
     Steps:
     1. Extract `acquire` mappings (qubit -> classical slot once per experiment)
-    2. For every acquisition channel, run the supplied `discriminator` to obtain discriminated 0/1/2 int per shot
+    2. Stack the IQ points of all acquisition channels of the experiment into a
+       (channels x shots) matrix and discriminate them to 0/1/2 ints, either in one call
+       to `batch_discriminator` or per channel with `discriminator`
     3. Pack the values into a register-shaped array (`c_reg_length` x `shots`), respecting qubit->slot map
-    4. Convert each register state (row) to a hex string
+    4. Convert each register state (row) to an integer and then to a hex string via a lookup table
+       of the distinct states, or count the occurrences of each state if `output` is "counts"
 
     Args:
         job: quantum job whose results are to be discriminated
         discriminator: a function which takes two arguments "qubit_index" and "iq_points" (an array)
-            and returns a binary value (0/1).
+            and returns a binary value (0/1). Ignored if batch_discriminator is given.
+        batch_discriminator: a function which takes two arguments "qubit_indices" and "iq_points"
+            (a channels x shots array) and returns the channels x shots array of binary values (0/1)
         num_of_states: the number of states the discriminator produces; default=2
         byteorder: the byte order of the acquisition channel list; default=ByteOrder.LITTLE_ENDIAN
         calibration: the device calibration object; default=None
+        output: "memory" to return the hex string of every shot or "counts" to return
+            the number of shots of each hex string; default="memory"
 
     Returns:
-        HexMatrix `results[experiments][shot]` -> hex string
+        if output is "memory", HexMatrix `results[experiments][shot]` -> hex string
         Nested list of the hex (base 16) representations of the states e.g. 0, 1.
         Each inner list corresponds to one experiment.
         Each item in the inner list corresponds to a shot number
+
+        if output is "counts", HexCounts `results[experiments][hex string]` -> number of shots
     """
-    if not callable(discriminator):
+    if batch_discriminator is None and not callable(discriminator):
         raise ValueError("'discriminator' must be callable")
 
     qobj = job.qobj
-    out: HexMatrix = []
+    out: Union[HexMatrix, HexCounts] = []
     qubit_ids = sorted([int(x.id) for x in calibration.qubits])
     quantify_to_sdk_map = dict([(qubit, idx) for idx, qubit in enumerate(qubit_ids)])
 
@@ -336,6 +363,9 @@ def discriminate_results(
         register = np.zeros((c_reg_len, no_of_repetitions), dtype=np.int8)
 
         unmapped_channels: list[str] = []
+        quantify_qubit_ids: List[int] = []
+        cbit_ids: List[int] = []
+        iq_rows: List[npt.NDArray[np.complexfloating]] = []
 
         sorted_acquisitions = sorted(expt_dataset.items(), key=lambda kv: int(kv[0]))
 
@@ -360,20 +390,9 @@ def discriminate_results(
                 unmapped_channels.append(sdk_qubit_id)
                 continue
 
-            cbit_id = int(q_to_c[sdk_qubit_id])
-
-            iq_values: npt.NDArray[np.complexfloating] = acquisitions.data[:, 0]
-            disc_res = discriminator(quantify_qubit_id, iq_values)
-
-            if np.isscalar(disc_res):
-                register[cbit_id, :] = disc_res
-            else:
-                if len(disc_res) != no_of_repetitions:
-                    raise ValueError(
-                        f"Discriminator for qubit {sdk_qubit_id} returned {len(disc_res)} "
-                        f"values, expected {no_of_repetitions}"
-                    )
-                register[cbit_id, :] = np.asarray(disc_res, dtype=np.int8)
+            quantify_qubit_ids.append(quantify_qubit_id)
+            cbit_ids.append(int(q_to_c[sdk_qubit_id]))
+            iq_rows.append(acquisitions.data[:, 0])
 
         if unmapped_channels:
             raise ValueError(
@@ -385,11 +404,27 @@ def discriminate_results(
                 f"{calibration}"
             )
 
-        bitarrays_per_rep = register.transpose()
+        if iq_rows:
+            iq_values = np.stack(iq_rows)
+            if batch_discriminator is not None:
+                register[cbit_ids, :] = _apply_batch_discriminator(
+                    batch_discriminator, quantify_qubit_ids, iq_values
+                )
+            else:
+                for row, (qubit_id, cbit_id) in enumerate(
+                    zip(quantify_qubit_ids, cbit_ids)
+                ):
+                    register[cbit_id, :] = _apply_discriminator(
+                        discriminator, qubit_id, iq_values[row]
+                    )
+
         base_10_per_rep = _bitarrays_to_decimal(
-            bitarrays_per_rep, base=num_of_states, byteorder=byteorder
+            register.transpose(), base=num_of_states, byteorder=byteorder
         )
-        out.append(_dec_to_hex(base_10_per_rep).tolist())
+        if output == "counts":
+            out.append(_count_hex_values(base_10_per_rep))
+        else:
+            out.append(_to_hex_strings(base_10_per_rep).tolist())
 
     return out
 
@@ -403,75 +438,104 @@ def xarray_to_list(job: QuantumJob) -> IQMemory:
 
         memory  ->  List[                       # experiments
                         List[                    # repetitions / shots
-                            List[complex, ...]   # channel (and acquisition) results
+                            List[[re, im], ...]  # channel (and acquisition) results
                         ]
                     ]
 
-    NumPy complex scalars are converted to float tuple.
+    Non-finite complex values are replaced with 0.
+    See iter_xarray_to_list() for a variant that yields one experiment at a time.
+    """
+    return list(iter_xarray_to_list(job))
+
+
+def iter_xarray_to_list(job: QuantumJob) -> Iterator[List[List[IQPoint]]]:
+    """
+    Yield the nested-list results of each experiment in `job.raw_results` one at a time
+    for measurement-level-1 (INTEGRATED) data.
+
+    Only one experiment is converted into python lists at a time
+    so the peak memory stays bounded for jobs with many experiments.
+
+    Args:
+        job: quantum job whose results are to be converted
+
+    Yields:
+        the `[repetition][channel result] -> [re, im]` nested list of each experiment
     """
     if job.raw_results is None:
         raise ValueError(
             "xarray_to_list: Can't find Quantum job experiment results `job.raw_results`."
         )
 
-    qobj = job.qobj
-    experiments_mem: IQMemory = []
     for qobj_exp_index, dataset in enumerate(job.raw_results.values()):
-        if not isinstance(dataset, xr.Dataset):
-            raise TypeError(
-                "xarray_to_list: expected an xarray.Dataset in raw_results values"
-            )
+        iq_values = _get_iq_array(job.qobj, exp_index=qobj_exp_index, dataset=dataset)
+        yield iq_values.tolist()
 
-        # dataset keys are physical qubit ids (strings like "11")
-        channel_ids = sorted((int(k) for k in dataset.data_vars.keys()))
 
-        # Try to order by memory slot if we can map qubit_id -> slot for this experiment
-        ordered_channel_ids = channel_ids
+def _get_iq_array(
+    qobj: PulseQobj, exp_index: int, dataset: xr.Dataset
+) -> npt.NDArray[np.float64]:
+    """Gets the IQ values of the experiment's dataset as a (repetitions, results, 2) array
 
-        try:
-            acq = get_acquisition_parameters_from_experiment(
-                exp_index=qobj_exp_index, qobj=qobj
-            )
-            qubit_to_slot = dict(zip(acq.qubits, acq.memory_slots))  # qubit_id -> slot
+    The channels are stacked in memory-slot order and non-finite values are replaced with 0.
 
-            if qubit_to_slot and all(q in qubit_to_slot for q in channel_ids):
-                ordered_channel_ids = sorted(
-                    channel_ids, key=lambda q: int(qubit_to_slot[q])
-                )
-        except Exception:
-            # fall back silently to dataset-key ordering
-            pass
-
-        nreps = dataset.sizes.get("repetition", 1)
-        exp_mem: List[List[IQPoint]] = []
-
-        for rep_idx in range(nreps):
-            rep_vals: List[IQPoint] = []
-            for qid in ordered_channel_ids:
-                arr = dataset[str(qid)].data
-
-                if arr.ndim == 2:
-                    row = arr[rep_idx, ...]
-                elif arr.ndim == 1:
-                    row = arr
-                else:
-                    raise ValueError(
-                        f"xarray_to_list: unexpected ndarray shape {arr.shape} for channel {qid}"
-                    )
+    Args:
+        qobj: the qobj of the job
+        exp_index: the index of the experiment in the qobj
+        dataset: the xarray dataset of the results of the experiment
 
-                for val in np.ravel(row):
-                    c = complex(val.item())
+    Returns:
+        the float array of shape (repetitions, channel results, 2) where the last
+        dimension is the (real, imaginary) pair
+    """
+    if not isinstance(dataset, xr.Dataset):
+        raise TypeError(
+            "xarray_to_list: expected an xarray.Dataset in raw_results values"
+        )
 
-                    if not np.isfinite([c.real, c.imag]).all():
-                        c = 0.0 + 0.0j
+    # dataset keys are physical qubit ids (strings like "11")
+    channel_ids = sorted((int(k) for k in dataset.data_vars.keys()))
 
-                    rep_vals.append((float(c.real), float(c.imag)))
+    # Try to order by memory slot if we can map qubit_id -> slot for this experiment
+    ordered_channel_ids = channel_ids
 
-            exp_mem.append(rep_vals)
+    try:
+        acq = get_acquisition_parameters_from_experiment(exp_index=exp_index, qobj=qobj)
+        qubit_to_slot = dict(zip(acq.qubits, acq.memory_slots))  # qubit_id -> slot
 
-        experiments_mem.append(exp_mem)
+        if qubit_to_slot and all(q in qubit_to_slot for q in channel_ids):
+            ordered_channel_ids = sorted(
+                channel_ids, key=lambda q: int(qubit_to_slot[q])
+            )
+    except Exception:
+        # fall back silently to dataset-key ordering
+        pass
 
-    return experiments_mem
+    nreps = dataset.sizes.get("repetition", 1)
+    channel_values: List[npt.NDArray[np.complex128]] = []
+
+    for qid in ordered_channel_ids:
+        arr = np.asarray(dataset[str(qid)].data, dtype=np.complex128)
+
+        if arr.ndim == 2:
+            values = arr[:nreps].reshape(nreps, -1)
+        elif arr.ndim == 1:
+            # the same values are reported for every repetition
+            values = np.broadcast_to(arr, (nreps, arr.size))
+        else:
+            raise ValueError(
+                f"xarray_to_list: unexpected ndarray shape {arr.shape} for channel {qid}"
+            )
+
+        channel_values.append(values)
+
+    if channel_values:
+        iq_values = np.concatenate(channel_values, axis=1)
+    else:
+        iq_values = np.zeros((nreps, 0), dtype=np.complex128)
+
+    iq_values = np.where(np.isfinite(iq_values), iq_values, 0)
+    return np.stack((iq_values.real, iq_values.imag), axis=-1)
 
 
 def to_native_qobj_config(config: PulseQobjConfig) -> "NativeQobjConfig":
@@ -487,6 +551,7 @@ def to_native_qobj_config(config: PulseQobjConfig) -> "NativeQobjConfig":
     protocol = _get_meas_protocol(config)
     n_qubits = config.n_qubits
     meas_level = MeasLvl(config.meas_level)
+    result_format = ResultFormat(getattr(config, "result_format", ResultFormat.MEMORY))
 
     if bin_mode is BinMode.AVERAGE and protocol is MeasProtocol.SSB_INTEGRATION_COMPLEX:
         return NativeQobjConfig(
@@ -498,6 +563,7 @@ def to_native_qobj_config(config: PulseQobjConfig) -> "NativeQobjConfig":
             meas_return_cols=1,
             n_qubits=n_qubits,
             shots=config.shots,
+            result_format=result_format,
         )
 
     if bin_mode is BinMode.AVERAGE and protocol is MeasProtocol.TRACE:
@@ -510,6 +576,7 @@ def to_native_qobj_config(config: PulseQobjConfig) -> "NativeQobjConfig":
             meas_return_cols=16384,  # length of a trace
             n_qubits=n_qubits,
             shots=config.shots,
+            result_format=result_format,
         )
 
     if bin_mode is BinMode.APPEND and protocol is MeasProtocol.SSB_INTEGRATION_COMPLEX:
@@ -522,6 +589,7 @@ def to_native_qobj_config(config: PulseQobjConfig) -> "NativeQobjConfig":
             meas_return_cols=config.shots,
             n_qubits=n_qubits,
             shots=config.shots,
+            result_format=result_format,
         )
 
     raise RuntimeError(
@@ -818,10 +886,13 @@ def _bitarrays_to_decimal(
     array: npt.NDArray[np.int8],
     base: int,
     byteorder: ByteOrder = ByteOrder.LITTLE_ENDIAN,
-):
+) -> npt.NDArray:
     """
     Convert a 2D array in any base to integers in base 10 with selectable byte order.
 
+    Binary registers of up to 64 bits are packed with np.packbits into unsigned 64-bit integers.
+    Registers whose values do not fit in 64-bit integers are converted to python integers.
+
     Parameters:
         array: Input 2D array of integers in the specified base.
         base: The base of the input array (e.g., 2 for binary, 3 for base-3).
@@ -830,12 +901,30 @@ def _bitarrays_to_decimal(
     Returns:
         numpy.ndarray: 1D array of integers representing each row.
     """
+    num_of_rows, num_of_digits = array.shape
+
+    if base == 2 and num_of_digits <= 64:
+        # packbits with little bit-order expects the least significant digit first
+        if byteorder == ByteOrder.BIG_ENDIAN:
+            array = array[:, ::-1]
+
+        packed = np.packbits(array, axis=1, bitorder="little")
+        padded = np.zeros((num_of_rows, 8), dtype=np.uint8)
+        padded[:, : packed.shape[1]] = packed
+        return padded.view("<u8").ravel()
+
     # Flip the array for little-endian (LSD first)
     if byteorder == ByteOrder.LITTLE_ENDIAN:
         array = array[:, ::-1]
 
     # Compute the powers of the base, e.g. for base 3 => [3^2, 3^1, 3^0]
-    powers_of_base = base ** np.arange(array.shape[1] - 1, -1, -1)
+    exponents = np.arange(num_of_digits - 1, -1, -1)
+    if num_of_digits * np.log2(base) < 63:
+        powers_of_base = base**exponents
+    else:
+        # python integers do not overflow
+        powers_of_base = np.array([base ** int(v) for v in exponents], dtype=object)
+        array = array.astype(object)
 
     # Convert each row to integers (base 10)
     integers = array @ powers_of_base
@@ -843,6 +932,105 @@ def _bitarrays_to_decimal(
     return integers
 
 
+def _to_hex_strings(integers: npt.NDArray) -> npt.NDArray[np.object_]:
+    """
+    Convert a 1D array of integers to an array of their hex strings
+
+    Only the distinct integers are converted to strings, and the rest are
+    looked up from them, so that a single string object is created per distinct state.
+
+    Parameters:
+        integers: the 1D array of integers
+
+    Returns:
+        numpy.ndarray: the 1D object array of hex strings
+    """
+    unique_integers, inverse = np.unique(integers, return_inverse=True)
+    lookup_table = _dec_to_hex(unique_integers.astype(object))
+    return lookup_table[inverse.ravel()]
+
+
+def _count_hex_values(integers: npt.NDArray) -> Dict[str, int]:
+    """
+    Count the occurrences of each integer in the 1D array, keyed by its hex string
+
+    Parameters:
+        integers: the 1D array of integers
+
+    Returns:
+        dict: the map of hex string to the number of its occurrences
+    """
+    if integers.size == 0:
+        return {}
+
+    if integers.dtype != np.object_ and int(integers.max()) < _MAX_BINCOUNT_LENGTH:
+        counts = np.bincount(integers.astype(np.int64))
+        values = np.flatnonzero(counts)
+        return dict(zip(map(hex, values.tolist()), counts[values].tolist()))
+
+    unique_integers, counts = np.unique(integers, return_counts=True)
+    return dict(zip(map(hex, map(int, unique_integers.tolist())), counts.tolist()))
+
+
+def _apply_batch_discriminator(
+    batch_discriminator: "BatchDiscriminator",
+    qubit_ids: List[int],
+    iq_values: npt.NDArray[np.complexfloating],
+) -> npt.NDArray[np.int8]:
+    """
+    Discriminate the IQ values of all channels of an experiment in one call
+
+    Parameters:
+        batch_discriminator: the batch discriminator
+        qubit_ids: the qubit ids of the channels
+        iq_values: the (channels x shots) array of IQ values
+
+    Returns:
+        numpy.ndarray: the (channels x shots) array of discriminated values
+
+    Raises:
+        ValueError: Batch discriminator returned an array of shape {shape}, expected {expected_shape}
+    """
+    disc_res = np.asarray(batch_discriminator(qubit_ids, iq_values), dtype=np.int8)
+    if disc_res.shape != iq_values.shape:
+        raise ValueError(
+            f"Batch discriminator returned an array of shape {disc_res.shape}, "
+            f"expected {iq_values.shape}"
+        )
+    return disc_res
+
+
+def _apply_discriminator(
+    discriminator: Callable[[int, npt.NDArray[np.complexfloating]], int],
+    qubit_id: int,
+    iq_values: npt.NDArray[np.complexfloating],
+) -> npt.NDArray[np.int8] | int:
+    """
+    Discriminate the IQ values of a single channel
+
+    Parameters:
+        discriminator: the discriminator of a single qubit
+        qubit_id: the qubit id of the channel
+        iq_values: the 1D array of IQ values, one per shot
+
+    Returns:
+        the discriminated values, or a single discriminated value for all shots
+
+    Raises:
+        ValueError: Discriminator for qubit {qubit_id} returned {len} values, expected {shots}
+    """
+    disc_res = discriminator(qubit_id, iq_values)
+    if np.isscalar(disc_res):
+        return disc_res
+
+    if len(disc_res) != len(iq_values):
+        raise ValueError(
+            f"Discriminator for qubit {qubit_id} returned {len(disc_res)} "
+            f"values, expected {len(iq_values)}"
+        )
+    return np.asarray(disc_res, dtype=np.int8)
+
+
 def _get_q_to_c_from_qobj(
     qobj: "PulseQobj",
     exp_index: int,
@@ -87,6 +87,13 @@ class MeasProtocol(str, enum.Enum):
     TRACE = "trace"
 
 
+class ResultFormat(str, enum.Enum):
+    """The format of the results of discriminated jobs"""
+
+    MEMORY = "memory"
+    COUNTS = "counts"
+
+
 class AcqReturnType(int, enum.Enum):
     COMPLEX = 1
     ND_ARRAY = 2
@@ -111,6 +118,7 @@ class NativeQobjConfig:
     meas_return_cols: int
     n_qubits: int
     shots: int
+    result_format: ResultFormat = ResultFormat.MEMORY
 
     def to_dict(self) -> dict:
         """Converts this config into a JSON serializable dictionary"""
@@ -126,13 +134,23 @@ class NativeQobjConfig:
         """Converts a dict into a NativeQobjConfig object
 
         Args:
-            value: the dictionary to convert
+            value: the dictionary to convert, possibly with the raw values of the enums
+                as got after a JSON round trip
 
         Returns:
             the NativeQobjConfig object
         """
-        acq_return_type = value["acq_return_type"].to_type()
-        value = {**value, "acq_return_type": acq_return_type}
+        value = {
+            **value,
+            "acq_return_type": AcqReturnType(value["acq_return_type"]).to_type(),
+            "protocol": MeasProtocol(value["protocol"]),
+            "bin_mode": BinMode(value["bin_mode"]),
+            "meas_level": MeasLvl(value["meas_level"]),
+            "meas_return": MeasRet(value["meas_return"]),
+            "result_format": ResultFormat(
+                value.get("result_format", ResultFormat.MEMORY)
+            ),
+        }
         return cls(**value)
 
 
@@ -216,6 +234,7 @@ class QuantumJob:
     qobj_data: Optional[QobjData] = None
     metadata: Optional[QobjMetadata] = None
     raw_results: Optional[QJobResult] = None
+    result_format: ResultFormat = ResultFormat.MEMORY
 
     def __post_init__(self):
         """Initialize properties that depend on other properties"""
@@ -12,7 +12,7 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 import enum
-from typing import List, Type
+from typing import Any, Dict, List, Type
 
 import numpy as np
 from numpy import typing as npt
@@ -39,6 +39,8 @@ from .backends.two_qubit import QiskitPulse2Q
 
 
 class QiskitDynamicsExecutor(QuantumExecutor):
+    native_experiment_cls = QiskitDynamicsExperiment
+
     def __init__(
         self,
         backend_config: BackendConfig,
@@ -87,17 +89,23 @@ class QiskitDynamicsExecutor(QuantumExecutor):
         Returns:
             list of QiskitDynamicsExperiment's
         """
+        kwargs = self._get_native_experiment_kwargs(native_config)
         native_experiments = [
             QiskitDynamicsExperiment.from_qobj_expt(
                 name=get_experiment_name(expt.header.name, idx + 1),
                 expt=expt,
                 qobj_config=qobj.config,
-                backend_config=self.backend_config,
+                **kwargs,
             )
             for idx, expt in enumerate(qobj.experiments)
         ]
         return native_experiments
 
+    def _get_native_experiment_kwargs(
+        self, native_config: NativeQobjConfig, /
+    ) -> Dict[str, Any]:
+        return {"backend_config": self.backend_config}
+
     def close(self):
         pass
 
@@ -12,13 +12,12 @@
 # Any modifications or derivative works of this code must retain this
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
-import io
 import logging
+import pickle
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Type
 
-import qiskit.qpy as qpy
 from qiskit.pulse.schedule import Schedule
 
 from app.libs.qiskit.qobj import (
@@ -110,6 +109,14 @@ class QiskitDynamicsExperiment(NativeExperiment[Schedule]):
             duration=duration,
         )
 
+    @staticmethod
+    def _dump_schedule(schedule: Schedule) -> bytes:
+        return _schedule_to_bytes(schedule)
+
+    @staticmethod
+    def _load_schedule(value: bytes) -> Schedule:
+        return _bytes_to_schedule(value)
+
 
 def _to_native_instruction(
     qobj_inst: PulseQobjInstruction,
@@ -137,15 +144,16 @@ def _to_native_instruction(
 def _schedule_to_bytes(schedule: Schedule) -> bytes:
     """Converts the schedule into a list of bytes that can be pickled
 
+    qpy only serializes ScheduleBlocks and not Schedules, so the schedule
+    is pickled as a whole.
+
     Args:
         schedule: the schedule to serialize
 
     Returns:
         bytes got from serializing the schedule
     """
-    buf = io.BytesIO()
-    qpy.dump([schedule], buf)
-    return buf.getvalue()
+    return pickle.dumps(schedule)
 
 
 def _bytes_to_schedule(value: bytes) -> Schedule:
@@ -157,6 +165,4 @@ def _bytes_to_schedule(value: bytes) -> Schedule:
     Returns:
         the schedule got after serialization
     """
-    buf = io.BytesIO(value)
-    [schedule] = qpy.load(buf)
-    return schedule
+    return pickle.loads(value)
@@ -0,0 +1,253 @@
+# This code is part of Tergite
+#
+# (C) Chalmers Next Labs (2026)
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Content-addressed cache of compiled quantify schedules"""
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from quantify_scheduler import Schedule
+from quantify_scheduler.schedules import CompiledSchedule
+
+_logger = logging.getLogger(__name__)
+
+
+class CompiledScheduleCache:
+    """An LRU cache of compiled schedules kept in memory and on disk
+
+    Compiled schedules are keyed by the content of the schedule
+    (see get_schedule_hash), the hash of the hardware config
+    and the version of the device calibration.
+    The on-disk entries survive restarts of the worker processes.
+
+    Attributes:
+        max_size: the maximum number of compiled schedules to keep in memory
+        max_disk_size: the maximum number of compiled schedules to keep on disk;
+            if 0, nothing is persisted on disk
+        folder: the folder where the on-disk entries are saved
+    """
+
+    def __init__(
+        self,
+        folder: Path | os.PathLike[str],
+        max_size: int = 64,
+        max_disk_size: int = 512,
+    ):
+        self.folder = Path(folder)
+        self.max_size = max_size
+        self.max_disk_size = max_disk_size
+        self._entries: OrderedDict[str, CompiledSchedule] = OrderedDict()
+
+        if max_disk_size > 0:
+            self.folder.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[CompiledSchedule]:
+        """Gets the compiled schedule for the given key if it exists
+
+        Args:
+            key: the key of the compiled schedule as got from get_cache_key()
+
+        Returns:
+            the compiled schedule or None if it is not cached
+        """
+        try:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        except KeyError:
+            pass
+
+        compiled_schedule = self._load_from_disk(key)
+        if compiled_schedule is not None:
+            self._set_in_memory(key, compiled_schedule)
+        return compiled_schedule
+
+    def set(self, key: str, compiled_schedule: CompiledSchedule):
+        """Adds the compiled schedule to the cache
+
+        Args:
+            key: the key of the compiled schedule as got from get_cache_key()
+            compiled_schedule: the compiled schedule to cache
+        """
+        self._set_in_memory(key, compiled_schedule)
+        self._save_to_disk(key, compiled_schedule)
+
+    def clear(self):
+        """Removes all entries from memory and from disk"""
+        self._entries.clear()
+        for file in self.folder.glob("*.json"):
+            file.unlink(missing_ok=True)
+
+    def _set_in_memory(self, key: str, compiled_schedule: CompiledSchedule):
+        """Adds the compiled schedule to the in-memory LRU, evicting the oldest
+
+        Args:
+            key: the key of the compiled schedule
+            compiled_schedule: the compiled schedule to cache
+        """
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = compiled_schedule
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, key: str) -> Optional[CompiledSchedule]:
+        """Loads the compiled schedule from disk if it exists
+
+        Args:
+            key: the key of the compiled schedule
+
+        Returns:
+            the compiled schedule or None if it is not on disk or is unreadable
+        """
+        if self.max_disk_size <= 0:
+            return None
+
+        file_path = self.folder / f"{key}.json"
+        try:
+            data = file_path.read_text()
+            # touch it so that it is the most recently used
+            file_path.touch()
+            return CompiledSchedule.from_json(data)
+        except FileNotFoundError:
+            return None
+        except Exception as exp:
+            _logger.warning(f"failed to load compiled schedule {key}: {exp}")
+            file_path.unlink(missing_ok=True)
+            return None
+
+    def _save_to_disk(self, key: str, compiled_schedule: CompiledSchedule):
+        """Persists the compiled schedule to disk, evicting the least recently used
+
+        Args:
+            key: the key of the compiled schedule
+            compiled_schedule: the compiled schedule to persist
+        """
+        if self.max_disk_size <= 0:
+            return
+
+        file_path = self.folder / f"{key}.json"
+        tmp_file_path = self.folder / f"{key}.json.tmp"
+        try:
+            tmp_file_path.write_text(compiled_schedule.to_json())
+            # rename is atomic so other processes never read half-written files
+            tmp_file_path.replace(file_path)
+        except Exception as exp:
+            _logger.warning(f"failed to persist compiled schedule {key}: {exp}")
+            tmp_file_path.unlink(missing_ok=True)
+            return
+
+        files = sorted(self.folder.glob("*.json"), key=_get_mtime)
+        for file in files[: max(0, len(files) - self.max_disk_size)]:
+            file.unlink(missing_ok=True)
+
+
+def get_cache_key(
+    schedule: Schedule, hardware_config_hash: str, calibration_version: str
+) -> str:
+    """Gets the key of the compiled schedule in the CompiledScheduleCache
+
+    Args:
+        schedule: the schedule to be compiled
+        hardware_config_hash: the hash of the hardware config used for compilation
+        calibration_version: the version of the device calibration e.g. last_calibrated
+
+    Returns:
+        the key for the compiled schedule
+    """
+    schedule_hash = get_schedule_hash(schedule)
+    raw_key = f"{schedule_hash}:{hardware_config_hash}:{calibration_version}"
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+
+def get_schedule_hash(schedule: Schedule) -> str:
+    """Gets a hash of the content of the schedule
+
+    Labels of the schedulables are random UUIDs so they are replaced by their
+    position in the schedule, making two schedules with the same operations,
+    timings, resources and repetitions have the same hash.
+
+    Args:
+        schedule: the schedule to hash
+
+    Returns:
+        the hex digest of the schedule's content
+    """
+    labels = {label: idx for idx, label in enumerate(schedule.schedulables.keys())}
+    content = {
+        "repetitions": schedule.repetitions,
+        "resources": {
+            name: resource.data for name, resource in schedule.resources.items()
+        },
+        "operations": {op_id: op.data for op_id, op in schedule.operations.items()},
+        "schedulables": [
+            _replace_labels(schedulable.data, labels)
+            for schedulable in schedule.schedulables.values()
+        ],
+    }
+    serialized = json.dumps(content, sort_keys=True, default=repr)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def get_file_hash(file_path: Path | os.PathLike[str]) -> str:
+    """Gets the sha256 hash of the contents of the given file
+
+    Args:
+        file_path: the path to the file
+
+    Returns:
+        the hex digest of the file's contents or an empty string if the file does not exist
+    """
+    try:
+        with open(file_path, "rb") as file:
+            return hashlib.sha256(file.read()).hexdigest()
+    except FileNotFoundError:
+        return ""
+
+
+def _replace_labels(value: Any, labels: Dict[str, int]) -> Any:
+    """Replaces all schedulable labels in the value with their positions
+
+    Args:
+        value: the value that may contain labels
+        labels: the map of label to position
+
+    Returns:
+        the value with the labels replaced
+    """
+    if isinstance(value, str):
+        return labels.get(value, value)
+    if isinstance(value, dict):
+        return {k: _replace_labels(v, labels) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_labels(v, labels) for v in value]
+    return value
+
+
+def _get_mtime(file_path: Path) -> float:
+    """Gets the modification time of the file, or 0 if it has been deleted
+
+    Args:
+        file_path: the path to the file
+
+    Returns:
+        the modification time of the file
+    """
+    try:
+        return file_path.stat().st_mtime
+    except FileNotFoundError:
+        return 0
@@ -22,17 +22,21 @@ This module implements the quantify executor.
 import logging
 import os
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
 import qblox_instruments
+import toml
 from qcodes import Instrument
 from quantify_core.data.handling import set_datadir
 from quantify_scheduler.backends.graph_compilation import SerialCompiler
 from quantify_scheduler.device_under_test.quantum_device import QuantumDevice
 from quantify_scheduler.instrument_coordinator import InstrumentCoordinator
 from quantify_scheduler.instrument_coordinator.components.qblox import ClusterComponent
+from quantify_scheduler.schedules import CompiledSchedule
 
 import settings
 from app.libs.device_parameters.dtos import BackendConfig
@@ -51,7 +55,8 @@ from app.libs.quantum_executor.utils.logger import ExperimentLogger
 from app.utils.compat import MeasurementMode, SPIMode
 
 from ...device_parameters import DeviceCalibration
-from .spi_dac import init_spi_dacs
+from .cache import CompiledScheduleCache, get_cache_key, get_file_hash
+from .spi_dac import SpiDAC, init_spi_dacs
 from .utils.calibration import recalibrate
 
 worker_logger = logging.getLogger(__name__)
@@ -60,6 +65,8 @@ worker_logger = logging.getLogger(__name__)
 class QuantifyExecutor(QuantumExecutor):
     """The controller of the hardware that executes the quantum jobs"""
 
+    native_experiment_cls = QuantifyExperiment
+
     # a cache that won't be cleared by the garbage collector
     _non_gc_instruments: Dict[str, Dict[str, Instrument]] = {}
 
@@ -81,6 +88,12 @@ class QuantifyExecutor(QuantumExecutor):
         ) = settings.CALIBRATION_DEVICE_CONFIG_FILE,
         calib_spi_conf: Path | os.PathLike[str] = settings.CALIBRATION_SPI_CONFIG_FILE,
         calib_seed_file: Path | os.PathLike[str] = settings.CALIBRATION_SEED,
+        schedule_cache_dir: (
+            Path | os.PathLike[str]
+        ) = settings.COMPILED_SCHEDULE_CACHE_DIR,
+        schedule_cache_size: int = settings.COMPILED_SCHEDULE_CACHE_SIZE,
+        schedule_cache_disk_size: int = settings.COMPILED_SCHEDULE_CACHE_DISK_SIZE,
+        pipelined_execution: bool = settings.QUANTIFY_PIPELINED_EXECUTION,
     ):
         """
         Args:
@@ -94,6 +107,12 @@ class QuantifyExecutor(QuantumExecutor):
             calib_node_conf: the configuration file for the nodes during calibration
             calib_device_conf: the configuration file for the entire devices during calibration
             calib_spi_conf: the configuration file for the spi during calibration
+            calib_seed_file: the file where the calibration data is saved after recalibration
+            schedule_cache_dir: the folder where compiled schedules are cached on disk
+            schedule_cache_size: the number of compiled schedules to cache in memory
+            schedule_cache_disk_size: the number of compiled schedules to cache on disk
+            pipelined_execution: whether to compile the next experiment of a job while
+                the current one is being measured; default = settings.QUANTIFY_PIPELINED_EXECUTION
         """
         self.calib_seed_file = calib_seed_file
         self.calib_spi_conf = calib_spi_conf
@@ -103,6 +122,7 @@ class QuantifyExecutor(QuantumExecutor):
         self.quantify_metadata = QuantifyMetadata.from_yaml(quantify_metadata_file)
         self.device_name = backend_config.general_config.name
         self.should_restore_currents = should_restore_currents
+        self.pipelined_execution = pipelined_execution
         self.are_clusters_resettable = are_clusters_resettable
         self.lo_frequencies = _extract_lo_frequencies(self.quantify_config)
         self.drive_frequencies = _extract_drive_frequencies(backend_config)
@@ -134,33 +154,18 @@ class QuantifyExecutor(QuantumExecutor):
         }
         self._port_to_coupler = {port: u for u, port in self._coupler_to_port.items()}
         self.coordinator_name = f"{self.device_name}_executor"
-        no_gc_instruments_cache = self.__class__._non_gc_instruments.setdefault(
-            self.device_name, {}
-        )
-        try:
-            self._coordinator = no_gc_instruments_cache[self.coordinator_name]
-        except KeyError:
-            # make sure all previous connections are closed
-            # FIXME: This global is unnatural but QCoDeS' delegation force us to make
-            #   all instruments globals
-            qblox_instruments.Cluster.close_all()
-            self._coordinator = InstrumentCoordinator(self.coordinator_name)
-
-            # FIXME: Saving to the class variable just to escape the garbage collector
-            #   since QCoDeS already keeps these instruments as globals
-            #   and they raise errors if they already exist in QCoDeS
-            no_gc_instruments_cache[self.coordinator_name] = self._coordinator
-
-            clusters = self.quantify_metadata.get_clusters()
-            for cluster in clusters:
-                if reset and are_clusters_resettable:
-                    cluster.reset()
-
-                cluster_component = ClusterComponent(cluster)
-                component_name = self._coordinator.add_component(cluster_component)
-                no_gc_instruments_cache[component_name] = cluster_component
-
-        self.spi_dacs = init_spi_dacs(metadata=self.quantify_metadata)
+        # the hardware is only connected to while the experiments of a job are run
+        self._coordinator: Optional[InstrumentCoordinator] = None
+        self.spi_dacs: Dict[str, SpiDAC] = {}
+        if reset and are_clusters_resettable:
+            # the clusters are not kept connected after they are reset
+            self.connect(reset=True)
+            self.disconnect()
+
+        # the bias currents last ramped to on each coupler during the current job.
+        # It is only trusted while the job holds the executor lease, since
+        # recalibrations or other processes may change the currents in between
+        self._applied_bias_currents: Dict[str, float] = {}
 
         try:
             self._quantum_device = Instrument.find_instrument(
@@ -173,6 +178,15 @@ class QuantifyExecutor(QuantumExecutor):
         self._compiler = SerialCompiler(name=f"{self.device_name}_compiler")
         self._compilation_config = self._quantum_device.generate_compilation_config()
 
+        # compiled schedules are only valid for the same hardware config and calibration
+        self._schedule_cache = CompiledScheduleCache(
+            folder=schedule_cache_dir,
+            max_size=schedule_cache_size,
+            max_disk_size=schedule_cache_disk_size,
+        )
+        self._hardware_config_hash = get_file_hash(quantify_config_file)
+        self._calibration_version = _get_calibration_version(calib_seed_file)
+
     def recalibrate(self, redis_url: str, **kwargs) -> DeviceCalibration | None:
         """Recalibrates the executor
 
@@ -195,6 +209,8 @@ class QuantifyExecutor(QuantumExecutor):
         fixed_duration_couplers = backend_config.device_config.fixed_duration_couplers
         reverse_phase_qubits = backend_config.device_config.reverse_phase_qubits
         cluster_config = self.quantify_config
+        # calibration moves the coupler currents, even if it fails midway
+        self._applied_bias_currents.clear()
 
         results = None
         for name, conf in self.quantify_metadata.root.items():
@@ -229,27 +245,39 @@ class QuantifyExecutor(QuantumExecutor):
         if isinstance(results, DeviceCalibration):
             calib_seed_file = self.calib_seed_file
             logging.info(f"calibration complete. Saving to {calib_seed_file}...")
+            # the seed file keeps last_calibrated so that the version survives restarts
             results.to_toml(calib_seed_file)
+            # the compiled schedules from the old calibration are now stale
+            self._calibration_version = results.last_calibrated
+            self._schedule_cache.clear()
 
         return results
 
     def _to_native_experiments(
         self, qobj: PulseQobj, native_config: NativeQobjConfig, /
     ) -> List[QuantifyExperiment]:
+        kwargs = self._get_native_experiment_kwargs(native_config)
         native_experiments = [
             QuantifyExperiment.from_qobj_expt(
                 name=get_experiment_name(expt.header.name, idx + 1),
                 expt=expt,
                 qobj_config=qobj.config,
-                hardware_map=self.hardware_map,
-                native_config=native_config,
-                lo_frequencies=self.lo_frequencies,
-                drive_frequencies=self.drive_frequencies,
+                **kwargs,
             )
             for idx, expt in enumerate(qobj.experiments)
         ]
         return native_experiments
 
+    def _get_native_experiment_kwargs(
+        self, native_config: NativeQobjConfig, /
+    ) -> Dict[str, Any]:
+        return {
+            "hardware_map": self.hardware_map,
+            "native_config": native_config,
+            "lo_frequencies": self.lo_frequencies,
+            "drive_frequencies": self.drive_frequencies,
+        }
+
     def _run_native(
         self,
         experiment: QuantifyExperiment,
@@ -257,23 +285,18 @@ class QuantifyExecutor(QuantumExecutor):
         native_config: NativeQobjConfig,
         logger: ExperimentLogger,
     ) -> QExperimentResult:
-        if self._experiment_delay > 0:
-            time.sleep(self._experiment_delay)
-
-        # Stop any running sequences.
-        self._coordinator.stop()
-        t1 = datetime.now()
-
-        compiled_schedule = self._compiler.compile(
-            schedule=experiment.schedule,
-            config=self._compilation_config,
+        results = self._run_native_experiments(
+            [experiment], native_config=native_config, logger=logger
         )
-        t2 = datetime.now()
-        print(t2 - t1, "DURATION OF COMPILING")
-
-        logger.log_Q1ASM_programs(compiled_schedule)
-        logger.log_schedule(compiled_schedule)
+        return results[experiment.header.name]
 
+    def _run_native_experiments(
+        self,
+        experiments: List[QuantifyExperiment],
+        *,
+        native_config: NativeQobjConfig,
+        logger: ExperimentLogger,
+    ) -> Dict[str, QExperimentResult]:
         initial_bias_currents_map = {}
         if self.should_restore_currents:
             initial_bias_currents_map = {
@@ -281,11 +304,105 @@ class QuantifyExecutor(QuantumExecutor):
                 for spi_name, spi_dac in self.spi_dacs.items()
             }
 
+        # the currents may have been changed since the last job
+        self._applied_bias_currents.clear()
+        results: Dict[str, QExperimentResult] = {}
+        try:
+            with ThreadPoolExecutor(max_workers=1) as compiler_pool:
+                compile_ = self._compile
+                if self.pipelined_execution:
+                    # compile the next experiment while the current one is measured
+                    compile_ = partial(compiler_pool.submit, self._compile)
+
+                next_compiled = compile_(experiments[0]) if experiments else None
+                for idx, experiment in enumerate(experiments):
+                    compiled_schedule = next_compiled
+                    if isinstance(compiled_schedule, Future):
+                        compiled_schedule = compiled_schedule.result()
+
+                    if idx + 1 < len(experiments):
+                        next_compiled = compile_(experiments[idx + 1])
+
+                    self._ensure_lease_held()
+                    results[experiment.header.name] = self._measure(
+                        experiment, compiled_schedule, logger=logger
+                    )
+        finally:
+            # on errors or restoration, the currents may no longer be at the applied biases
+            self._applied_bias_currents.clear()
+            if self.should_restore_currents:
+                # return currents to their original values
+                for spi_name, spi_dac in self.spi_dacs.items():
+                    spi_dac.ramp_to_target_currents(initial_bias_currents_map[spi_name])
+
+        return results
+
+    def _compile(self, experiment: QuantifyExperiment) -> CompiledSchedule:
+        """Compiles the schedule of the experiment, reusing cached compilations
+
+        Args:
+            experiment: the experiment whose schedule is to be compiled
+
+        Returns:
+            the compiled schedule
+        """
+        t1 = datetime.now()
+        cache_key = get_cache_key(
+            experiment.schedule,
+            hardware_config_hash=self._hardware_config_hash,
+            calibration_version=self._calibration_version,
+        )
+        compiled_schedule = self._schedule_cache.get(cache_key)
+        if compiled_schedule is None:
+            compiled_schedule = self._compiler.compile(
+                schedule=experiment.schedule,
+                config=self._compilation_config,
+            )
+            self._schedule_cache.set(cache_key, compiled_schedule)
+        t2 = datetime.now()
+        print(t2 - t1, "DURATION OF COMPILING")
+        return compiled_schedule
+
+    def _measure(
+        self,
+        experiment: QuantifyExperiment,
+        compiled_schedule: CompiledSchedule,
+        *,
+        logger: ExperimentLogger,
+    ) -> QExperimentResult:
+        """Runs the compiled schedule of the experiment on the instruments
+
+        Args:
+            experiment: the experiment to run
+            compiled_schedule: the compiled schedule of the experiment
+            logger: the logger for the given experiment which logs data in a specific folder
+
+        Returns:
+            the results of the measurement
+        """
+        if self._experiment_delay > 0:
+            time.sleep(self._experiment_delay)
+
+        # Stop any running sequences.
+        self._coordinator.stop()
+
+        logger.log_Q1ASM_programs(compiled_schedule)
+        logger.log_schedule(compiled_schedule)
+
         bias_currents = self._extract_bias(experiment)
-        if bias_currents:
-            print("Bias currents requested: %s", bias_currents)
+        # only ramp the couplers whose currents are not already at the requested bias
+        changed_bias_currents = {
+            coupler: current
+            for coupler, current in bias_currents.items()
+            if self._applied_bias_currents.get(coupler) != current
+        }
+        if changed_bias_currents:
+            print("Bias currents requested: %s", changed_bias_currents)
             for spi_dac in self.spi_dacs.values():
-                spi_dac.ramp_to_target_currents(bias_currents)
+                spi_dac.ramp_to_target_currents(changed_bias_currents)
+            self._applied_bias_currents.update(changed_bias_currents)
+        elif bias_currents:
+            print("Bias currents already set; skipping bias set.")
         else:
             print("No dc_bias extracted from schedule; skipping bias set.")
 
@@ -298,15 +415,6 @@ class QuantifyExecutor(QuantumExecutor):
         t4 = datetime.now()
         print(t4 - t3, "DURATION OF MEASURING")
 
-        # reset SPI DACs
-        for spi_name, spi_dac in self.spi_dacs.items():
-            if self.should_restore_currents:
-                # return currents to their original values
-                initial_biases = initial_bias_currents_map[spi_name]
-                spi_dac.ramp_to_target_currents(initial_biases)
-
-            spi_dac.close()
-
         return QExperimentResult.from_xarray(results)
 
     def _extract_bias(self, expt: QuantifyExperiment) -> dict[str, float]:
@@ -341,17 +449,65 @@ class QuantifyExecutor(QuantumExecutor):
                         bias[coupler] = bias_current
         return bias
 
+    def connect(self, reset: bool = False) -> None:
+        """Connects to the clusters and the SPI racks if not yet connected
+
+        Args:
+            reset: whether to reset the clusters if they are resettable; default = False
+        """
+        if self._coordinator is not None:
+            return
+
+        no_gc_instruments_cache = self.__class__._non_gc_instruments.setdefault(
+            self.device_name, {}
+        )
+        try:
+            self._coordinator = no_gc_instruments_cache[self.coordinator_name]
+        except KeyError:
+            # make sure all previous connections are closed
+            # FIXME: This global is unnatural but QCoDeS' delegation force us to make
+            #   all instruments globals
+            qblox_instruments.Cluster.close_all()
+            self._coordinator = InstrumentCoordinator(self.coordinator_name)
+
+            # FIXME: Saving to the class variable just to escape the garbage collector
+            #   since QCoDeS already keeps these instruments as globals
+            #   and they raise errors if they already exist in QCoDeS
+            no_gc_instruments_cache[self.coordinator_name] = self._coordinator
+
+            clusters = self.quantify_metadata.get_clusters()
+            for cluster in clusters:
+                if reset and self.are_clusters_resettable:
+                    cluster.reset()
+
+                cluster_component = ClusterComponent(cluster)
+                component_name = self._coordinator.add_component(cluster_component)
+                no_gc_instruments_cache[component_name] = cluster_component
+
+        self.spi_dacs = init_spi_dacs(metadata=self.quantify_metadata)
+
+    def disconnect(self) -> None:
+        """Closes the connections to the clusters and the SPI racks if connected"""
+        if self._coordinator is None:
+            return
+
+        try:
+            self._coordinator.stop()
+        finally:
+            for spi_dac in self.spi_dacs.values():
+                spi_dac.close()
+            self.spi_dacs = {}
+            # FIXME: This global is unnatural but QCoDeS is forcing us to do this
+            #   Unfortunately, this means closing one instance of this class closes
+            #   all clusters of all other instances. But if we don't, connect() will be a problem
+            #   especially in automated tests
+            qblox_instruments.Cluster.close_all()
+            self._coordinator.close_all()
+            self.__class__._non_gc_instruments[self.device_name].clear()
+            self._coordinator = None
+
     def close(self) -> None:
-        self._coordinator.stop()
-        for spi_dac in self.spi_dacs.values():
-            spi_dac.close()
-        # FIXME: This global is unnatural but QCoDeS is forcing us to do this
-        #   Unfortunately, this means closing one instance of this class closes
-        #   all clusters of all other instances. But if we don't, __init__ will be a problem
-        #   especially in automated tests
-        qblox_instruments.Cluster.close_all()
-        self._coordinator.close_all()
-        self.__class__._non_gc_instruments[self.device_name].clear()
+        self.disconnect()
 
 
 def _extract_lo_frequencies(quantify_config: Any) -> Dict[str, float]:
@@ -390,3 +546,23 @@ def _extract_drive_frequencies(backend_config: BackendConfig) -> Dict[str, float
 def _to_drive_clock(qubit_id: Any) -> str:
     stripped = str(qubit_id).strip().lstrip("q")
     return f"q{int(stripped):02d}.01"
+
+
+def _get_calibration_version(calib_seed_file: Path | os.PathLike[str]) -> str:
+    """Gets the version of the device calibration saved in the seed file
+
+    This is the last_calibrated of the DeviceCalibration saved by recalibrate().
+    Seed files that were not written by a recalibration have no last_calibrated,
+    so the hash of their contents is used instead.
+
+    Args:
+        calib_seed_file: the file where the calibration data is saved after recalibration
+
+    Returns:
+        the version of the device calibration
+    """
+    try:
+        seed_data = toml.load(calib_seed_file)
+        return seed_data["calibration_config"]["last_calibrated"]
+    except (FileNotFoundError, KeyError):
+        return get_file_hash(calib_seed_file)
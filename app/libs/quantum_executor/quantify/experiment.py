@@ -24,6 +24,7 @@ from dataclasses import dataclass
 from typing import Dict, List, Optional, Set, Tuple, Type
 
 from quantify_scheduler import Schedule
+from quantify_scheduler.json_utils import SchedulerJSONDecoder
 from quantify_scheduler.operations.pulse_library import IdlePulse, ResetClockPhase
 from quantify_scheduler.resources import ClockResource
 
@@ -170,6 +171,20 @@ class QuantifyExperiment(NativeExperiment[Schedule]):
             duration=duration,
         )
 
+    def to_dict(self) -> dict:
+        # the channel registry holds plain python objects so it is pickled as is
+        return {**super().to_dict(), "channel_registry": self.channel_registry}
+
+    @staticmethod
+    def _dump_schedule(schedule: Schedule) -> str:
+        return schedule.to_json()
+
+    @staticmethod
+    def _load_schedule(value: str) -> Schedule:
+        # Schedule.from_json() wraps the schedule restored by the decoder
+        # in another Schedule, which then fails to be copied by the compiler
+        return SchedulerJSONDecoder().decode(value)
+
 
 def _add_instruction_to_channel_registry(
     channel_registry: QuantifyChannelRegistry,
@@ -1,6 +1,7 @@
 # This code is part of Tergite
 #
 # (C) Martin Ahindura (2024)
+# (C) Chalmers Next Labs 2026
 #
 # This code is licensed under the Apache License, Version 2.0. You may
 # obtain a copy of this license in the LICENSE.txt file in the root directory
@@ -11,9 +12,318 @@
 # that they have been altered from the originals.
 
 """Utilities for connections to quantum_executor service"""
-from filelock import FileLock
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
 
+from redis import Redis
 
-def get_executor_lock():
-    """Get a lock on the quantum executor to avoid interference when controlling it"""
-    return FileLock(".quantum-executor.lock")
+import settings
+from app.utils.exc import ExecutorLeaseLostError
+
+_EXECUTOR_LEASE_KEY_PREFIX = "__executor_lease__::"
+
+_ACQUIRE_LUA = """
+-- Script to take the executor lease if it is free, issuing the next lease token
+--
+-- KEYS[1] = the lease key
+-- KEYS[2] = the lease token counter
+-- KEYS[3] = the hashmap of the lease metrics
+-- ARGV[1] = the time to live of the lease in milliseconds
+-- ARGV[2] = the purpose for which the lease is taken
+-- ARGV[3] = the seconds waited for the lease so far
+--
+-- Returns the lease token or 0 if the lease is held by someone else
+
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    return 0
+end
+
+local token = redis.call("INCR", KEYS[2])
+redis.call("SET", KEYS[1], token, "PX", ARGV[1])
+
+local purpose = ARGV[2]
+local wait = tonumber(ARGV[3])
+redis.call("HINCRBY", KEYS[3], purpose .. ":acquisitions", 1)
+redis.call("HINCRBYFLOAT", KEYS[3], purpose .. ":wait_seconds", ARGV[3])
+local max_wait = tonumber(redis.call("HGET", KEYS[3], purpose .. ":max_wait_seconds") or "0")
+if wait > max_wait then
+    redis.call("HSET", KEYS[3], purpose .. ":max_wait_seconds", ARGV[3])
+end
+return token
+"""
+
+_RENEW_LUA = """
+-- Script to extend the executor lease if it is still held with the given lease token
+--
+-- KEYS[1] = the lease key
+-- ARGV[1] = the lease token
+-- ARGV[2] = the time to live of the lease in milliseconds
+--
+-- Returns 1 if the lease was extended or 0 if it is no longer held with the token
+
+if redis.call("GET", KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+"""
+
+_RELEASE_LUA = """
+-- Script to free the executor lease if it is still held with the given lease token
+--
+-- KEYS[1] = the lease key
+-- ARGV[1] = the lease token
+--
+-- Returns 1 if the lease was freed or 0 if it is no longer held with the token
+
+if redis.call("GET", KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+return redis.call("DEL", KEYS[1])
+"""
+
+
+@dataclass(frozen=True)
+class ExecutorLockMetrics:
+    """Contention for the executor lease by the tasks of a given purpose
+
+    Attributes:
+        purpose: the purpose for which the lease is taken e.g. "execute" or "recalibrate"
+        acquisitions: the number of times the lease was taken
+        total_wait_seconds: the total seconds waited for the lease
+        max_wait_seconds: the longest time in seconds waited for the lease
+        lost_leases: the number of times the lease expired while it was still needed
+    """
+
+    purpose: str
+    acquisitions: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+    lost_leases: int
+
+
+class ExecutorLease:
+    """A lease in redis on the quantum executor to avoid interference when controlling it
+
+    Unlike a file lock, it works across hosts and expires after its TTL if its
+    holder crashes. While held, it is renewed in a background thread.
+    Each acquisition gets a token greater than all before it, so a holder
+    whose lease expired can tell, via ensure_held(), that it must stop using the hardware.
+
+    This is not full fencing: the instruments never see the token, so they cannot
+    reject the commands of a stale holder. ensure_held() only checks on the holder's
+    side, so a holder that pauses between the check and its commands to the hardware
+    e.g. in a long GC pause, can still send them after its lease expired.
+
+    Attributes:
+        name: the name of the executor e.g. the queue prefix of the backend
+        purpose: the purpose for which the lease is taken, used in the metrics
+        ttl: the seconds after which the lease expires if it is not renewed
+        poll_interval: the seconds between attempts to take the lease while waiting
+        token: the lease token of the current acquisition if held
+        wait_seconds: the seconds waited for the current acquisition if held
+    """
+
+    def __init__(
+        self,
+        connection: Redis,
+        name: str,
+        purpose: str,
+        ttl: float = settings.EXECUTOR_LOCK_TTL,
+        poll_interval: float = 0.1,
+    ):
+        self._connection = connection
+        self._key = _get_lease_key(name)
+        self._fence_key = _get_lease_fence_key(name)
+        self._metrics_key = _get_lease_metrics_key(name)
+        self._acquire_script = connection.register_script(_ACQUIRE_LUA)
+        self._renew_script = connection.register_script(_RENEW_LUA)
+        self._release_script = connection.register_script(_RELEASE_LUA)
+        self.name = name
+        self.purpose = purpose
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.token: Optional[int] = None
+        self.wait_seconds: Optional[float] = None
+        self._is_lost = threading.Event()
+        self._stop_renewal = threading.Event()
+        self._renewal_thread: Optional[threading.Thread] = None
+
+    @property
+    def _ttl_ms(self) -> int:
+        return int(self.ttl * 1000)
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """Waits for the lease and takes it
+
+        Args:
+            timeout: the maximum seconds to wait; default = None i.e. wait forever
+
+        Returns:
+            the lease token of this acquisition
+
+        Raises:
+            TimeoutError: executor lease not acquired in {timeout} seconds
+        """
+        started_at = time.monotonic()
+        while True:
+            wait_seconds = time.monotonic() - started_at
+            token = self._acquire_script(
+                keys=[self._key, self._fence_key, self._metrics_key],
+                args=[self._ttl_ms, self.purpose, f"{wait_seconds:.6f}"],
+            )
+            if token != 0:
+                break
+
+            if timeout is not None and wait_seconds >= timeout:
+                raise TimeoutError(f"executor lease not acquired in {timeout} seconds")
+            time.sleep(self.poll_interval)
+
+        self.token = int(token)
+        self.wait_seconds = wait_seconds
+        logging.info(
+            f"executor lease {self.token} acquired for {self.purpose} "
+            f"after waiting {wait_seconds:.3f}s"
+        )
+
+        self._is_lost.clear()
+        self._stop_renewal.clear()
+        self._renewal_thread = threading.Thread(
+            target=self._renew_periodically, args=(self.token,), daemon=True
+        )
+        self._renewal_thread.start()
+        return self.token
+
+    def release(self):
+        """Stops renewing the lease and frees it if it is still held"""
+        token = self.token
+        if token is None:
+            return
+
+        self._stop_renewal.set()
+        if self._renewal_thread is not None:
+            self._renewal_thread.join()
+            self._renewal_thread = None
+
+        self._release_script(keys=[self._key], args=[token])
+        self.token = None
+
+    def ensure_held(self):
+        """Checks that the lease is still held, with this acquisition's lease token
+
+        It is a check-then-act on the holder's side only; the lease may still
+        expire right after it, before the holder next uses the hardware.
+
+        Raises:
+            ExecutorLeaseLostError: executor lease {token} lost
+        """
+        token = self.token
+        if token is None:
+            raise ExecutorLeaseLostError("executor lease not acquired")
+
+        current_token = self._connection.get(self._key)
+        if (
+            self._is_lost.is_set()
+            or current_token is None
+            or int(current_token) != token
+        ):
+            raise ExecutorLeaseLostError(f"executor lease {token} lost")
+
+    def _renew_periodically(self, token: int):
+        """Extends the lease every third of its TTL until it is released or lost
+
+        Args:
+            token: the lease token of the acquisition to renew
+        """
+        while not self._stop_renewal.wait(self.ttl / 3):
+            try:
+                is_renewed = self._renew_script(
+                    keys=[self._key], args=[token, self._ttl_ms]
+                )
+            except Exception as exp:
+                # the lease is still valid until its TTL so the next renewal may succeed
+                logging.warning(f"error renewing executor lease {token}: {exp}")
+                continue
+
+            if not is_renewed:
+                logging.error(f"executor lease {token} expired before it was released")
+                self._is_lost.set()
+                self._connection.hincrby(
+                    self._metrics_key, f"{self.purpose}:lost_leases", 1
+                )
+                return
+
+    def __enter__(self) -> "ExecutorLease":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.release()
+
+
+def get_executor_lock(
+    connection: Redis,
+    name: str,
+    purpose: str,
+    ttl: float = settings.EXECUTOR_LOCK_TTL,
+) -> ExecutorLease:
+    """Get a lock on the quantum executor to avoid interference when controlling it
+
+    Args:
+        connection: the connection to the redis server shared by all the workers
+        name: the name of the executor e.g. the queue prefix of the backend
+        purpose: the purpose for which the lock is taken e.g. "execute" or "recalibrate"
+        ttl: the seconds after which the lock expires if its holder stops renewing it
+
+    Returns:
+        the lease on the executor, to be used as a context manager
+    """
+    return ExecutorLease(connection, name=name, purpose=purpose, ttl=ttl)
+
+
+def get_executor_lock_metrics(
+    connection: Redis, name: str
+) -> List[ExecutorLockMetrics]:
+    """Gets the contention for the executor lock by the purpose for which it was taken
+
+    Args:
+        connection: the connection to the redis server shared by all the workers
+        name: the name of the executor e.g. the queue prefix of the backend
+
+    Returns:
+        the metrics of the executor lock for each purpose, sorted by purpose
+    """
+    raw_metrics = connection.hgetall(_get_lease_metrics_key(name))
+    values = {}
+    for field, value in raw_metrics.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        purpose, _, name = field.rpartition(":")
+        values.setdefault(purpose, {})[name] = float(value)
+
+    return [
+        ExecutorLockMetrics(
+            purpose=purpose,
+            acquisitions=int(item.get("acquisitions", 0)),
+            total_wait_seconds=item.get("wait_seconds", 0.0),
+            max_wait_seconds=item.get("max_wait_seconds", 0.0),
+            lost_leases=int(item.get("lost_leases", 0)),
+        )
+        for purpose, item in sorted(values.items())
+    ]
+
+
+def _get_lease_key(name: str) -> str:
+    """Gets the redis key of the lease on the executor of the given name"""
+    return f"{_EXECUTOR_LEASE_KEY_PREFIX}{name}"
+
+
+def _get_lease_fence_key(name: str) -> str:
+    """Gets the redis key of the lease token counter of the executor of the given name"""
+    return f"{_EXECUTOR_LEASE_KEY_PREFIX}{name}::fence"
+
+
+def _get_lease_metrics_key(name: str) -> str:
+    """Gets the redis key of the lease metrics of the executor of the given name"""
+    return f"{_EXECUTOR_LEASE_KEY_PREFIX}{name}::metrics"
@@ -15,6 +15,8 @@
 from itertools import groupby
 from typing import Any, List, Tuple, Union
 
+import numpy as np
+
 
 def iqx_rle(seq: List[Any]) -> List[Union[Tuple[Any], Tuple[Any, int]]]:
     """
@@ -32,3 +34,24 @@ def iqx_rld(enc_seq: List[Union[Tuple[Any], Tuple[Any, int]]]) -> List[Any]:
     """
     dec = [[t[0] for _ in range(t[1])] if len(t) == 2 else [t[0]] for t in enc_seq]
     return [item for sublist in dec for item in sublist]
+
+
+def iqx_rld_complex(
+    enc_seq: List[Union[Tuple[Any], Tuple[Any, int]]],
+) -> np.ndarray:
+    """
+    Decodes a run-length encoded sequence of [re, im] pairs into a complex128 array.
+    Omitted counts are interpreted as 1.
+    """
+    if len(enc_seq) == 0:
+        return np.empty(0, dtype=np.complex128)
+
+    values = np.array([t[0] for t in enc_seq], dtype=np.float64)
+    counts = np.fromiter(
+        (t[1] if len(t) == 2 else 1 for t in enc_seq),
+        dtype=np.int64,
+        count=len(enc_seq),
+    )
+    # (n, 2) float64 pairs -> (n,) complex128 without copying
+    values = values.reshape(-1, 2).view(np.complex128)[:, 0]
+    return np.repeat(values, counts)
@@ -300,13 +300,41 @@ class JobResult(BaseModel):
     memory: Memory = Field(default_factory=list)
 
 
+class JobResultInfo(BaseModel):
+    """Summary of the results of a job, whose data is stored apart from the job
+
+    Attributes:
+        memory_type: the type of memory in the results i.e. 'hex' for discriminated
+            results or 'iq' for integrated results
+        num_experiments: the number of experiments in the results
+        shots: the number of shots in the first experiment; default = None
+        size: the size in bytes of the compressed results
+    """
+
+    memory_type: Literal["hex", "iq"]
+    num_experiments: int
+    shots: Optional[int] = None
+    size: int
+
+
 class JobFileParams(BaseModel):
+    """The parameters of the job in the job file
+
+    Attributes:
+        qobj: the qobj to run
+        result_format: the format of the results of discriminated jobs i.e.
+            'memory' for the hex string of every shot or 'counts' for only the number
+            of shots of each hex string; default = None i.e. the 'result_format'
+            in the qobj config or 'memory'
+    """
+
     model_config = ConfigDict(
         extra="forbid",
         arbitrary_types_allowed=True,
     )
 
     qobj: PulseQobj
+    result_format: Optional[Literal["memory", "counts"]] = None
 
     @field_serializer("qobj")
     def serialize_qobj(self, qobj: PulseQobj, _info: SerializationInfo):
@@ -351,11 +379,15 @@ class Job(Schema):
         timestamps: the timestamps for each stage of running this job; default = None
         status: the status of this job; default = JobStatus.PENDING
         failure_reason: the reason why the job has failed; default = None
+        result: the results of the job; these are not saved on the job itself
+            but are loaded from the results store when needed; default = None
+        result_info: the summary of the results saved in the results store; default = None
         etc.
     """
 
     __primary_key_fields__ = ("job_id",)
     __index_fields__ = ("user_id", "status")
+    __sort_field__ = "created_at"
 
     model_config = ConfigDict(
         extra="allow", arbitrary_types_allowed=True, validate_assignment=True
@@ -375,6 +407,7 @@ class Job(Schema):
     actual_duration: Optional[float] = None
     download_url: Optional[str] = None
     result: Optional[JobResult] = None
+    result_info: Optional[JobResultInfo] = None
     created_at: Optional[str] = Field(default_factory=utc_now_str)
     updated_at: Optional[str] = Field(default_factory=utc_now_str)
 
@@ -461,6 +494,51 @@ class Job(Schema):
         return value
 
 
+class JobStatusEvent(BaseModel):
+    """A change in the status or the stage of a job, as published on the job events stream
+
+    Attributes:
+        event_id: the id of the event in the stream, after which subscribers can resume;
+            default = None i.e. not yet published
+        job_id: the unique identifier of the job
+        user_id: the unique identifier of the user who owns the job
+        status: the status of the job
+        stage: the stage of the job
+        updated_at: the time the job was updated
+        failure_reason: the reason why the job has failed; default = None
+        cancellation_reason: the reason why the job was cancelled; default = None
+    """
+
+    event_id: Optional[str] = None
+    job_id: str
+    user_id: Optional[str] = None
+    status: JobStatus
+    stage: Stage
+    updated_at: Optional[str] = None
+    failure_reason: Optional[str] = None
+    cancellation_reason: Optional[str] = None
+
+    @classmethod
+    def from_job(cls, job: Job) -> "JobStatusEvent":
+        """Creates the event for the current status and stage of the job
+
+        Args:
+            job: the job that changed
+
+        Returns:
+            the event of the job's change
+        """
+        return cls(
+            job_id=job.job_id,
+            user_id=job.user_id,
+            status=job.status,
+            stage=job.stage,
+            updated_at=job.updated_at,
+            failure_reason=job.failure_reason,
+            cancellation_reason=job.cancellation_reason,
+        )
+
+
 @unique
 class LogLevel(Enum):
     """Log level of job supervisor log messages"""
@@ -0,0 +1,147 @@
+# This code is part of Tergite
+#
+# (C) Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+#
+"""Compact binary encoding of the results of jobs
+
+The results are saved as a compressed numpy archive (npz) in which:
+
+- discriminated experiments are arrays of unsigned integers, one per shot
+- integrated experiments are float32 arrays of shape (shots, slots, 2)
+- experiments that cannot be represented as such arrays e.g. ragged ones
+  or those with registers wider than 64 bits are saved as JSON
+- any extra fields of the JobResult are saved as JSON
+"""
+import io
+import json
+from typing import Any, List, Tuple
+
+import numpy as np
+
+from .dtos import JobResult, JobResultInfo
+
+_HEX_PREFIX = "hex_"
+_IQ_PREFIX = "iq_"
+_JSON_PREFIX = "json_"
+_EXTRA_KEY = "extra"
+
+
+def encode_job_result(result: JobResult) -> Tuple[bytes, JobResultInfo]:
+    """Encodes the results of a job into a compressed binary blob
+
+    Args:
+        result: the results of the job
+
+    Returns:
+        the tuple of the binary blob and the summary of the results
+    """
+    memory = result.memory
+    memory_type = _get_memory_type(memory)
+    arrays = {}
+
+    for idx, experiment in enumerate(memory):
+        try:
+            if memory_type == "hex":
+                arrays[f"{_HEX_PREFIX}{idx}"] = np.array(
+                    [int(value, 16) for value in experiment], dtype=np.uint64
+                )
+            else:
+                arrays[f"{_IQ_PREFIX}{idx}"] = np.array(experiment, dtype=np.float32)
+        except (ValueError, TypeError, OverflowError):
+            arrays[f"{_JSON_PREFIX}{idx}"] = _to_json_array(experiment)
+
+    if result.model_extra:
+        arrays[_EXTRA_KEY] = _to_json_array(result.model_extra)
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    data = buffer.getvalue()
+
+    info = JobResultInfo(
+        memory_type=memory_type,
+        num_experiments=len(memory),
+        shots=len(memory[0]) if len(memory) > 0 else None,
+        size=len(data),
+    )
+    return data, info
+
+
+def decode_job_result(data: bytes) -> JobResult:
+    """Decodes the results of a job from the binary blob got from encode_job_result()
+
+    Args:
+        data: the binary blob of the results
+
+    Returns:
+        the results of the job
+    """
+    memory = []
+    extra = {}
+
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        experiments = {}
+        for key in archive.files:
+            if key == _EXTRA_KEY:
+                extra = _from_json_array(archive[key])
+                continue
+
+            prefix, idx = key.rsplit("_", maxsplit=1)
+            experiments[int(idx)] = (f"{prefix}_", archive[key])
+
+        for idx in sorted(experiments):
+            prefix, array = experiments[idx]
+            if prefix == _HEX_PREFIX:
+                memory.append([hex(value) for value in array.tolist()])
+            elif prefix == _IQ_PREFIX:
+                memory.append(array.tolist())
+            else:
+                memory.append(_from_json_array(array))
+
+    return JobResult(memory=memory, **extra)
+
+
+def _get_memory_type(memory: List[Any]) -> str:
+    """Gets the type of the memory i.e. 'hex' for discriminated or 'iq' for integrated
+
+    Args:
+        memory: the memory of the results of the job
+
+    Returns:
+        'hex' if the shots are hex strings, or 'iq' otherwise
+    """
+    for experiment in memory:
+        for shot in experiment:
+            return "hex" if isinstance(shot, str) else "iq"
+    return "hex"
+
+
+def _to_json_array(value: Any) -> np.ndarray:
+    """Converts the value into a numpy array of the bytes of its JSON string
+
+    Args:
+        value: the JSON-serializable value
+
+    Returns:
+        the uint8 numpy array of the JSON string
+    """
+    return np.frombuffer(json.dumps(value).encode("utf-8"), dtype=np.uint8)
+
+
+def _from_json_array(array: np.ndarray) -> Any:
+    """Converts the numpy array got from _to_json_array back to its value
+
+    Args:
+        array: the uint8 numpy array of the JSON string
+
+    Returns:
+        the value in the JSON string
+    """
+    return json.loads(array.tobytes().decode("utf-8"))
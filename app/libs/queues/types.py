@@ -12,7 +12,6 @@
 #
 """Module containing the types of queues"""
 
-import math
 import zlib
 from contextlib import suppress
 from types import TracebackType
@@ -20,6 +19,7 @@ from typing import Any, Callable, Dict, Generator, Optional, Tuple, Type, Union
 
 from pydantic import ValidationError
 from redis import Redis
+from redis.client import Pipeline
 from rq import Callback, Queue, get_current_job
 from rq.job import Job as RqJob
 from rq.results import Result as RqResult
@@ -30,11 +30,221 @@ from ...utils.rq import cancel_rq_job
 from .dtos import Job, StorageID
 from .utils import get_function_import_path, import_func, noop
 
+# the keys of every static queue script are, in order:
+# the legacy list, the fifo sorted set, the durations sorted set,
+# the jobs hash, the args-kwargs hash and the metadata hash
+_STATIC_QUEUE_LUA_PRELUDE = """
+local redis_call = redis.call
+local to_num = tonumber
+
+local legacy_list = KEYS[1]
+local fifo = KEYS[2]
+local durations = KEYS[3]
+local database = KEYS[4]
+local args_kwargs_db = KEYS[5]
+local metadata = KEYS[6]
+
+-- storage ids are of the format {uuid}:::{duration}
+local function get_duration(storage_id)
+    return to_num(string.match(storage_id, ":::([^:]*)$")) or 0
+end
+
+local function to_limit(value)
+    if value == "inf" then
+        return math.huge
+    end
+    return to_num(value)
+end
+
+local function pop(storage_id)
+    local job_json = redis_call("HGET", database, storage_id)
+    local args_kwargs = redis_call("HGET", args_kwargs_db, storage_id)
+    if redis_call("ZREM", fifo, storage_id) == 1 then
+        redis_call("HINCRBYFLOAT", metadata, "total_duration", -get_duration(storage_id))
+    end
+    redis_call("ZREM", durations, storage_id)
+    redis_call("HDEL", database, storage_id)
+    redis_call("HDEL", args_kwargs_db, storage_id)
+    return {storage_id, job_json, args_kwargs}
+end
+
+-- move the jobs of queues stored as lists by older versions into the sorted sets
+if redis_call("EXISTS", legacy_list) == 1 then
+    for _, storage_id in ipairs(redis_call("LRANGE", legacy_list, 0, -1)) do
+        local position = redis_call("HINCRBY", metadata, "sequence", 1)
+        redis_call("ZADD", fifo, position, storage_id)
+        redis_call("ZADD", durations, get_duration(storage_id), storage_id)
+    end
+    redis_call("DEL", legacy_list)
+end
+"""
+
+_STATIC_QUEUE_ADD_LUA = (
+    """
+-- v0.0.1
+-- Script to append a job to the static queue
+--
+-- ARGV[1] = storage_id
+-- ARGV[2] = job_json
+-- ARGV[3] = args_kwargs
+"""
+    + _STATIC_QUEUE_LUA_PRELUDE
+    + """
+local storage_id = ARGV[1]
+local duration = get_duration(storage_id)
+
+redis_call("HSET", database, storage_id, ARGV[2])
+redis_call("HSET", args_kwargs_db, storage_id, ARGV[3])
+
+local position = redis_call("HINCRBY", metadata, "sequence", 1)
+redis_call("ZADD", fifo, position, storage_id)
+redis_call("ZADD", durations, duration, storage_id)
+redis_call("HINCRBYFLOAT", metadata, "total_duration", duration)
+
+return position
+"""
+)
+
+_STATIC_QUEUE_POP_FIRST_LUA = (
+    """
+-- v0.0.1
+-- Script to pop the first job in the static queue that is shorter than a given duration
+--
+-- ARGV[1] = max_duration, or 'inf'
+--
+-- Returns {storage_id, job_json, args_kwargs} or nil if no job is shorter than max_duration
+"""
+    + _STATIC_QUEUE_LUA_PRELUDE
+    + """
+local max_duration = to_limit(ARGV[1])
+
+local head = redis_call("ZRANGE", fifo, 0, 0)[1]
+if not head then
+    return nil
+end
+if get_duration(head) < max_duration then
+    return pop(head)
+end
+
+local shortest = redis_call("ZRANGE", durations, 0, 0, "WITHSCORES")
+if to_num(shortest[2]) >= max_duration then
+    return nil
+end
+
+-- the first in the fifo order of all jobs shorter than max_duration
+local candidates = redis_call("ZRANGEBYSCORE", durations, "-inf", "(" .. ARGV[1])
+local first_id = nil
+local first_position = math.huge
+for start = 1, #candidates, 500 do
+    local batch = {unpack(candidates, start, math.min(start + 499, #candidates))}
+    local positions = redis_call("ZMSCORE", fifo, unpack(batch))
+    for idx, position in ipairs(positions) do
+        position = to_num(position)
+        if position and position < first_position then
+            first_position = position
+            first_id = batch[idx]
+        end
+    end
+end
+
+if not first_id then
+    return nil
+end
+return pop(first_id)
+"""
+)
+
+_STATIC_QUEUE_NEXT_LUA = (
+    """
+-- v0.0.1
+-- Script to pop the job at the head of the static queue and set it as the current job
+--
+-- Returns {storage_id, job_json, args_kwargs} or nil if the queue is empty
+"""
+    + _STATIC_QUEUE_LUA_PRELUDE
+    + """
+local head = redis_call("ZRANGE", fifo, 0, 0)[1]
+if not head then
+    return nil
+end
+
+local popped = pop(head)
+if popped[2] then
+    redis_call("HSET", metadata, "current_job", popped[2])
+end
+return popped
+"""
+)
+
+_STATIC_QUEUE_POP_JOB_LUA = (
+    """
+-- v0.0.1
+-- Script to pop the job of the given storage id out of the static queue
+--
+-- ARGV[1] = storage_id
+--
+-- Returns {storage_id, job_json, args_kwargs}
+"""
+    + _STATIC_QUEUE_LUA_PRELUDE
+    + """
+return pop(ARGV[1])
+"""
+)
+
+_STATIC_QUEUE_POP_MANY_LUA = (
+    """
+-- v0.0.1
+-- Script to pop, in fifo order, the jobs in the static queue that fit in a total duration
+--
+-- ARGV[1] = max_total_duration, or 'inf'
+--
+-- Returns {storage_id_1, job_json_1, args_kwargs_1, storage_id_2, ...}
+"""
+    + _STATIC_QUEUE_LUA_PRELUDE
+    + """
+local available_duration = to_limit(ARGV[1])
+local popped = {}
+local min_position = "-inf"
+
+while available_duration > 0 do
+    local shortest = redis_call("ZRANGE", durations, 0, 0, "WITHSCORES")
+    if not shortest[1] or to_num(shortest[2]) > available_duration then
+        break
+    end
+
+    local entries = redis_call(
+        "ZRANGEBYSCORE", fifo, min_position, "+inf", "WITHSCORES", "LIMIT", 0, 100
+    )
+    if #entries == 0 then
+        break
+    end
+
+    for idx = 1, #entries, 2 do
+        local storage_id = entries[idx]
+        local duration = get_duration(storage_id)
+        -- skip the jobs that are too long for the available duration
+        if duration <= available_duration then
+            for _, value in ipairs(pop(storage_id)) do
+                popped[#popped + 1] = value
+            end
+            available_duration = available_duration - duration
+        end
+        min_position = "(" .. entries[idx + 1]
+    end
+end
+
+return popped
+"""
+)
+
 
 class StaticQueue:
     """A Queue that is not associated with any runner
 
-    It thus just keeps items without running them
+    It thus just keeps items without running them.
+    The jobs are kept in a sorted set by their position in the queue,
+    and in another sorted set by their duration, so that the jobs that
+    fit in a given duration are found without scanning the whole queue.
     """
 
     def __init__(
@@ -50,10 +260,26 @@ class StaticQueue:
         self._database = f"backing_map_{name}"
         self._metadata = f"metadata_{name}"
         self._args_kwargs_db = f"__args_kwargs_{name}"
+        self._fifo = f"fifo_{name}"
+        self._durations = f"durations_{name}"
         self._duration_key = "total_duration"
         self._current_job = "current_job"
         self._connection = connection
         self._serializer = serializer
+        # older versions kept the queue as a list under the name of the queue
+        self._keys = [
+            name,
+            self._fifo,
+            self._durations,
+            self._database,
+            self._args_kwargs_db,
+            self._metadata,
+        ]
+        self._add = connection.register_script(_STATIC_QUEUE_ADD_LUA)
+        self._next = connection.register_script(_STATIC_QUEUE_NEXT_LUA)
+        self._pop_job = connection.register_script(_STATIC_QUEUE_POP_JOB_LUA)
+        self._pop_first = connection.register_script(_STATIC_QUEUE_POP_FIRST_LUA)
+        self._pop_many = connection.register_script(_STATIC_QUEUE_POP_MANY_LUA)
 
     @property
     def total_duration(self) -> float:
@@ -73,6 +299,22 @@ class StaticQueue:
         except ValidationError:
             return None
 
+    def get_total_duration_and_current_job(self) -> Tuple[float, Optional[Job]]:
+        """Gets the total duration of the queued tasks and the current job at the same instant
+
+        Returns:
+            the tuple of the total duration in seconds and the current job or None
+        """
+        duration, payload = self._connection.hmget(
+            self._metadata, [self._duration_key, self._current_job]
+        )
+        try:
+            current_job = Job.model_validate_json(payload)
+        except ValidationError:
+            current_job = None
+
+        return float(duration or 0), current_job
+
     def add(self, job: Job, *args, **kwargs):
         """Adds the item to the queue
 
@@ -81,21 +323,7 @@ class StaticQueue:
             args: the positional arguments to pass when enqueueing the job
             kwargs: the key-word arguments to pass when enqueueing the job
         """
-        job_json = job.model_dump_json(exclude={"args_kwargs"})
-        args_kwargs_data = _serialize_args_kwargs(
-            self._serializer, args=args, kwargs=kwargs
-        )
-
-        pipe = self._connection.pipeline()
-        pipe.hset(self._database, job.storage_id, job_json)
-        pipe.hset(self._args_kwargs_db, mapping={job.storage_id: args_kwargs_data})
-
-        pipe.rpush(self.name, job.storage_id)
-        pipe.hincrbyfloat(
-            self._metadata, self._duration_key, job.estimated_duration or 0
-        )
-
-        pipe.execute()
+        self._add_job(self._connection, job, args=args, kwargs=kwargs)
 
     def next(self) -> Optional[Tuple[Job, Tuple[Any, ...], Dict[str, Any]]]:
         """Gets the next item on the queue
@@ -103,35 +331,19 @@ class StaticQueue:
         Returns:
             the job and the args, kwargs next on the queue or None if there is no item
         """
-        try:
-            storage_id = self._connection.lpop(self.name)
-            storage_id = StorageID(_to_str(storage_id))
-            job_duration = storage_id.duration
-
-            pipe = self._connection.pipeline()
-
-            pipe.hincrbyfloat(self._metadata, self._duration_key, -job_duration)
-            pipe.hget(self._database, storage_id)
-            pipe.hget(self._args_kwargs_db, storage_id)
-            pipe.hdel(self._database, storage_id)
-            pipe.hdel(self._args_kwargs_db, storage_id)
-            pipeline_results = pipe.execute()
-
-            job_json = pipeline_results[1]
-            args_kwargs_bytes = pipeline_results[2]
-
-            job = Job.model_validate_json(job_json)
-            self._connection.hset(self._metadata, self._current_job, job_json)
+        popped = self._next(keys=self._keys)
+        if popped is None:
+            return None
 
-            args, kwargs = _deserialize_args_kwargs(self._serializer, args_kwargs_bytes)
-            return job, args, kwargs
+        _, job_json, args_kwargs_data = popped
+        try:
+            return self._load_job_tuple(job_json, args_kwargs_data)
         except ValidationError:
             return None
 
     def clear(self):
         """Removes all items on the queue"""
-        # network request 1
-        self._connection.delete(self._database, self.name, self._metadata)
+        self._connection.delete(*self._keys)
 
     def pop_job(
         self, storage_id: StorageID
@@ -147,57 +359,31 @@ class StaticQueue:
         Raises:
             ValidationError: job is of invalid format or does not exist
         """
-        job_duration = storage_id.duration
-        pipe = self._connection.pipeline()
-
-        pipe.lrem(self.name, 1, storage_id)
-        pipe.hget(self._database, storage_id)
-        pipe.hget(self._args_kwargs_db, storage_id)
-        pipe.hdel(self._database, storage_id)
-        pipe.hdel(self._args_kwargs_db, storage_id)
-        pipe.hincrbyfloat(self._metadata, self._duration_key, -job_duration)
-
-        pipeline_results = pipe.execute()
-        job_json = pipeline_results[1]
-        job = Job.model_validate_json(job_json)
-
-        args_kwargs_data = pipeline_results[2]
-        args, kwargs = _deserialize_args_kwargs(self._serializer, args_kwargs_data)
-
-        return job, args, kwargs
+        _, job_json, args_kwargs_data = self._pop_job(
+            keys=self._keys, args=[storage_id]
+        )
+        return self._load_job_tuple(job_json, args_kwargs_data)
 
     def pop_first(
-        self, filter_func: Callable[[StorageID, ...], bool], *args, **kwargs
+        self, max_duration: Optional[float] = None
     ) -> Optional[Tuple[Job, Tuple[Any, ...], Dict[str, Any]]]:
-        """Pops the first job that fulfills the given filter function
+        """Pops the first job that is shorter than the given duration
 
         Args:
-            filter_func: the function that receives the job storage id and returns true if condition is fulfilled, else false
-            args: extra arguments to pass to the filter function apart from the storage_id
-            kwargs: extra key-word arguments to pass to the filter function
+            max_duration: the duration in seconds that the job should be shorter than; default None
 
         Returns:
-            the tuple of the job, args, and kwargs if a job is found fulfilling the condition or None
+            the tuple of the job, args, and kwargs if a job is found shorter than max_duration or None
         """
-        num_of_entries = self._connection.llen(self.name)
-        batch_size = 100
-        num_of_batches = math.ceil(num_of_entries / batch_size)
-
-        batch = 0
-        while batch < num_of_batches:
-            start = batch * batch_size
-            stop = start + batch_size - 1
+        if max_duration is None:
+            max_duration = float("inf")
 
-            entries = self._connection.lrange(self.name, start, stop)
-            for idx, storage_id in enumerate(entries):
-                storage_id = StorageID(_to_str(storage_id))
-
-                if filter_func(storage_id, *args, **kwargs):
-                    return self.pop_job(storage_id)
+        popped = self._pop_first(keys=self._keys, args=[max_duration])
+        if popped is None:
+            return None
 
-            # move to next batch
-            batch += 1
-        return None
+        _, job_json, args_kwargs_data = popped
+        return self._load_job_tuple(job_json, args_kwargs_data)
 
     def pop_many(
         self,
@@ -205,6 +391,9 @@ class StaticQueue:
     ) -> Generator[Tuple[Job, Tuple[Any, ...], Dict[str, Any]], None, None]:
         """Pops jobs in FIFO order given a few limitations
 
+        All the jobs are popped at once, before the first is yielded.
+        Jobs that are longer than the duration left are skipped.
+
         Args:
             max_total_duration: the total seconds the collection of jobs should not exceed; default None
 
@@ -214,34 +403,53 @@ class StaticQueue:
         if max_total_duration is None:
             max_total_duration = float("inf")
 
-        num_of_entries = self._connection.llen(self.name)
-        batch_size = 100
-        num_of_batches = math.ceil(num_of_entries / batch_size)
-        available_duration = max_total_duration
+        popped = self._pop_many(keys=self._keys, args=[max_total_duration])
+        for idx in range(0, len(popped), 3):
+            yield self._load_job_tuple(popped[idx + 1], popped[idx + 2])
 
-        batch = 0
-        while batch < num_of_batches and available_duration > 0:
-            start = batch * batch_size
-            stop = start + batch_size - 1
+    def _add_job(
+        self,
+        conn: Union[Pipeline, Redis],
+        job: Job,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+    ):
+        """Adds the job to the queue using the given connection or pipeline
 
-            entries = self._connection.lrange(self.name, start, stop)
-            for idx, storage_id in enumerate(entries):
-                storage_id = StorageID(_to_str(storage_id))
-                duration = storage_id.duration
+        Args:
+            conn: the redis connection or pipeline
+            job: the item to add to the queue
+            args: the positional arguments to pass when enqueueing the job
+            kwargs: the key-word arguments to pass when enqueueing the job
+        """
+        job_json = job.model_dump_json(exclude={"args_kwargs"})
+        args_kwargs_data = _serialize_args_kwargs(
+            self._serializer, args=args, kwargs=kwargs
+        )
+        self._add(
+            keys=self._keys,
+            args=[job.storage_id, job_json, args_kwargs_data],
+            client=conn,
+        )
 
-                if duration > available_duration:
-                    # move to the next entry if current duration
-                    # is too big for available duration
-                    continue
+    def _load_job_tuple(
+        self, job_json: Optional[bytes], args_kwargs_data: Optional[bytes]
+    ) -> Tuple[Job, Tuple[Any, ...], Dict[str, Any]]:
+        """Loads the job and its args and kwargs from their stored values
 
-                job, args, kwargs = self.pop_job(storage_id)
-                yield job, args, kwargs
+        Args:
+            job_json: the JSON string of the job
+            args_kwargs_data: the serialized args and kwargs of the job
 
-                # update the available duration
-                available_duration -= duration
+        Returns:
+            the tuple of the job, args and kwargs
 
-            # move to next batch
-            batch += 1
+        Raises:
+            ValidationError: job is of invalid format or does not exist
+        """
+        job = Job.model_validate_json(job_json)
+        args, kwargs = _deserialize_args_kwargs(self._serializer, args_kwargs_data)
+        return job, args, kwargs
 
 
 class RunnerQueue(Queue):
@@ -306,13 +514,13 @@ class RunnerQueue(Queue):
     @property
     def total_duration(self) -> float:
         """the total duration of all pending jobs plus the time left to the end of the current job"""
+        total_duration, current_job = (
+            self._static_queue.get_total_duration_and_current_job()
+        )
         try:
-            return (
-                self._static_queue.total_duration
-                + self._static_queue.current_job.current_eta
-            )
+            return total_duration + current_job.current_eta
         except (AttributeError, TypeError):
-            return self._static_queue.total_duration
+            return total_duration
 
     def enqueue(self, job: Job, *args, **kwargs) -> RqJob:
         """Creates a rq job to represent the delayed function call and enqueues it.
@@ -344,7 +552,15 @@ class RunnerQueue(Queue):
             "job_id": kwargs.pop("job_id", self.get_rq_job_id(job.job_id)),
         }
 
-        self._static_queue.add(job, *args, **kwargs)
+        # with a pipeline, the job is only added when the caller executes the pipeline
+        pipeline = queue_kwargs["pipeline"]
+        if pipeline is not None and not pipeline.explicit_transaction:
+            # rq expects the pipeline to be in a transaction if it has any commands
+            pipeline.multi()
+
+        self._static_queue._add_job(
+            pipeline or self.connection, job, args=args, kwargs=kwargs
+        )
 
         return super().enqueue(
             _run_next_job,
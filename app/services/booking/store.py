@@ -14,14 +14,35 @@
 
 from sqlalchemy import Engine
 
-from ...utils.sql_db import get_sql_engine
+import settings
+
+from ...utils.sql_db import create_sql_tables, get_sql_engine
 from .models import Booking, User
 
 
 def get_bookings_sql_engine(url: str) -> Engine:
-    """Gets the SQLAlchemy engine for the bookings service
+    """Gets the shared SQLAlchemy engine for the bookings service
+
+    Args:
+        url: the database URL for the database
+    """
+    return get_sql_engine(
+        url=url,
+        models=[Booking, User],
+        pool_size=settings.BOOKING_DB_POOL_SIZE,
+        max_overflow=settings.BOOKING_DB_MAX_OVERFLOW,
+        pool_recycle=settings.BOOKING_DB_POOL_RECYCLE,
+    )
+
+
+def init_bookings_sql_engine(url: str) -> Engine:
+    """Initializes the shared SQLAlchemy engine for the bookings service at startup
+
+    This ensures the tables of the bookings service exist in the database
 
     Args:
         url: the database URL for the database
     """
-    return get_sql_engine(url=url, models=[Booking, User])
+    engine = get_bookings_sql_engine(url)
+    create_sql_tables(engine, models=[Booking, User])
+    return engine
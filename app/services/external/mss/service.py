@@ -14,14 +14,18 @@
 import abc
 import asyncio
 import base64
+import contextlib
 import json
 import logging
+import os
+import threading
 import time
 import uuid
 from abc import ABC
+from concurrent.futures import Future
 from pathlib import Path
 from types import TracebackType
-from typing import Any, Callable, Dict, Generator, Optional
+from typing import Any, Callable, Dict, Generator, Optional, Tuple
 
 import websockets
 from cryptography.hazmat.primitives import hashes, serialization
@@ -30,7 +34,7 @@ from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
 from redis import Redis
 from redis.asyncio import Redis as AsyncRedis
 from redis.asyncio.client import PubSub as AsyncPubSub
-from redis.client import PubSub
+from redis.client import PubSub, PubSubWorkerThread
 from websockets import ClientConnection, ConnectionClosed, InvalidMessage, InvalidStatus
 
 import settings
@@ -41,6 +45,9 @@ from .dtos import DeviceEvent, EventResponse
 
 _BCC_PRIVATE_KEYS: Dict[str, RSAPrivateKey] = {}
 _MSS_CLIENT_PIPE: Optional["MssClientPipe"] = None
+# the MSS event channels shared in this process, by device and redis URL
+_MSS_EVENT_CHANNELS: Dict[Tuple[str, str], "MssEventChannel"] = {}
+_MSS_EVENT_CHANNELS_LOCK = threading.Lock()
 
 
 async def connect_to_mss(
@@ -212,19 +219,58 @@ class BaseMssClientPipe(ABC):
         """Close the pipe connection to the MSS client"""
 
 
-class MssClientPipe(BaseMssClientPipe):
-    """Pipe to MSS client that is synchronous, to be used on the RQ side mainly"""
+class MssEventChannel:
+    """A long-lived channel for sending events to MSS, shared by all synchronous pipes in a process
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self._redis: Redis = get_redis_connection(self._redis_url)
-        self._inbox: PubSub = self._redis.pubsub(ignore_subscribe_messages=True)
+    A single subscriber to the inbox runs in a background thread and passes
+    each response to the future of the event with the same id,
+    so that many events can wait for their responses at the same time.
+    """
 
-    def send_event(self, payload: DeviceEvent, error_prefix: str = "") -> EventResponse:
-        """Sends an event payload to MSS
+    def __init__(
+        self,
+        device: str = settings.DEFAULT_PREFIX,
+        redis_url: str = settings.RQ_REDIS_URL,
+        subscription_timeout: float = 10,
+    ):
+        """
+        Args:
+            device: The name of this device
+            redis_url: The URL to the redis connection where the PubSub is
+            subscription_timeout: The timeout for subscribing to the inbox
+
+        Raises:
+            TimeoutError: subscription to the inbox took longer than {subscription_timeout}s
+        """
+        self._outbox_name: str = get_outbox_channel_name(device)
+        self._inbox_name: str = get_inbox_channel_name(device)
+        self._pid = os.getpid()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._redis: Redis = get_redis_connection(redis_url)
+        # subscribe messages are not ignored so that the subscription can be confirmed
+        self._inbox: PubSub = self._redis.pubsub()
+        self._inbox.subscribe(**{self._inbox_name: self._handle_response})
+        self._wait_for_subscription(timeout=subscription_timeout)
+        self._thread = self._inbox.run_in_thread(
+            sleep_time=1,
+            daemon=True,
+            exception_handler=_pubsub_thread_exception_handler,
+        )
+
+    @property
+    def is_alive(self) -> bool:
+        """Whether the subscriber of this channel is running in the current process"""
+        return self._pid == os.getpid() and self._thread.is_alive()
+
+    def send_event(
+        self, payload: DeviceEvent, timeout: float = 120, error_prefix: str = ""
+    ) -> EventResponse:
+        """Sends an event payload to MSS and waits for its response
 
         Args:
             payload: the payload to send to MSS
+            timeout: the timeout for receiving a response
             error_prefix: Optional prefix to prepend to error messages
 
         Returns:
@@ -235,39 +281,129 @@ class MssClientPipe(BaseMssClientPipe):
             TimeoutError: {error_prefix}response took longer than timeout
         """
         event_id = payload.id
-        event_json = payload.model_dump_json()
-        self._inbox.subscribe(self._inbox_name)
-        self._redis.publish(self._outbox_name, event_json)
+        future: Future[EventResponse] = Future()
+        with self._lock:
+            self._pending[event_id] = future
 
-        start_time = time.time()
-        while True:
-            if time.time() - start_time > self._timeout:
-                raise TimeoutError(
-                    f"{error_prefix}response took longer than timeout {self._timeout}s"
-                )
+        try:
+            self._redis.publish(self._outbox_name, payload.model_dump_json())
+            response = future.result(timeout=timeout)
+        except TimeoutError:
+            raise TimeoutError(
+                f"{error_prefix}response took longer than timeout {timeout}s"
+            )
+        finally:
+            with self._lock:
+                self._pending.pop(event_id, None)
+
+        if response["status"] != "success":
+            raise ValueError(f"{error_prefix}{response['detail']}")
+
+        return response
+
+    def close(self) -> None:
+        """Stops the subscriber of this channel"""
+        self._thread.stop()
+        self._thread.join(timeout=2)
+
+    def _handle_response(self, message: dict):
+        """Passes the response received on the inbox to the future of its event
+
+        Responses to events sent by other processes are ignored
+
+        Args:
+            message: the message received on the inbox
+        """
+        response = json.loads(message["data"])  # type: EventResponse
+        with self._lock:
+            future = self._pending.pop(response.get("id"), None)
+
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    def _wait_for_subscription(self, timeout: float):
+        """Waits for the subscription to the inbox to be confirmed
+
+        This ensures that no response is published before the subscriber listens
+
+        Args:
+            timeout: the maximum time to wait in seconds
+
+        Raises:
+            TimeoutError: subscription to the inbox took longer than {timeout}s
+        """
+        deadline = time.monotonic() + timeout
+        while (time_left := deadline - time.monotonic()) > 0:
+            message = self._inbox.get_message(timeout=time_left)
+            if message is not None and message["type"] == "subscribe":
+                return
+
+        raise TimeoutError(f"subscription to the inbox took longer than {timeout}s")
+
+
+def get_mss_event_channel(
+    device: str = settings.DEFAULT_PREFIX, redis_url: str = settings.RQ_REDIS_URL
+) -> MssEventChannel:
+    """Gets the MSS event channel shared in this process for the given device and redis URL
+
+    A new channel is created if none exists or if the existing one has stopped
+    e.g. in a forked process.
+
+    Args:
+        device: The name of this device
+        redis_url: The URL to the redis connection where the PubSub is
+
+    Returns:
+        the MSS event channel
+    """
+    key = (device, redis_url)
+    with _MSS_EVENT_CHANNELS_LOCK:
+        channel = _MSS_EVENT_CHANNELS.get(key)
+        if channel is None or not channel.is_alive:
+            channel = MssEventChannel(device=device, redis_url=redis_url)
+            _MSS_EVENT_CHANNELS[key] = channel
+
+        return channel
+
+
+class MssClientPipe(BaseMssClientPipe):
+    """Pipe to MSS client that is synchronous, to be used on the RQ side mainly
+
+    All pipes in a process send their events over one shared MssEventChannel
+    so creating and closing pipes is cheap.
+    """
 
-            channel_resp = self._inbox.get_message(timeout=self._timeout)
-            if channel_resp is None:
-                continue
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._channel = get_mss_event_channel(
+            device=self._device, redis_url=self._redis_url
+        )
+
+    def send_event(self, payload: DeviceEvent, error_prefix: str = "") -> EventResponse:
+        """Sends an event payload to MSS
 
-            response = json.loads(channel_resp["data"])  # type: EventResponse
-            # ignore responses that are not for this event
-            if response["id"] != event_id:
-                continue
+        Args:
+            payload: the payload to send to MSS
+            error_prefix: Optional prefix to prepend to error messages
 
-            if response["status"] != "success":
-                raise ValueError(f"{error_prefix}{response['detail']}")
+        Returns:
+            the event response
 
-            return response
+        Raises:
+            ValueError: {error_prefix}{error message}
+            TimeoutError: {error_prefix}response took longer than timeout
+        """
+        return self._channel.send_event(
+            payload, timeout=self._timeout, error_prefix=error_prefix
+        )
 
     def close(self) -> None:
-        """Close the pipe connection to the MSS client"""
-        self._inbox.unsubscribe()
-        self._inbox.close()
-        self._redis.close()
+        """Close the pipe connection to the MSS client
+
+        The shared channel is left open for the other pipes in this process
+        """
 
     def __enter__(self) -> "MssClientPipe":
-        self._inbox.subscribe(self._inbox_name)
         return self
 
     def __exit__(
@@ -280,12 +416,21 @@ class MssClientPipe(BaseMssClientPipe):
 
 
 class AsyncMssClientPipe(BaseMssClientPipe):
-    """Pipe to MSS client that is asynchronous, to be used on the FastAPI side"""
+    """Pipe to MSS client that is asynchronous, to be used on the FastAPI side
+
+    A reader task subscribed to the inbox passes each response to the future
+    of the event with the same id, so that many events sent through this pipe
+    can wait for their responses at the same time.
+    """
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._redis: AsyncRedis = get_redis_connection(self._redis_url, is_async=True)
-        self._inbox: AsyncPubSub = self._redis.pubsub(ignore_subscribe_messages=True)
+        # subscribe messages are not ignored so that the subscription can be confirmed
+        self._inbox: AsyncPubSub = self._redis.pubsub()
+        self._pending: Dict[str, asyncio.Future[EventResponse]] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._reader_lock = asyncio.Lock()
 
     async def send_event(
         self, payload: DeviceEvent, error_prefix: str = ""
@@ -303,43 +448,103 @@ class AsyncMssClientPipe(BaseMssClientPipe):
             ValueError: {error_prefix}{error message}
             TimeoutError: {error_prefix}response took longer than timeout
         """
-        event_id = payload.id
-        event_json = payload.model_dump_json()
-        await self._inbox.subscribe(self._inbox_name)
-        await self._redis.publish(self._outbox_name, event_json)
-
-        start_time = time.time()
-        while True:
-            # to allow other tasks to run, we wait
-            await asyncio.sleep(0.01)
+        await self._start_reader()
 
-            if time.time() - start_time > self._timeout:
-                raise TimeoutError(
-                    f"{error_prefix}response took longer than timeout {self._timeout}s"
-                )
-
-            channel_resp = await self._inbox.get_message(timeout=self._timeout)
-            if channel_resp is None:
-                continue
+        event_id = payload.id
+        future: asyncio.Future[EventResponse] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._pending[event_id] = future
 
-            response = json.loads(channel_resp["data"])  # type: EventResponse
-            # ignore responses that are not for this event
-            if response["id"] != event_id:
-                continue
+        try:
+            await self._redis.publish(self._outbox_name, payload.model_dump_json())
+            response = await asyncio.wait_for(future, timeout=self._timeout)
+        except TimeoutError:
+            raise TimeoutError(
+                f"{error_prefix}response took longer than timeout {self._timeout}s"
+            )
+        finally:
+            self._pending.pop(event_id, None)
 
-            if response["status"] != "success":
-                raise ValueError(f"{error_prefix}{response['detail']}")
+        if response["status"] != "success":
+            raise ValueError(f"{error_prefix}{response['detail']}")
 
-            return response
+        return response
 
     async def close(self) -> None:
         """Close the pipe connection to the MSS client asynchronously"""
+        if self._reader is not None:
+            self._reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader
+            self._reader = None
+
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
         await self._inbox.unsubscribe()
         await self._inbox.aclose()
         await self._redis.aclose()
 
+    async def _start_reader(self):
+        """Subscribes to the inbox and starts the task reading its responses, if not yet started
+
+        Raises:
+            TimeoutError: subscription to the inbox took longer than timeout
+        """
+        async with self._reader_lock:
+            if self._reader is not None and not self._reader.done():
+                return
+
+            if self._reader is not None:
+                # the previous reader failed, so its connection is discarded
+                await self._inbox.aclose()
+                self._inbox = self._redis.pubsub()
+
+            await self._inbox.subscribe(self._inbox_name)
+            try:
+                await asyncio.wait_for(
+                    self._wait_for_subscription(), timeout=self._timeout
+                )
+            except TimeoutError:
+                raise TimeoutError(
+                    f"subscription to {self._inbox_name} took longer than timeout {self._timeout}s"
+                )
+
+            self._reader = asyncio.create_task(self._read_responses())
+
+    async def _wait_for_subscription(self):
+        """Waits for the confirmation of the subscription to the inbox"""
+        while True:
+            message = await self._inbox.get_message(timeout=self._timeout)
+            if message is not None and message["type"] == "subscribe":
+                return
+
+    async def _read_responses(self):
+        """Passes each response received on the inbox to the future of its event
+
+        Responses to events sent through other pipes are ignored.
+        If the inbox fails, the events still waiting for responses get its error,
+        and the events sent afterwards get a fresh reader.
+        """
+        try:
+            async for message in self._inbox.listen():
+                if message["type"] != "message":
+                    continue
+
+                response = json.loads(message["data"])  # type: EventResponse
+                future = self._pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except Exception as exp:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(exp)
+            err_logger.error(f"error receiving MSS responses: {exp}")
+
     async def __aenter__(self) -> "AsyncMssClientPipe":
-        await self._inbox.subscribe(self._inbox_name)
+        await self._start_reader()
         return self
 
     async def __aexit__(
@@ -365,6 +570,7 @@ class AsyncMssClient(websockets.connect):
         process_exception: Callable[
             [Exception], Exception | None
         ] = _process_websocket_exception,
+        max_in_flight: int = settings.MSS_MAX_IN_FLIGHT_EVENTS,
         **kwargs: Any,
     ):
         """
@@ -376,6 +582,8 @@ class AsyncMssClient(websockets.connect):
             open_timeout: the timeout for opening the websocket in seconds; default = settings.MSS_CONNECTION_TIMEOUT
             redis_url: the redis URL connection to use for PubSub; default = settings.RQ_REDIS_URL
             process_exception: the exception handling function; default = process_exception
+            max_in_flight: the maximum number of events waiting for responses from MSS;
+                default = settings.MSS_MAX_IN_FLIGHT_EVENTS
             kwargs: additional options to pass to websockets.connect
         """
         super().__init__(
@@ -395,6 +603,8 @@ class AsyncMssClient(websockets.connect):
         self._private_key_file: Path = private_key_file
         self._private_key_password: bytes = key_password
         self._device = device
+        self._max_in_flight = max_in_flight
+        self._in_flight = asyncio.BoundedSemaphore(max_in_flight)
 
     def _refresh_auth_headers(self):
         """Refresh the auth headers of the connection as these are based on a timestamp
@@ -418,21 +628,44 @@ class AsyncMssClient(websockets.connect):
     async def _outbox_handler(self, msg: dict) -> None:
         """Handles messages sent to the outbox
 
+        The message is sent to MSS without waiting for its response,
+        which is published to the inbox by the _inbox_handler.
+        At most max_in_flight messages can wait for responses at any time.
+
         Args:
             msg: the message to process
         """
-        await self.connection.send(msg["data"], text=True)
-        response_str = await self.connection.recv(decode=False)
-        await self._redis.publish(self._inbox_pubsub, response_str)
+        await self._in_flight.acquire()
+        try:
+            await self.connection.send(msg["data"], text=True)
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+    async def _inbox_handler(self) -> None:
+        """Publishes the responses from MSS to the inbox as they arrive"""
+        try:
+            while True:
+                response_str = await self.connection.recv(decode=False)
+                with contextlib.suppress(ValueError):
+                    # the response was not for any message in flight
+                    self._in_flight.release()
+                await self._redis.publish(self._inbox_pubsub, response_str)
+        except ConnectionClosed:
+            logging.warning("MSS websocket closed; stopped receiving responses")
 
     async def __aenter__(self) -> ClientConnection:
-        await self.outbox.subscribe(**{self._outbox_pubsub: self._outbox_handler})
+        connection = await super().__aenter__()
+        # messages in flight on the previous connection will never get responses
+        self._in_flight = asyncio.BoundedSemaphore(self._max_in_flight)
         loop = asyncio.get_running_loop()
 
+        self.__inbox_task = loop.create_task(self._inbox_handler())
+        await self.outbox.subscribe(**{self._outbox_pubsub: self._outbox_handler})
         self.__outbox_task = loop.create_task(
             self.outbox.run(exception_handler=_pubsub_exception_handler)
         )
-        return await super().__aenter__()
+        return connection
 
     async def __aexit__(
         self,
@@ -442,6 +675,7 @@ class AsyncMssClient(websockets.connect):
     ) -> None:
         await self.outbox.unsubscribe()
         self.__outbox_task.cancel()
+        self.__inbox_task.cancel()
         await super().__aexit__(exc_type, exc_value, traceback)
 
 
@@ -457,6 +691,22 @@ async def _pubsub_exception_handler(e: BaseException, pubsub: AsyncPubSub):
     raise e
 
 
+def _pubsub_thread_exception_handler(
+    e: BaseException, pubsub: PubSub, thread: PubSubWorkerThread
+):
+    """Handles exceptions raised in the thread running a PubSub
+
+    The thread keeps running, reconnecting to redis if the connection was lost
+
+    Args:
+        e: the exception raised
+        pubsub: the PubSub instance
+        thread: the thread running the PubSub
+    """
+    err_logger.error(f"error receiving MSS responses: {e}")
+    time.sleep(1)
+
+
 def _create_headers(
     private_key_file: Path,
     device: str = "",
@@ -17,9 +17,13 @@ from .service import (
     delete_job,
     delete_user_profile,
     get_job,
+    get_job_result,
+    get_jobs_page,
     get_many_jobs,
     get_recalibration_info,
     init_recalibration,
+    iter_job_events,
+    iter_jobs,
     stop_recalibration,
     submit_booking,
     submit_job_file,
@@ -17,10 +17,11 @@
 #
 """Module containing service for scheduling jobs"""
 import logging
+import re
 from contextlib import suppress
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 from fastapi import UploadFile
 from pydantic import ValidationError
@@ -28,14 +29,25 @@ from rq import exceptions as rq_errors
 from rq.job import Job as RqJob
 from sqlmodel import or_
 
+import settings
+
 from ...libs.device_parameters import get_device_calibration_info
-from ...libs.queues.dtos import Job, JobStatus, QueueContext, Stage, StorageID
+from ...libs.queues.dtos import (
+    Job,
+    JobResult,
+    JobStatus,
+    JobStatusEvent,
+    QueueContext,
+    Stage,
+    StorageID,
+)
 from ...utils.api import GeneralMessage, save_uploaded_file
 from ...utils.datetime import get_utc_now, utc_now_str
 from ...utils.exc import (
     BookingAlreadyActiveError,
     BookingAlreadyCompleteError,
     ConflictError,
+    InvalidRequestError,
     ItemNotFoundError,
     JobAlreadyCancelled,
     NotAuthenticatedError,
@@ -55,9 +67,24 @@ from ..booking.service import (
 from ..booking.store import get_bookings_sql_engine
 from .dtos import RecalibrationInfo
 from .queues import QueuePool
-from .store import get_jobs_store, init_jobs_store
-from .tasks import post_booking_cleanup, recalibrate, reset_idleness_timer
-from .utils import get_rq_job_id
+from .store import (
+    AsyncJobEventsStore,
+    get_async_job_events_store,
+    get_job_results_store,
+    get_jobs_store,
+    init_job_admissions_store,
+    init_jobs_store,
+)
+from .tasks import (
+    post_booking_cleanup,
+    recalibrate,
+    release_admitted_jobs,
+    reset_idleness_timer,
+)
+from .utils import attach_job_results, get_rq_job_id, publish_job_events
+
+# the ids of redis stream entries e.g. "1767225600000-0"
+_EVENT_ID_PATTERN = re.compile(r"^\d+(-\d+)?$")
 
 
 def submit_booking(
@@ -178,6 +205,7 @@ def submit_job_file(
     queues: QueuePool,
     upload_file: UploadFile,
     credentials: MSSTokenClaims,
+    job_file_hash: Optional[str] = None,
 ) -> Job:
     """Submits the job for processing
 
@@ -206,6 +234,7 @@ def submit_job_file(
         queues: the collection of queues that are to run the job.
         upload_file: the job file containing the job to submit for the next steps of processing
         credentials: MSS login details as got from the headers and the parameters or body
+        job_file_hash: the hex SHA-256 digest of the job file if it was validated on upload
 
     Returns:
         the submitted job
@@ -249,13 +278,22 @@ def submit_job_file(
         if active_booking:
             booking_id = active_booking.id
 
-        queues.preprocessing.enqueue(
-            job,
-            context,
-            booking_id=booking_id,
-            job_file=job_file_path,
-            job_id=get_rq_job_id(job_id, Stage.PRE_PROC_Q),
-        )
+        # the job is admitted before it is preprocessed so that it is released
+        # for execution in the order of submission, however long it preprocesses
+        admissions = init_job_admissions_store(connection=redis_conn)
+        admissions.admit(job_id)
+        try:
+            queues.preprocessing.enqueue(
+                job,
+                context,
+                booking_id=booking_id,
+                job_file=job_file_path,
+                job_file_hash=job_file_hash,
+                job_id=get_rq_job_id(job_id, Stage.PRE_PROC_Q),
+            )
+        except Exception as exp:
+            admissions.discard(job_id)
+            raise exp
 
         return job
 
@@ -315,6 +353,12 @@ def cancel_job(
             "updated_at": utc_now_str(),
         },
     )
+    publish_job_events(job_store, [job])
+
+    if job.stage <= Stage.PRE_PROC_W:
+        # the jobs submitted after this one should no longer wait for it
+        init_job_admissions_store(job_store.connection).discard(job_id)
+        queues.general.enqueue(release_admitted_jobs, context)
     return job
 
 
@@ -351,9 +395,11 @@ def delete_job(
         )
 
     job_store = get_jobs_store(url=context["jobs_store_url"])
+    results_store = get_job_results_store(url=context["jobs_store_url"])
 
     try:
         job_store.delete_many((job_id,))
+        results_store.delete_many((job_id,))
     except ValidationError as exp:
         logging.error(f"error deleting job {job_id}: {exp}")
         raise ItemNotFoundError(f"Job {job_id} not found")
@@ -366,6 +412,9 @@ def get_job(
 ) -> Job:
     """Get the job of a given job_id if it belongs to the user or the user is admin
 
+    The results of the job, if any, are loaded from the results store
+    and attached to the job.
+
     Args:
         context: the context of the queue for the job
         job_id: the unique identifier of the job
@@ -379,23 +428,43 @@ def get_job(
         NotAuthenticatedError: user not found
         ItemNotFoundError: Job {job_id} not found
     """
-    booking_db_url = context["booking_db_url"]
-    jobs_store_url = context["jobs_store_url"]
+    job = _get_own_job(
+        context, job_id=job_id, user_id=user_id, is_mss_admin=is_mss_admin
+    )
+    results_store = get_job_results_store(url=context["jobs_store_url"])
+    return attach_job_results(results_store, job)
 
-    bookings_sql_engine = get_bookings_sql_engine(url=booking_db_url)
-    user = get_user(bookings_sql_engine, User.id == user_id)
 
-    if user is None:
-        raise NotAuthenticatedError("user not found")
+def get_job_result(
+    context: QueueContext, job_id: str, user_id: str, is_mss_admin: bool = False
+) -> JobResult:
+    """Get the results of the job of a given job_id if it belongs to the user or the user is admin
 
-    job_store = get_jobs_store(url=jobs_store_url)
-    job: Job = job_store.get_one(job_id)
+    Args:
+        context: the context of the queue for the job
+        job_id: the unique identifier of the job
+        user_id: the user_id of the user requesting the results
+        is_mss_admin: whether the user is an MSS admin
 
-    is_owner = job.user_id == user_id
-    if user.is_admin or is_mss_admin or is_owner:
-        return job
+    Returns:
+        the results of the job
 
-    raise ItemNotFoundError(f"Job {job_id} not found")
+    Raises:
+        NotAuthenticatedError: user not found
+        ItemNotFoundError: Job {job_id} not found
+        ItemNotFoundError: results of job {job_id} not found
+    """
+    job = _get_own_job(
+        context, job_id=job_id, user_id=user_id, is_mss_admin=is_mss_admin
+    )
+    if job.result_info is None:
+        # jobs saved by older versions have their results inline
+        if job.result is not None:
+            return job.result
+        raise ItemNotFoundError(f"results of job {job_id} not found")
+
+    results_store = get_job_results_store(url=context["jobs_store_url"])
+    return results_store.get(job_id)
 
 
 def get_many_jobs(
@@ -405,7 +474,7 @@ def get_many_jobs(
     skip: int = 0,
     limit: int | None = None,
 ) -> List[Job]:
-    """Get the job of a given job_id if it belongs to the user or the user is admin
+    """Get the jobs, newest first, filtered by the given user_id and status
 
     Args:
         context: the context of the queue for the jobs
@@ -417,16 +486,112 @@ def get_many_jobs(
     Returns:
         the list of job
     """
-    jobs_store_url = context["jobs_store_url"]
+    job_store = get_jobs_store(url=context["jobs_store_url"])
+    filters = _get_jobs_filters(user_id=user_id, status=status)
+    return job_store.find_by_index(filters, skip=skip, limit=limit, desc=True)
+
+
+def get_jobs_page(
+    context: QueueContext,
+    user_id: Optional[str] = None,
+    status: Optional[JobStatus] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int | None = None,
+) -> Tuple[List[Job], Optional[str]]:
+    """Get a page of the jobs, newest first, filtered by the given user_id and status
+
+    Args:
+        context: the context of the queue for the jobs
+        user_id: the user_id associated with the jobs; defaults to None i.e. all jobs are returned
+        status: the status of the jobs; defaults to None i.e. all jobs are returned
+        cursor: the cursor returned with the previous page; default is None i.e. the newest job
+        skip: number of records to ignore after the cursor; default is 0
+        limit: maximum number of records to return; default is None.
+
+    Returns:
+        the list of jobs, and the cursor of the next page or None if there are no more pages
+
+    Raises:
+        InvalidRequestError: invalid cursor
+    """
+    job_store = get_jobs_store(url=context["jobs_store_url"])
+    filters = _get_jobs_filters(user_id=user_id, status=status)
+    return job_store.find_page_by_index(
+        filters, cursor=cursor, skip=skip, limit=limit, desc=True
+    )
 
-    job_store = get_jobs_store(url=jobs_store_url)
-    filters = {}
-    if status:
-        filters["status"] = status
-    if user_id:
-        filters["user_id"] = user_id
 
-    return job_store.find_by_index(filters, skip=skip, limit=limit)
+def iter_jobs(
+    context: QueueContext,
+    user_id: Optional[str] = None,
+    status: Optional[JobStatus] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int | None = None,
+) -> Iterator[Job]:
+    """Iterates over the jobs, newest first, filtered by the given user_id and status
+
+    The jobs are read from the store in batches so that they can be streamed
+    without loading all of them in memory.
+
+    Args:
+        context: the context of the queue for the jobs
+        user_id: the user_id associated with the jobs; defaults to None i.e. all jobs are returned
+        status: the status of the jobs; defaults to None i.e. all jobs are returned
+        cursor: the cursor after which to start; default is None i.e. the newest job
+        skip: number of records to ignore after the cursor; default is 0
+        limit: maximum number of records to return; default is None.
+
+    Returns:
+        an iterator of the jobs
+
+    Raises:
+        InvalidRequestError: invalid cursor
+    """
+    job_store = get_jobs_store(url=context["jobs_store_url"])
+    filters = _get_jobs_filters(user_id=user_id, status=status)
+    return job_store.iter_by_index(
+        filters, cursor=cursor, skip=skip, limit=limit, desc=True
+    )
+
+
+def iter_job_events(
+    context: QueueContext,
+    user_id: str,
+    job_id: Optional[str] = None,
+    after: Optional[str] = None,
+    heartbeat_interval: float = settings.JOB_EVENTS_HEARTBEAT_INTERVAL,
+) -> AsyncIterator[List[JobStatusEvent]]:
+    """Iterates over the changes in the statuses and stages of the user's jobs as they happen
+
+    Batches of events are yielded as they are published. An empty batch is yielded
+    whenever no events are published for heartbeat_interval seconds.
+
+    Args:
+        context: the context of the queue for the jobs
+        user_id: the user_id associated with the jobs
+        job_id: the job whose events are to be returned; default = None i.e. all the user's jobs
+        after: the id of the event after which to start; default = None i.e. only new events
+        heartbeat_interval: the seconds to wait for events before yielding an empty batch
+
+    Returns:
+        an async iterator of the batches of events
+
+    Raises:
+        InvalidRequestError: invalid event id
+    """
+    if after is not None and not _EVENT_ID_PATTERN.match(after):
+        raise InvalidRequestError("invalid event id")
+
+    events_store = get_async_job_events_store(url=context["jobs_store_url"])
+    return _iter_job_events(
+        events_store,
+        user_id=user_id,
+        job_id=job_id,
+        after=after,
+        block=int(heartbeat_interval * 1000),
+    )
 
 
 def delete_user_profile(context: QueueContext, queues: QueuePool, user_id: str):
@@ -466,8 +631,12 @@ def delete_user_profile(context: QueueContext, queues: QueuePool, user_id: str):
             rq_errors.InvalidJobOperation, rq_errors.InvalidJobOperationError
         ):
             _cancel_job_in_queues(queues, job)
-        # update cancelled status of the job
-        job_store.update(job.job_id, job_update)
+
+    # update cancelled status of the jobs
+    cancelled_jobs = job_store.update_many(
+        [(job.job_id, job_update) for job in user_pending_jobs]
+    )
+    publish_job_events(job_store, cancelled_jobs)
 
     # cancel bookings of the user
     user_incomplete_bookings = get_many_bookings(
@@ -658,3 +827,97 @@ def _get_current_recalibration_job_id(queues: QueuePool) -> Optional[str]:
         return enqueued_jobs[0]
 
     return None
+
+
+def _get_own_job(
+    context: QueueContext, job_id: str, user_id: str, is_mss_admin: bool = False
+) -> Job:
+    """Get the job, without its results, if it belongs to the user or the user is admin
+
+    Args:
+        context: the context of the queue for the job
+        job_id: the unique identifier of the job
+        user_id: the user_id of the user requesting the job
+        is_mss_admin: whether the user is an MSS admin
+
+    Returns:
+        the job
+
+    Raises:
+        NotAuthenticatedError: user not found
+        ItemNotFoundError: Job {job_id} not found
+    """
+    booking_db_url = context["booking_db_url"]
+    jobs_store_url = context["jobs_store_url"]
+
+    bookings_sql_engine = get_bookings_sql_engine(url=booking_db_url)
+    user = get_user(bookings_sql_engine, User.id == user_id)
+
+    if user is None:
+        raise NotAuthenticatedError("user not found")
+
+    job_store = get_jobs_store(url=jobs_store_url)
+    job: Job = job_store.get_one(job_id)
+
+    is_owner = job.user_id == user_id
+    if user.is_admin or is_mss_admin or is_owner:
+        return job
+
+    raise ItemNotFoundError(f"Job {job_id} not found")
+
+
+def _get_jobs_filters(
+    user_id: Optional[str] = None, status: Optional[JobStatus] = None
+) -> Dict[str, Any]:
+    """Gets the filters for the jobs in the store
+
+    Args:
+        user_id: the user_id associated with the jobs; defaults to None i.e. any user
+        status: the status of the jobs; defaults to None i.e. any status
+
+    Returns:
+        the filters to pass to the jobs store
+    """
+    filters = {}
+    if status:
+        filters["status"] = status
+    if user_id:
+        filters["user_id"] = user_id
+    return filters
+
+
+async def _iter_job_events(
+    events_store: AsyncJobEventsStore,
+    user_id: str,
+    job_id: Optional[str],
+    after: Optional[str],
+    block: int,
+) -> AsyncIterator[List[JobStatusEvent]]:
+    """Iterates over the batches of events of the user's jobs on the job events stream
+
+    Args:
+        events_store: the asyncio reader of the job events stream
+        user_id: the user_id associated with the jobs
+        job_id: the job whose events are to be returned, or None for all the user's jobs
+        after: the id of the event after which to start, or None for only new events
+        block: the milliseconds to wait for events before yielding an empty batch
+
+    Returns:
+        an async iterator of the batches of events
+    """
+    if after is None:
+        # "$" is resolved once so that no events are missed in between reads
+        after = await events_store.get_last_event_id()
+
+    while True:
+        events = await events_store.read(after=after, block=block)
+        if len(events) > 0:
+            after = events[-1].event_id
+
+        matched_events = [
+            event
+            for event in events
+            if event.user_id == user_id and (job_id is None or event.job_id == job_id)
+        ]
+        if len(matched_events) > 0 or len(events) == 0:
+            yield matched_events
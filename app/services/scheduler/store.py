@@ -11,15 +11,367 @@
 # that they have been altered from the originals.
 #
 """Module containing the store for the scheduler service"""
+import pickle
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 from redis import Redis
+from redis import asyncio as async_redis
 
 import settings
 
-from ...libs.queues.dtos import Job
+from ...libs.queues.dtos import Job, JobResult, JobResultInfo, JobStatusEvent
+from ...libs.queues.results import decode_job_result, encode_job_result
+from ...utils.exc import ItemNotFoundError
 from ...utils.redis import get_redis_connection
 from ...utils.redis_store import Collection
 
+_JOB_RESULT_KEY_PREFIX = "__job_result__"
+JOB_EVENTS_STREAM_KEY = "__job_events__"
+_JOB_ADMISSIONS_KEY = "__job_admissions__"
+_JOB_ADMISSIONS_SEQ_KEY = "__job_admissions__::seq"
+_JOB_ADMISSIONS_READY_KEY = "__job_admissions__::ready"
+_JOB_ADMISSIONS_LOCK_KEY = "__job_admissions__::lock"
+_JOB_ADMISSIONS_BATCH_SIZE = 100
+
+_ADMIT_LUA = """
+-- Script to append a job to the ordered set of admitted jobs
+--
+-- KEYS[1] = the sequence counter
+-- KEYS[2] = the ordered set of admitted jobs
+-- ARGV[1] = the job id
+--
+-- Returns the position of the job in the order of admission
+
+local existing = redis.call("ZSCORE", KEYS[2], ARGV[1])
+if existing then
+    return tonumber(existing)
+end
+
+local seq = redis.call("INCR", KEYS[1])
+redis.call("ZADD", KEYS[2], seq, ARGV[1])
+return seq
+"""
+
+_MARK_READY_LUA = """
+-- Script to mark an admitted job as ready to be released
+--
+-- KEYS[1] = the ordered set of admitted jobs
+-- KEYS[2] = the hashmap of the payloads of the ready jobs
+-- ARGV[1] = the job id
+-- ARGV[2] = the payload of the job
+--
+-- Returns 1 if the job was marked as ready or 0 if it is not admitted
+
+if not redis.call("ZSCORE", KEYS[1], ARGV[1]) then
+    return 0
+end
+
+redis.call("HSET", KEYS[2], ARGV[1], ARGV[2])
+return 1
+"""
+
+
+class JobResultsStore:
+    """The store of the results of jobs, kept apart from the jobs themselves
+
+    The results are saved as compressed binary blobs under their own keys
+    so that reading, updating or listing jobs does not have to deserialize
+    all the shot data of their results.
+
+    Attributes:
+        default_ttl: the default TTL in seconds for the results saved
+    """
+
+    def __init__(
+        self, connection: Redis, default_ttl: Optional[float] = settings.JOBS_STORE_TTL
+    ):
+        self._connection = connection
+        self.default_ttl = default_ttl
+
+    def save(self, job_id: str, result: JobResult) -> JobResultInfo:
+        """Saves the results of the given job, overwriting any previous results
+
+        Args:
+            job_id: the unique identifier of the job
+            result: the results of the job
+
+        Returns:
+            the summary of the saved results
+        """
+        data, info = encode_job_result(result)
+        ttl_ms = None if self.default_ttl is None else int(self.default_ttl * 1000)
+        self._connection.set(get_job_result_key(job_id), data, px=ttl_ms)
+        return info
+
+    def get(self, job_id: str) -> JobResult:
+        """Gets the results of the given job
+
+        Args:
+            job_id: the unique identifier of the job
+
+        Returns:
+            the results of the job
+
+        Raises:
+            ItemNotFoundError: results of job {job_id} not found
+        """
+        data = self._connection.get(get_job_result_key(job_id))
+        if data is None:
+            raise ItemNotFoundError(f"results of job {job_id} not found")
+        return decode_job_result(data)
+
+    def delete_many(self, job_ids: Sequence[str]) -> int:
+        """Deletes the results of the given jobs
+
+        Args:
+            job_ids: the unique identifiers of the jobs
+
+        Returns:
+            the number of results deleted
+        """
+        if len(job_ids) == 0:
+            return 0
+        return self._connection.delete(*[get_job_result_key(v) for v in job_ids])
+
+
+class JobEventsStore:
+    """The stream of the changes in the statuses and stages of jobs
+
+    The events are appended to a capped redis stream so that subscribers
+    can follow the jobs without polling them, resuming after the id of
+    the last event they received.
+
+    Attributes:
+        max_length: the approximate maximum number of events kept in the stream
+    """
+
+    def __init__(
+        self, connection: Redis, max_length: int = settings.JOB_EVENTS_STREAM_MAXLEN
+    ):
+        self._connection = connection
+        self.max_length = max_length
+
+    def publish(self, jobs: Sequence[Job]) -> List[str]:
+        """Publishes the current statuses and stages of the given jobs
+
+        Args:
+            jobs: the jobs that have changed
+
+        Returns:
+            the ids of the published events
+        """
+        if len(jobs) == 0:
+            return []
+
+        pipe = self._connection.pipeline(transaction=False)
+        for job in jobs:
+            pipe.xadd(
+                JOB_EVENTS_STREAM_KEY,
+                _to_stream_fields(JobStatusEvent.from_job(job)),
+                maxlen=self.max_length,
+                approximate=True,
+            )
+        return [_to_str(event_id) for event_id in pipe.execute()]
+
+    def read(
+        self, after: str = "0", count: Optional[int] = None, block: Optional[int] = None
+    ) -> List[JobStatusEvent]:
+        """Reads the events published after the given event id
+
+        Args:
+            after: the id of the event after which to read; default = "0" i.e. the oldest
+            count: the maximum number of events to read; default = None i.e. all
+            block: the milliseconds to wait for new events if there are none;
+                default = None i.e. do not wait
+
+        Returns:
+            the events after the given event id, oldest first
+        """
+        response = self._connection.xread(
+            {JOB_EVENTS_STREAM_KEY: after}, count=count, block=block
+        )
+        return _parse_stream_response(response)
+
+
+class JobAdmissionsStore:
+    """The order in which jobs were admitted, used to release them for execution in that order
+
+    Jobs are preprocessed by many workers concurrently so they can finish
+    out of order. Each job is admitted when it is submitted, is marked as ready
+    when it is preprocessed, and is released only after all the jobs admitted
+    before it have been released or discarded. A released job is discarded
+    only after it has been enqueued for execution.
+
+    Attributes:
+        lock_timeout: the seconds after which the lock for releasing jobs expires
+        enqueue_timeout: the seconds after its submission within which an admitted job
+            is expected to be enqueued for preprocessing
+    """
+
+    def __init__(
+        self,
+        connection: Redis,
+        lock_timeout: float = settings.JOB_ADMISSIONS_LOCK_TIMEOUT,
+        enqueue_timeout: float = settings.JOB_ADMISSIONS_ENQUEUE_TIMEOUT,
+    ):
+        self._connection = connection
+        self._admit_script = connection.register_script(_ADMIT_LUA)
+        self._mark_ready_script = connection.register_script(_MARK_READY_LUA)
+        self.lock_timeout = lock_timeout
+        self.enqueue_timeout = enqueue_timeout
+
+    def admit(self, job_id: str) -> int:
+        """Admits the job at the end of the order of admission
+
+        Admitting a job more than once does not change its position.
+
+        Args:
+            job_id: the unique identifier of the job
+
+        Returns:
+            the position of the job in the order of admission
+        """
+        return self._admit_script(
+            keys=[_JOB_ADMISSIONS_SEQ_KEY, _JOB_ADMISSIONS_KEY], args=[job_id]
+        )
+
+    def mark_ready(self, job_id: str, payload: Any) -> bool:
+        """Marks the admitted job as ready to be released
+
+        Args:
+            job_id: the unique identifier of the job
+            payload: the picklable data needed to release the job
+
+        Returns:
+            False if the job is not admitted or was already released or discarded
+        """
+        is_marked = self._mark_ready_script(
+            keys=[_JOB_ADMISSIONS_KEY, _JOB_ADMISSIONS_READY_KEY],
+            args=[job_id, pickle.dumps(payload)],
+        )
+        return is_marked == 1
+
+    def discard(self, job_id: str):
+        """Removes the job from the order of admission, unblocking the jobs behind it
+
+        Args:
+            job_id: the unique identifier of the job
+        """
+        pipe = self._connection.pipeline()
+        pipe.zrem(_JOB_ADMISSIONS_KEY, job_id)
+        pipe.hdel(_JOB_ADMISSIONS_READY_KEY, job_id)
+        pipe.execute()
+
+    def lock(self):
+        """Gets the lock to be held while releasing jobs so that they are released in order
+
+        Returns:
+            the redis lock for releasing jobs
+        """
+        return self._connection.lock(
+            _JOB_ADMISSIONS_LOCK_KEY, timeout=self.lock_timeout
+        )
+
+    def get_ready(
+        self, is_abandoned: Callable[[str], bool] = lambda job_id: False
+    ) -> List[Tuple[str, Any]]:
+        """Gets the ready jobs at the head of the order of admission
+
+        It stops at the first job that is not ready unless that job is abandoned
+        e.g. it was cancelled or its preprocessing was lost, in which case it is discarded.
+        The ready jobs are not discarded, so that they are got again if they are
+        not discarded after they are released e.g. when the releasing worker crashes.
+        It should be called while holding the lock().
+
+        Args:
+            is_abandoned: the predicate for whether a job that is not ready will never be
+
+        Returns:
+            the list of (job_id, payload) of the ready jobs in the order of admission
+        """
+        ready: List[Tuple[str, Any]] = []
+        abandoned: List[str] = []
+        start = 0
+        while True:
+            job_ids = self._connection.zrange(
+                _JOB_ADMISSIONS_KEY, start, start + _JOB_ADMISSIONS_BATCH_SIZE - 1
+            )
+            if len(job_ids) == 0:
+                break
+
+            payloads = self._connection.hmget(_JOB_ADMISSIONS_READY_KEY, job_ids)
+            is_blocked = False
+            for raw_job_id, payload in zip(job_ids, payloads):
+                job_id = _to_str(raw_job_id)
+                if payload is not None:
+                    ready.append((job_id, pickle.loads(payload)))
+                elif is_abandoned(job_id):
+                    abandoned.append(job_id)
+                else:
+                    is_blocked = True
+                    break
+
+            if is_blocked:
+                break
+            start += len(job_ids)
+
+        if len(abandoned) > 0:
+            pipe = self._connection.pipeline()
+            pipe.zrem(_JOB_ADMISSIONS_KEY, *abandoned)
+            pipe.hdel(_JOB_ADMISSIONS_READY_KEY, *abandoned)
+            pipe.execute()
+
+        return ready
+
+
+class AsyncJobEventsStore:
+    """The asyncio reader of the stream of the changes in the statuses and stages of jobs"""
+
+    def __init__(self, connection: async_redis.Redis):
+        self._connection = connection
+
+    async def read(
+        self, after: str = "0", count: Optional[int] = None, block: Optional[int] = None
+    ) -> List[JobStatusEvent]:
+        """Reads the events published after the given event id
+
+        Args:
+            after: the id of the event after which to read; default = "0" i.e. the oldest
+            count: the maximum number of events to read; default = None i.e. all
+            block: the milliseconds to wait for new events if there are none;
+                default = None i.e. do not wait
+
+        Returns:
+            the events after the given event id, oldest first
+        """
+        response = await self._connection.xread(
+            {JOB_EVENTS_STREAM_KEY: after}, count=count, block=block
+        )
+        return _parse_stream_response(response)
+
+    async def get_last_event_id(self) -> str:
+        """Gets the id of the latest event in the stream
+
+        Returns:
+            the id of the latest event or "0-0" if the stream is empty
+        """
+        entries = await self._connection.xrevrange(JOB_EVENTS_STREAM_KEY, count=1)
+        if len(entries) == 0:
+            return "0-0"
+        return _to_str(entries[0][0])
+
+
+def get_job_result_key(job_id: str) -> str:
+    """Gets the redis key of the results of the given job
+
+    Args:
+        job_id: the unique identifier of the job
+
+    Returns:
+        the redis key of the job's results
+    """
+    return f"{_JOB_RESULT_KEY_PREFIX}{job_id}"
+
 
 def get_jobs_store(
     url: str,
@@ -65,3 +417,152 @@ def init_jobs_store(
         default_ttl=default_ttl,
         cleanup_interval=cleanup_interval,
     )
+
+
+def get_job_events_store(
+    url: str, max_length: int = settings.JOB_EVENTS_STREAM_MAXLEN
+) -> JobEventsStore:
+    """Gets the stream for the given url of the changes in the statuses and stages of jobs
+
+    Args:
+        url: the database URL for the redis server
+        max_length: the approximate maximum number of events kept in the stream
+
+    Returns:
+        the stream of the job events
+    """
+    connection = get_redis_connection(url=url)
+    return init_job_events_store(connection=connection, max_length=max_length)
+
+
+def init_job_events_store(
+    connection: Redis, max_length: int = settings.JOB_EVENTS_STREAM_MAXLEN
+) -> JobEventsStore:
+    """Initializes the stream for the given redis connection of the job events
+
+    Args:
+        connection: the connection to the redis server
+        max_length: the approximate maximum number of events kept in the stream
+
+    Returns:
+        the stream of the job events
+    """
+    return JobEventsStore(connection=connection, max_length=max_length)
+
+
+def get_job_admissions_store(url: str) -> JobAdmissionsStore:
+    """Gets the order of admission of jobs for the given url
+
+    Args:
+        url: the database URL for the redis server
+
+    Returns:
+        the store of the order of admission of jobs
+    """
+    connection = get_redis_connection(url=url)
+    return init_job_admissions_store(connection=connection)
+
+
+def init_job_admissions_store(connection: Redis) -> JobAdmissionsStore:
+    """Initializes the order of admission of jobs for the given redis connection
+
+    Args:
+        connection: the connection to the redis server
+
+    Returns:
+        the store of the order of admission of jobs
+    """
+    return JobAdmissionsStore(connection=connection)
+
+
+def get_async_job_events_store(url: str) -> AsyncJobEventsStore:
+    """Gets the asyncio reader for the given url of the stream of job events
+
+    Args:
+        url: the database URL for the redis server
+
+    Returns:
+        the asyncio reader of the stream of the job events
+    """
+    connection = get_redis_connection(url=url, is_async=True)
+    return AsyncJobEventsStore(connection=connection)
+
+
+def get_job_results_store(
+    url: str, default_ttl: Optional[float] = settings.JOBS_STORE_TTL
+) -> JobResultsStore:
+    """Gets the store for the given url for the results of jobs
+
+    Args:
+        url: the database URL for the redis server
+        default_ttl: the default TTL for the results saved
+
+    Returns:
+        the store of the results of jobs
+    """
+    connection = get_redis_connection(url=url)
+    return init_job_results_store(connection=connection, default_ttl=default_ttl)
+
+
+def init_job_results_store(
+    connection: Redis, default_ttl: Optional[float] = settings.JOBS_STORE_TTL
+) -> JobResultsStore:
+    """Initializes the store for the given redis connection for the results of jobs
+
+    Args:
+        connection: the connection to the redis server
+        default_ttl: the default TTL for the results saved
+
+    Returns:
+        the store of the results of jobs
+    """
+    return JobResultsStore(connection=connection, default_ttl=default_ttl)
+
+
+def _to_stream_fields(event: JobStatusEvent) -> Dict[str, str]:
+    """Converts the event into the fields of a redis stream entry
+
+    Args:
+        event: the job event
+
+    Returns:
+        the fields of the event that are set, as strings
+    """
+    data = event.model_dump(mode="json", exclude={"event_id"}, exclude_none=True)
+    return {k: f"{v}" for k, v in data.items()}
+
+
+def _parse_stream_response(response: Any) -> List[JobStatusEvent]:
+    """Parses the response of XREAD on the job events stream
+
+    Args:
+        response: the response of XREAD i.e. [[stream, [(event_id, fields), ...]]]
+
+    Returns:
+        the list of events in the response
+    """
+    if not response:
+        return []
+
+    _, entries = response[0]
+    return [
+        JobStatusEvent(
+            event_id=_to_str(event_id),
+            **{_to_str(k): _to_str(v) for k, v in fields.items()},
+        )
+        for event_id, fields in entries
+    ]
+
+
+def _to_str(value: str | bytes) -> str:
+    """Converts the value returned by redis into a string
+
+    Args:
+        value: the value as returned by redis, depending on decode_responses
+
+    Returns:
+        the value as a string
+    """
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
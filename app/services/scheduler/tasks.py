@@ -18,15 +18,20 @@
 #
 """Module containing the tasks to run on the job"""
 import functools
+import hashlib
+import json
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Optional, Tuple, Type
+from typing import Any, Dict, Optional, Tuple, Type
 
 import redis
 import rq.job
 from pydantic import ValidationError
+from redis.exceptions import LockError
 from rq import Repeat, get_current_job
+from rq.exceptions import NoSuchJobError
+from rq.job import JobStatus as RqJobStatus
 
 from app.libs.qiskit.qobj import PulseQobj
 
@@ -37,6 +42,7 @@ from ...libs.device_parameters import (
 from ...libs.qiskit_providers.utils import json_decoder
 from ...libs.quantum_executor.base.quantum_job import (
     MeasLvl,
+    ResultFormat,
     discriminate_results,
     read_job_from_hdf5,
     xarray_to_list,
@@ -48,11 +54,11 @@ from ...libs.queues.dtos import (
     JobStatus,
     QueueContext,
     Stage,
-    StorageID,
 )
 from ...utils.datetime import get_utc_now
-from ...utils.exc import JobAlreadyCancelled, PostProcessingError
+from ...utils.exc import ItemNotFoundError, JobAlreadyCancelled, PostProcessingError
 from ...utils.redis import get_redis_connection
+from ...utils.redis_store import Collection
 from ...utils.rq import cancel_rq_job
 from ..booking import get_active_booking
 from ..booking.models import Booking
@@ -60,17 +66,34 @@ from ..booking.service import get_booking, get_next_booking
 from ..booking.store import get_bookings_sql_engine
 from ..external.mss.dtos import DeviceEvent, DeviceEventName
 from ..external.mss.service import MssClientPipe
-from .store import get_jobs_store, init_jobs_store
+from .store import (
+    JobAdmissionsStore,
+    get_job_results_store,
+    get_jobs_store,
+    init_job_admissions_store,
+    init_job_results_store,
+    init_jobs_store,
+)
 from .utils import (
-    apply_linear_discriminator,
+    apply_batched_linear_discriminator,
+    attach_job_results,
     decompress_qobj,
+    get_executor,
     get_rq_job_id,
-    init_executor,
     log_job_failure,
     move_file,
+    publish_job_events,
     update_job_in_mss,
     update_job_results,
     update_job_stage,
+    update_jobs_stage,
+)
+
+# the statuses of the rq jobs of preprocessing that will never mark their jobs as ready
+_ABANDONED_RQ_JOB_STATUSES = (
+    RqJobStatus.FAILED,
+    RqJobStatus.STOPPED,
+    RqJobStatus.CANCELED,
 )
 
 
@@ -79,6 +102,7 @@ def preprocess(
     context: QueueContext,
     job_file: Path,
     booking_id: Optional[str] = None,
+    job_file_hash: Optional[str] = None,
 ) -> Tuple[str, QueueContext]:
     """Prepares the job for execution
 
@@ -93,6 +117,8 @@ def preprocess(
         context: the context required when running a job on a queue
         job_file: the path to the job file
         booking_id: the unique identifier of the current booking if any
+        job_file_hash: the hex SHA-256 digest of the job file as validated on upload;
+            if the file still has it, the file is not validated again
 
     Returns:
         the pair of the updated job's job ID and the context
@@ -103,34 +129,41 @@ def preprocess(
     executor_options = context["executor_options"]
 
     try:
-        with job_file.open() as file:
-            job_file_obj = JobFile.model_validate_json(file.read())
-            job_dict = job_file_obj.model_dump()
+        job_dict = _load_job_file(job_file.read_bytes(), content_hash=job_file_hash)
 
         job_id: str = job_dict["job_id"]
         update_job_stage(jobs_store, job_id=job_id, stage=Stage.PRE_PROC_W)
 
         qobj = decompress_qobj(job_dict["params"]["qobj"])
+        result_format = job_dict["params"]["result_format"]
+        if result_format is not None:
+            qobj["config"]["result_format"] = result_format
 
-        # --- In-place decode complex values
-        # [[a,b],[c,d],...] -> [a + ib,c + id,...]
+        # --- In-place decode complex values of the instructions
+        # [a,b] -> a + ib; the pulse library samples are already complex arrays
         json_decoder.decode_pulse_qobj(qobj)
-        executor = init_executor(executor_options)
+        executor = get_executor(executor_options)
         duration, _ = executor.preprocess(
             PulseQobj.from_dict(qobj), job_id=job_id, results_folder=results_folder
         )
         job = jobs_store.update(job.job_id, {"estimated_duration": duration})
 
-        if booking_id is None:
-            return _try_enqueue_on_normal_queue(job, context)
-        else:
-            return _try_enqueue_on_booked_queue(job, context, booking_id=booking_id)
+        # other workers may finish preprocessing jobs submitted after this one earlier,
+        # so the job waits for the jobs before it to be released for execution
+        admissions = init_job_admissions_store(jobs_store.connection)
+        if not admissions.mark_ready(job_id, (booking_id, context)):
+            return _enqueue_for_execution(job, context, booking_id=booking_id)
+
+        _release_admitted_jobs(jobs_store, admissions)
+        return job_id, context
     except JobAlreadyCancelled as exp:
         logging.error(f"{exp}")
+        _discard_admitted_job(jobs_store, job_id=job_id)
         raise exp
 
     except ValidationError as exp:
         log_job_failure(jobs_store, job_id=job_id, reason=f"{exp}")
+        _discard_admitted_job(jobs_store, job_id=job_id)
         raise exp
 
     except Exception as exp:
@@ -138,9 +171,24 @@ def preprocess(
         log_job_failure(
             jobs_store, job_id=job_id, reason="unexpected error during execution"
         )
+        _discard_admitted_job(jobs_store, job_id=job_id)
         raise exp
 
 
+def release_admitted_jobs(context: QueueContext):
+    """Enqueues for execution the preprocessed jobs that are no longer waiting for earlier jobs
+
+    This is run when a job that is still waiting to be preprocessed is cancelled
+    so that the jobs admitted after it are not kept waiting for it.
+
+    Args:
+        context: the context required when running a job on a queue
+    """
+    jobs_store = get_jobs_store(url=context["jobs_store_url"])
+    admissions = init_job_admissions_store(jobs_store.connection)
+    _release_admitted_jobs(jobs_store, admissions)
+
+
 def post_booking_cleanup(booking_id: str, context: QueueContext):
     """Cleans up after the booking of the given booking_id
 
@@ -265,9 +313,13 @@ def execute(
         update_job_stage(jobs_store, job_id=job_id, stage=Stage.EXEC_W)
 
         # Just a locking mechanism to ensure jobs don't interfere with each other
-        with get_executor_lock():
-            executor = init_executor(executor_options)
-            results_file = executor.run(job_id, inputs_folder=preprocessing_dir)
+        with get_executor_lock(
+            connection, name=queue_prefix, purpose="execute"
+        ) as lease:
+            executor = get_executor(executor_options)
+            results_file = executor.run(
+                job_id, inputs_folder=preprocessing_dir, lease=lease
+            )
 
         job: Job = jobs_store.get_one((job_id,))
         if job.status == JobStatus.CANCELLED:
@@ -325,6 +377,7 @@ def postprocess(
 
     with get_redis_connection(context["jobs_store_url"]) as redis_conn:
         jobs_store = init_jobs_store(connection=redis_conn)
+        results_store = init_job_results_store(connection=redis_conn)
         new_file = move_file(results_file_path, new_folder=working_folder, ext=".hdf5")
         logging.info(f"Moved the logfile to {str(new_file)}")
 
@@ -338,20 +391,35 @@ def postprocess(
                     calibration = get_device_calibration_info(
                         redis_conn, backend_name=backend_name
                     )
-                    discriminator = functools.partial(
-                        apply_linear_discriminator, calibration
+                    batch_discriminator = functools.partial(
+                        apply_batched_linear_discriminator, calibration
                     )
 
-                    memory = discriminate_results(
-                        quantum_job,
-                        discriminator=discriminator,
-                        calibration=calibration,
-                    )
-                    job = update_job_results(jobs_store, job_id=job_id, data=memory)
+                    if quantum_job.result_format == ResultFormat.COUNTS:
+                        counts = discriminate_results(
+                            quantum_job,
+                            batch_discriminator=batch_discriminator,
+                            calibration=calibration,
+                            output="counts",
+                        )
+                        job = update_job_results(
+                            jobs_store, results_store, job_id=job_id, counts=counts
+                        )
+                    else:
+                        memory = discriminate_results(
+                            quantum_job,
+                            batch_discriminator=batch_discriminator,
+                            calibration=calibration,
+                        )
+                        job = update_job_results(
+                            jobs_store, results_store, job_id=job_id, data=memory
+                        )
                     update_job_in_mss(mss_client_pipe, payload=job)
                 elif quantum_job.meas_level == MeasLvl.INTEGRATED:
                     memory = xarray_to_list(quantum_job)
-                    job = update_job_results(jobs_store, job_id=job_id, data=memory)
+                    job = update_job_results(
+                        jobs_store, results_store, job_id=job_id, data=memory
+                    )
                     update_job_in_mss(mss_client_pipe, payload=job)
                 else:
                     raise NotImplementedError(
@@ -380,6 +448,9 @@ def postprocessing_success_callback(
     with MssClientPipe() as mss_client_pipe:
         if job.status == JobStatus.SUCCESSFUL:
             job = update_job_stage(jobs_store, job_id=job_id, stage=Stage.FINAL_W)
+            # MSS expects the results on the job
+            results_store = get_job_results_store(context["jobs_store_url"])
+            job = attach_job_results(results_store, job)
             print(f"Job with ID {job_id} has finished")
         else:
             print(f"Job {job_id}, has failed: aborting. Status: {job.status}")
@@ -434,10 +505,12 @@ def recalibrate(
 
     executor_options = context["executor_options"]
     jobs_store_url = context["jobs_store_url"]
+    queue_prefix = context["queue_prefix"]
+    redis_connection = get_current_job().connection
 
     # ensure recalibration runs without interference
-    with get_executor_lock():
-        executor = init_executor(executor_options)
+    with get_executor_lock(redis_connection, name=queue_prefix, purpose="recalibrate"):
+        executor = get_executor(executor_options)
         results = executor.recalibrate(redis_url=jobs_store_url)
 
         if isinstance(results, DeviceCalibration):
@@ -462,11 +535,9 @@ def recalibrate(
     # schedule next run
     if isinstance(interval, float):
         # enqueue next run
-        queue_prefix = context["queue_prefix"]
         is_async = context["is_async"]
         recalibration_queue_timeout = context["recalibration_queue_timeout"]
 
-        redis_connection = get_current_job().connection
         recalibration_queue = get_recalibration_queue(
             prefix=queue_prefix,
             connection=redis_connection,
@@ -491,29 +562,133 @@ def recalibrate(
     return None
 
 
-def _is_job_shorter(storage_id: StorageID, duration: float) -> bool:
-    """Checks if the job of given storage_id takes a shorter time than the duration
+def _get_idle_timer_id(booking_id: str) -> str:
+    """Gets the rq job id for the idle timer job for the booking of given booking_id
 
     Args:
-        storage_id: the storage id for the given job in the expected format of {timestamp}-{uuid}-{duration}
-        duration: the duration that the job should be shorter than
+        booking_id: the unique identifier of the booking
 
     Returns:
-        True if the job's duration is shorter than the given duration, else False
+        the rq job id for the idle timer job
     """
-    return storage_id.duration < duration
+    return f"{booking_id}_idle_timer"
 
 
-def _get_idle_timer_id(booking_id: str) -> str:
-    """Gets the rq job id for the idle timer job for the booking of given booking_id
+def _enqueue_for_execution(
+    job: Job, context: QueueContext, booking_id: Optional[str] = None
+) -> Tuple[str, QueueContext]:
+    """Pushes the preprocessed job to the booked execution queue if there was a booking or the normal one otherwise
 
     Args:
-        booking_id: the unique identifier of the booking
+        job: the job that is to be run
+        context: the context required when running a job on a queue
+        booking_id: the unique identifier of the booking when the job was submitted if any
 
     Returns:
-        the rq job id for the idle timer job
+        the pair of the updated job's job ID and the context
     """
-    return f"{booking_id}_idle_timer"
+    if booking_id is None:
+        return _try_enqueue_on_normal_queue(job, context)
+    return _try_enqueue_on_booked_queue(job, context, booking_id=booking_id)
+
+
+def _release_admitted_jobs(jobs_store: Collection[Job], admissions: JobAdmissionsStore):
+    """Enqueues for execution, in the order they were submitted, the ready jobs at the head of the admissions
+
+    The lock ensures that jobs released by different workers are not enqueued out of order.
+    A job failing to be enqueued is marked as failed without blocking the jobs after it.
+    Each job is discarded from the admissions only after it is enqueued or marked as failed,
+    so that the jobs left over by a worker that crashed midway are released by the next one.
+
+    Args:
+        jobs_store: the store of the jobs
+        admissions: the store of the order in which jobs were admitted
+    """
+    connection = get_current_job().connection
+    is_abandoned = functools.partial(
+        _is_preprocessing_abandoned,
+        jobs_store,
+        connection,
+        enqueue_timeout=admissions.enqueue_timeout,
+    )
+
+    try:
+        with admissions.lock():
+            for job_id, (booking_id, context) in admissions.get_ready(is_abandoned):
+                try:
+                    job = jobs_store.get_one((job_id,))
+                    # jobs already enqueued before a crash are not enqueued again
+                    if not job.status.is_terminal() and job.stage <= Stage.PRE_PROC_W:
+                        _enqueue_for_execution(job, context, booking_id=booking_id)
+                except Exception as exp:
+                    logging.error(f"Job {job_id} could not be enqueued. exp: {exp}")
+                    log_job_failure(
+                        jobs_store,
+                        job_id=job_id,
+                        reason="unexpected error during execution",
+                    )
+                admissions.discard(job_id)
+    except LockError as exp:
+        logging.warning(f"lock for releasing jobs expired before release: {exp}")
+
+
+def _discard_admitted_job(jobs_store: Collection[Job], job_id: str):
+    """Removes the job whose preprocessing failed from the admissions, releasing the jobs after it
+
+    Errors are only logged so that they do not hide the error of the preprocessing.
+
+    Args:
+        jobs_store: the store of the jobs
+        job_id: the unique identifier of the job
+    """
+    try:
+        admissions = init_job_admissions_store(jobs_store.connection)
+        admissions.discard(job_id)
+        _release_admitted_jobs(jobs_store, admissions)
+    except Exception as exp:
+        logging.error(f"error releasing the jobs after job {job_id}: {exp}")
+
+
+def _is_preprocessing_abandoned(
+    jobs_store: Collection[Job],
+    connection: redis.Redis,
+    job_id: str,
+    enqueue_timeout: float,
+) -> bool:
+    """Checks whether the job that is not yet preprocessed will never be
+
+    Args:
+        jobs_store: the store of the jobs
+        connection: the redis connection of the queues
+        job_id: the unique identifier of the job
+        enqueue_timeout: the seconds after its submission within which the job
+            is expected to be enqueued for preprocessing
+
+    Returns:
+        True if the job was deleted, has ended, has been moved on by something else,
+        its rq job failed or was stopped, or it has no rq job long after its submission
+    """
+    try:
+        job: Job = jobs_store.get_one((job_id,))
+    except ItemNotFoundError:
+        return True
+
+    if job.status.is_terminal() or job.stage > Stage.PRE_PROC_W:
+        return True
+
+    try:
+        rq_job = rq.job.Job.fetch(
+            get_rq_job_id(job_id, Stage.PRE_PROC_Q), connection=connection
+        )
+    except NoSuchJobError:
+        # the job might just be admitted and not yet enqueued, unless it was submitted
+        # long ago e.g. the server crashed before enqueueing it or its rq job was removed
+        if job.created_at is None:
+            return True
+        submitted_at = datetime.fromisoformat(job.created_at)
+        return (get_utc_now() - submitted_at).total_seconds() > enqueue_timeout
+
+    return rq_job.get_status(refresh=False) in _ABANDONED_RQ_JOB_STATUSES
 
 
 def _try_enqueue_on_normal_queue(
@@ -633,13 +808,14 @@ def _try_enqueue_on_booked_queue(
         if force_normal_queue:
             _push_to_waitlist(job_id=job_id, context=context)
         elif job.estimated_duration > usable_time:
-            job_store.update(
+            job = job_store.update(
                 job_id,
                 {
                     "status": JobStatus.FAILED,
                     "failure_reason": "job too long for the time left in the booking",
                 },
             )
+            publish_job_events(job_store, [job])
         else:
             # restart the timer after this job is done if this is a job from the booker
             # Otherwise, if the booker sends no more jobs, this queue is taken over by other user's jobs
@@ -730,7 +906,7 @@ def _pop_waitlist_to_booking(
     if isinstance(next_booking, Booking):
         usable_time = (next_booking.start_utc - get_utc_now()).total_seconds()
 
-    next_job_tuple = waitlist.pop_first(_is_job_shorter, usable_time)
+    next_job_tuple = waitlist.pop_first(max_duration=usable_time)
     if next_job_tuple is None:
         return None, context
 
@@ -782,13 +958,57 @@ def _pop_waitlist_to_normal_queue(context: QueueContext):
     if next_booking:
         max_total_duration = (next_booking.start_utc - get_utc_now()).total_seconds()
 
-    job_tuples = waitlist.pop_many(max_total_duration=max_total_duration)
+    job_tuples = list(waitlist.pop_many(max_total_duration=max_total_duration))
     normal_queue = get_normal_execution_queue(
         prefix=queue_prefix,
         connection=redis_connection,
         default_timeout=execution_timeout,
         is_async=is_async,
     )
-    for job, args, kwargs in job_tuples:
-        job = update_job_stage(job_store, job_id=job.job_id, stage=Stage.EXEC_Q)
-        normal_queue.enqueue(job, *args, **kwargs)
+    # the jobs are already off the waitlist, so those deleted in the meantime
+    # are skipped rather than losing the whole batch
+    jobs = update_jobs_stage(
+        job_store,
+        job_ids=[job.job_id for job, _, _ in job_tuples],
+        stage=Stage.EXEC_Q,
+        ignore_missing=True,
+    )
+    job_params = {job.job_id: (args, kwargs) for job, args, kwargs in job_tuples}
+
+    # enqueue all the jobs in one round trip.
+    # Jobs of synchronous queues run on enqueue so they cannot wait for the pipeline
+    pipe = redis_connection.pipeline() if is_async else None
+    for job in jobs:
+        args, kwargs = job_params[job.job_id]
+        normal_queue.enqueue(job, *args, pipeline=pipe, **kwargs)
+
+    if pipe is not None:
+        pipe.execute()
+
+
+def _load_job_file(content: bytes, content_hash: Optional[str]) -> Dict[str, Any]:
+    """Loads the dict of the job file from its contents
+
+    The job file is hashed while it is validated on upload. If the contents still
+    have that hash, they are only parsed, not validated again.
+    Otherwise, e.g. if the file was changed after upload, they are validated in full.
+
+    Args:
+        content: the raw contents of the job file
+        content_hash: the hex SHA-256 digest of the job file if it was validated on upload
+
+    Returns:
+        the dict of the job file
+
+    Raises:
+        ValidationError: the job file is invalid
+    """
+    if content_hash is not None and hashlib.sha256(content).hexdigest() == content_hash:
+        job_dict = json.loads(content)
+        params = job_dict["params"]
+        params.setdefault("result_format", None)
+        if isinstance(params["qobj"], str):
+            params["qobj"] = json.loads(params["qobj"])
+        return job_dict
+
+    return JobFile.model_validate_json(content).model_dump()
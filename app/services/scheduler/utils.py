@@ -13,12 +13,15 @@
 # that they have been altered from the originals.
 #
 """Utility functions for the scheduler service"""
+import logging
+import os
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 from numpy import typing as npt
 from redis import Redis
+from redis.exceptions import RedisError
 from sklearn.utils.extmath import safe_sparse_dot
 
 import settings
@@ -27,7 +30,7 @@ from ...libs.device_parameters import (
     DeviceCalibration,
 )
 from ...libs.quantum_executor.base.executor import QuantumExecutor
-from ...libs.quantum_executor.utils.serialization import iqx_rld
+from ...libs.quantum_executor.utils.serialization import iqx_rld_complex
 from ...libs.queues.dtos import (
     ExecutorOptions,
     Job,
@@ -37,14 +40,15 @@ from ...libs.queues.dtos import (
     JobStatus,
     LogLevel,
     Stage,
-    Timestamps,
 )
 from ...utils.datetime import utc_now_str
+from ...utils.exc import ConflictError, ItemNotFoundError, UpdateConflictError
 from ...utils.redis_store import Collection
 from ..external.mss.dtos import DeviceEvent, DeviceEventName, EventResponse
 from ..external.mss.service import (
     MssClientPipe,
 )
+from .store import JobResultsStore, init_job_events_store
 
 _STAGE_TIMESTAMPS_MAP: Dict[Stage, Tuple[Tuple[JobStage, JobEvent], ...]] = {
     Stage.REG_Q: (),
@@ -71,6 +75,13 @@ _STAGE_STATUS_MAP: Dict[Stage, JobStatus] = {
     Stage.FINAL_W: JobStatus.SUCCESSFUL,
 }
 
+_MAX_STAGE_UPDATE_RETRIES = 10
+
+# the executors kept alive across rq jobs in this process, by backend name
+_EXECUTOR_REGISTRY: Dict[
+    str, Tuple[ExecutorOptions, Optional[int], QuantumExecutor]
+] = {}
+
 
 def log_job_msg(message: str, level: LogLevel = LogLevel.INFO) -> None:
     """Save message to job supervisor log file.
@@ -129,7 +140,9 @@ def get_rq_job_id(quantum_job_id: str, stage: Stage) -> str:
 def update_job_stage(jobs_db: Collection[Job], job_id: str, stage: Stage) -> Job:
     """Updates the job's stage in the database
 
-    This also updates the timestamps and the status of the job
+    This also updates the timestamps and the status of the job.
+    Stages only move forward so if the job is already at or beyond the given stage,
+    e.g. because another worker got to it first, it is left unchanged.
 
     Args:
         jobs_db: the collection containing jobs
@@ -139,24 +152,86 @@ def update_job_stage(jobs_db: Collection[Job], job_id: str, stage: Stage) -> Job
     Returns:
         the updated job
     """
-    key = (job_id,)
-    job: Job = jobs_db.get_one(key)
+    job, is_updated = _update_job_stage(jobs_db, job_id=job_id, stage=stage)
+    if is_updated:
+        publish_job_events(jobs_db, [job])
+    return job
+
+
+def update_jobs_stage(
+    jobs_db: Collection[Job],
+    job_ids: Sequence[str],
+    stage: Stage,
+    ignore_missing: bool = False,
+) -> List[Job]:
+    """Updates the stage of many jobs in the database at once
+
+    This also updates the timestamps and the statuses of the jobs.
+    Like update_job_stage, the jobs that are already at or beyond the given stage
+    are left unchanged.
+
+    Args:
+        jobs_db: the collection containing jobs
+        job_ids: the unique identifiers of the jobs
+        stage: the stage to set on the jobs
+        ignore_missing: whether to leave out the jobs that are not found
+            instead of raising an error; default = False
+
+    Returns:
+        the updated jobs, in the order of the job_ids
 
+    Raises:
+        ItemNotFoundError: {job_ids} not found
+    """
+    jobs: List[Job] = jobs_db.find_by_keys(*[(job_id,) for job_id in job_ids])
+    if len(jobs) != len(job_ids):
+        found_ids = {job.job_id for job in jobs}
+        missing_ids = [job_id for job_id in job_ids if job_id not in found_ids]
+        if not ignore_missing:
+            raise ItemNotFoundError(f"{missing_ids} not found")
+
+        logging.warning(f"jobs {missing_ids} not found. Skipping them...")
+        job_ids = [job_id for job_id in job_ids if job_id in found_ids]
+
+    jobs_map = {job.job_id: job for job in jobs}
+    stale_jobs = [job for job in jobs if job.stage < stage]
     current_timestamp = utc_now_str()
-    timestamps = _get_next_timestamps(
-        job, next_stage=stage, current_time=current_timestamp
-    )
-    status = _get_next_status(job, next_stage=stage)
+    try:
+        updated_jobs = jobs_db.update_many(
+            [
+                ((job.job_id,), _get_stage_updates(job, stage, current_timestamp))
+                for job in stale_jobs
+            ],
+            expected=[{"stage": job.stage, "status": job.status} for job in stale_jobs],
+        )
+    except UpdateConflictError as exp:
+        # some jobs were changed by other workers in between; the rest are updated
+        # already so only the changed ones are retried, one by one
+        updated_jobs = exp.updated_items
+        for (job_id,) in exp.keys:
+            job, is_updated = _update_job_stage(jobs_db, job_id=job_id, stage=stage)
+            jobs_map[job_id] = job
+            if is_updated:
+                updated_jobs.append(job)
 
-    return jobs_db.update(
-        key,
-        {
-            "status": status,
-            "stage": stage,
-            "timestamps": timestamps,
-            "updated_at": current_timestamp,
-        },
-    )
+    jobs_map.update({job.job_id: job for job in updated_jobs})
+    publish_job_events(jobs_db, updated_jobs)
+    return [jobs_map[job_id] for job_id in job_ids]
+
+
+def publish_job_events(jobs_db: Collection[Job], jobs: Sequence[Job]):
+    """Publishes the current statuses and stages of the jobs on the job events stream
+
+    Publishing is best-effort; the jobs are already saved so failures are only logged.
+
+    Args:
+        jobs_db: the collection containing the jobs
+        jobs: the jobs that have changed
+    """
+    try:
+        init_job_events_store(jobs_db.connection).publish(jobs)
+    except RedisError as exp:
+        logging.error(f"error publishing job events: {exp}")
 
 
 def log_job_failure(jobs_db: Collection[Job], job_id: str, reason: str) -> Job:
@@ -178,6 +253,7 @@ def log_job_failure(jobs_db: Collection[Job], job_id: str, reason: str) -> Job:
             "updated_at": utc_now_str(),
         },
     )
+    publish_job_events(jobs_db, [job])
 
     log_job_msg(
         f"Job {job_id} failed at {job.stage.verbose_name} due to {reason}",
@@ -188,27 +264,63 @@ def log_job_failure(jobs_db: Collection[Job], job_id: str, reason: str) -> Job:
 
 
 def update_job_results(
-    jobs_db: Collection[Job], job_id: str, data: List[List[str]]
+    jobs_db: Collection[Job],
+    results_db: JobResultsStore,
+    job_id: str,
+    data: Optional[List[List[str]]] = None,
+    counts: Optional[List[Dict[str, int]]] = None,
 ) -> Job:
     """Updates the results of the job and returns the updated job
 
+    The results are saved in the results store and only their summary is saved
+    on the job itself. The returned job however has its results attached.
+
     Args:
         jobs_db: the collection containing job items
+        results_db: the store containing the results of jobs
         job_id: the unique identifier of the job
-        data: the discriminated results from the quantum job
+        data: the discriminated results from the quantum job; default = None
+        counts: the number of shots per hex string of each experiment; default = None
 
     Returns:
-        the updated job
+        the updated job, with its results attached
     """
-    return jobs_db.update(
+    extra_results = {} if counts is None else {"counts": counts}
+    result = JobResult(memory=data or [], **extra_results)
+    result_info = results_db.save(job_id, result)
+    job = jobs_db.update(
         (job_id,),
         {
             "status": JobStatus.SUCCESSFUL,
-            "result": JobResult(memory=data),
+            "result_info": result_info,
             "download_url": f"{settings.BCC_MACHINE_ROOT_URL}/logfiles/{job_id}",
             "updated_at": utc_now_str(),
         },
     )
+    publish_job_events(jobs_db, [job])
+    return job.model_copy(update={"result": result})
+
+
+def attach_job_results(results_db: JobResultsStore, job: Job) -> Job:
+    """Attaches the results in the results store to the given job if it has any
+
+    Args:
+        results_db: the store containing the results of jobs
+        job: the job to attach the results to
+
+    Returns:
+        a copy of the job with its results attached, or the same job if it has no results
+    """
+    if job.result_info is None or job.result is not None:
+        return job
+
+    try:
+        result = results_db.get(job.job_id)
+    except ItemNotFoundError:
+        logging.warning(f"results of job {job.job_id} not found")
+        return job
+
+    return job.model_copy(update={"result": result})
 
 
 def update_job_in_mss(mss_client_pipe: MssClientPipe, payload: Job) -> EventResponse:
@@ -275,13 +387,45 @@ def apply_linear_discriminator(
     return (scores.ravel() > 0).astype(np.int_)
 
 
+def apply_batched_linear_discriminator(
+    device_calibration: DeviceCalibration,
+    qubit_idxs: List[int],
+    iq_points: npt.NDArray[np.complex128],
+) -> npt.NDArray[np.int8]:
+    """
+    Discriminates the IQ points of many qubits at once with their linear discriminators
+
+    The coefficients of the linear discriminators of the qubits are stacked
+    so that all qubits are discriminated in one batched matrix multiplication.
+
+    Args:
+        device_calibration: calibration data of the device
+        qubit_idxs: IDs of the qubits to discriminate
+        iq_points: (qubits x shots) array of IQ points from the measurement
+
+    Returns:
+        (qubits x shots) array of the discriminated 0 and 1 states
+    """
+    coefficients, intercepts = _get_linear_discriminator_params(
+        device_calibration, tuple(qubit_idxs)
+    )
+
+    # (qubits, 1, 2) @ (qubits, 2, shots) -> (qubits, 1, shots)
+    data = np.stack((iq_points.real, iq_points.imag), axis=1)
+    scores = np.matmul(coefficients[:, np.newaxis, :], data)[:, 0, :]
+    scores += intercepts[:, np.newaxis]
+
+    return (scores > 0).astype(np.int8)
+
+
 def decompress_qobj(qobj_dict: Dict[str, Any]) -> Dict[str, Any]:
     """Reverses the compression done on the qobj at the SDK level
 
     Before submission, the qobj dict was compressed to ease
     transportation. This compression is reversed here.
 
-    Note that this decompression is done in-place
+    Note that this decompression is done in-place and that the samples of
+    the pulse library become complex128 numpy arrays
 
     Args:
         qobj_dict: the dict of the PulseQobj to decompress
@@ -290,9 +434,9 @@ def decompress_qobj(qobj_dict: Dict[str, Any]) -> Dict[str, Any]:
         A QObject dict that is decompressed
     """
     # --- In-place RLD pulse library
-    # [([a,b], 2),...] -> [[a,b],[a,b],...]
+    # [([a,b], 2),...] -> array([a + ib, a + ib,...])
     for pulse in qobj_dict["config"]["pulse_library"]:
-        pulse["samples"] = iqx_rld(pulse["samples"])
+        pulse["samples"] = iqx_rld_complex(pulse["samples"])
 
     return qobj_dict
 
@@ -347,6 +491,121 @@ def init_executor(options: ExecutorOptions, reset: bool = False) -> QuantumExecu
     )
 
 
+def get_executor(options: ExecutorOptions) -> QuantumExecutor:
+    """Gets the long-lived executor of this process, initializing it if need be
+
+    The executor is kept alive across rq jobs and is only rebuilt if the
+    executor options or the calibration seed file change.
+    This requires the rq worker not to fork a new process for each job
+    e.g. rq.SimpleWorker
+
+    It only connects to the hardware while running the experiments of a job,
+    under the executor lease, so that the preprocessing workers just compile.
+
+    Args:
+        options: the executor options useful to initialize the executor
+
+    Returns:
+        An initialized quantum executor
+    """
+    seed_version = _get_file_version(options.calibration_seed_file)
+    try:
+        cached_options, cached_seed_version, executor = _EXECUTOR_REGISTRY[
+            options.backend_name
+        ]
+        if cached_options == options and cached_seed_version == seed_version:
+            return executor
+
+        logging.info(f"executor for {options.backend_name} is stale. Rebuilding...")
+        try:
+            executor.close()
+        except Exception as exp:
+            logging.warning(f"failed to close stale executor: {exp}")
+    except KeyError:
+        pass
+
+    executor = init_executor(options)
+    _EXECUTOR_REGISTRY[options.backend_name] = (options, seed_version, executor)
+    return executor
+
+
+def _get_file_version(file_path: Optional[os.PathLike[str]]) -> Optional[int]:
+    """Gets the version of the file as its last modification time in nanoseconds
+
+    Args:
+        file_path: the path to the file
+
+    Returns:
+        the modification time of the file or None if it does not exist
+    """
+    if file_path is None:
+        return None
+
+    try:
+        return os.stat(file_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _update_job_stage(
+    jobs_db: Collection[Job], job_id: str, stage: Stage
+) -> Tuple[Job, bool]:
+    """Moves the job forward to the given stage unless it is already at or beyond it
+
+    The job is only updated if its stage and status are still the ones it was read with,
+    otherwise it is read again and retried so that concurrent workers cannot
+    move it back to an earlier stage.
+
+    Args:
+        jobs_db: the collection containing jobs
+        job_id: the unique identifier of jobs
+        stage: the stage to set on the job
+
+    Returns:
+        the tuple of the job and whether it was updated
+
+    Raises:
+        ItemNotFoundError: '{job_id}' not found
+        ConflictError: '{job_id}' kept being changed concurrently
+    """
+    key = (job_id,)
+    for _ in range(_MAX_STAGE_UPDATE_RETRIES):
+        job: Job = jobs_db.get_one(key)
+        if job.stage >= stage:
+            return job, False
+
+        try:
+            job = jobs_db.update(
+                key,
+                _get_stage_updates(job, stage, utc_now_str()),
+                expected={"stage": job.stage, "status": job.status},
+            )
+            return job, True
+        except ConflictError:
+            continue
+
+    raise ConflictError(f"'{job_id}' kept being changed concurrently")
+
+
+def _get_stage_updates(job: Job, stage: Stage, current_time: str) -> Dict[str, Any]:
+    """Gets the updates to move the given job to the given stage
+
+    Args:
+        job: the quantum job
+        stage: the stage this job is to go to
+        current_time: the current timestamp as a string
+
+    Returns:
+        the partial updates of the job
+    """
+    return {
+        "status": _get_next_status(job, next_stage=stage),
+        "stage": stage,
+        "timestamps": _get_next_timestamps(next_stage=stage, current_time=current_time),
+        "updated_at": current_time,
+    }
+
+
 def _get_next_status(job: Job, next_stage: Stage) -> JobStatus:
     """Gets the next status given a job and the next stage
 
@@ -363,27 +622,25 @@ def _get_next_status(job: Job, next_stage: Stage) -> JobStatus:
     return status
 
 
-def _get_next_timestamps(job: Job, next_stage: Stage, current_time: str) -> Timestamps:
-    """Gets the next timestamps for the given job and the next stage
+def _get_next_timestamps(
+    next_stage: Stage, current_time: str
+) -> Dict[JobStage, Dict[JobEvent, str]]:
+    """Gets the timestamps to set when a job goes to the next stage
+
+    Only the new timestamps are returned so that they are merged into
+    the stored timestamps of the job field by field.
 
     Args:
-        job: the quantum job
-        next_stage: the next stage this job is to go to
+        next_stage: the next stage the job is to go to
         current_time: the current timestamp as a string
 
     Returns:
-        the next timestamps for that job
+        the new timestamps for that job
     """
-    timestamps = job.timestamps
-    if timestamps is None:
-        timestamps = Timestamps()
-
-    new_timestamps = {
-        stage_name: {timestamp_label: current_time}
-        for stage_name, timestamp_label in _STAGE_TIMESTAMPS_MAP[next_stage]
-    }
-
-    return timestamps.with_updates(new_timestamps)
+    new_timestamps: Dict[JobStage, Dict[JobEvent, str]] = {}
+    for stage_name, timestamp_label in _STAGE_TIMESTAMPS_MAP[next_stage]:
+        new_timestamps.setdefault(stage_name, {})[timestamp_label] = current_time
+    return new_timestamps
 
 
 def _get_redis_url(redis: Redis) -> str:
@@ -415,3 +672,27 @@ def _get_redis_url(redis: Redis) -> str:
         scheme = "rediss"
 
     return f"{scheme}://{auth_str}{host}:{port}/{db}"
+
+
+def _get_linear_discriminator_params(
+    device_calibration: DeviceCalibration, qubit_idxs: Tuple[int, ...]
+) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """Gets the stacked coefficients and intercepts of the linear discriminators of the qubits
+
+    Args:
+        device_calibration: calibration data of the device
+        qubit_idxs: IDs of the qubits
+
+    Returns:
+        the tuple of the (qubits x 2) array of coefficients and the (qubits,) array of intercepts
+    """
+    discriminator_ = device_calibration.discriminators["lda"]
+    params = [discriminator_[f"q{qubit_idx}"] for qubit_idx in qubit_idxs]
+
+    coefficients = np.array(
+        [[param["coef_0"], param["coef_1"]] for param in params], dtype=np.float64
+    ).reshape(len(params), 2)
+    intercepts = np.array(
+        [np.ravel(param["intercept"])[0] for param in params], dtype=np.float64
+    )
+    return coefficients, intercepts
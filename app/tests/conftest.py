@@ -60,6 +60,7 @@ from sqlmodel import SQLModel
 
 from ..libs.queues.dtos import Job
 from ..services.scheduler.queues import QueuePool
+from ..utils.sql_db import dispose_sql_engines
 from .utils.analysis import MockLinearDiscriminantAnalysis
 from .utils.fixtures import get_fixture_path, load_fixture
 from .utils.mocks import make_attr_verbose
@@ -518,6 +519,9 @@ def _clear_test_db(url: str = TEST_BOOKING_DB_URL):
     db = create_engine(url)
     SQLModel.metadata.drop_all(db)
 
+    # the shared engines should create the tables afresh
+    dispose_sql_engines()
+
 
 class BasicBookingInfo(TypedDict):
     """The simplified basic booking info"""
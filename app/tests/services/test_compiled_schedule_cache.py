@@ -0,0 +1,168 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the cache of compiled quantify schedules"""
+from types import SimpleNamespace
+
+import pytest
+import toml
+
+from app.libs.device_parameters.dtos import BackendConfig, DeviceCalibration
+from app.libs.qiskit.qobj import PulseQobj
+from app.tests.conftest import HAS_QUANTIFY
+from app.tests.utils.env import TEST_BACKEND_SETTINGS_FILE, TEST_QUANTIFY_SEED_FILE
+from app.tests.utils.fixtures import get_fixture_path, load_fixture
+
+_QUANTIFY_CONFIG_FILE = get_fixture_path("two-qubit_quantify-config.json")
+
+
+@pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
+def test_schedule_hash_ignores_random_labels():
+    """Schedules built separately from the same qobj have the same hash"""
+    from app.libs.quantum_executor.quantify.cache import get_schedule_hash
+
+    first = _build_schedule()
+    second = _build_schedule()
+
+    assert list(first.schedulables.keys()) != list(second.schedulables.keys())
+    assert get_schedule_hash(first) == get_schedule_hash(second)
+
+
+@pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
+def test_cache_key_depends_on_calibration():
+    """Cache keys change when the calibration version changes"""
+    from app.libs.quantum_executor.quantify.cache import get_cache_key
+
+    schedule = _build_schedule()
+    key = get_cache_key(schedule, hardware_config_hash="h", calibration_version="1")
+    same_key = get_cache_key(
+        schedule, hardware_config_hash="h", calibration_version="1"
+    )
+    new_key = get_cache_key(schedule, hardware_config_hash="h", calibration_version="2")
+
+    assert key == same_key
+    assert key != new_key
+
+
+@pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
+def test_in_memory_cache_evicts_least_recently_used(tmp_path):
+    """The in-memory cache evicts the least recently used entry when full"""
+    from app.libs.quantum_executor.quantify.cache import CompiledScheduleCache
+
+    cache = CompiledScheduleCache(folder=tmp_path, max_size=2, max_disk_size=0)
+    cache.set("a", "compiled-a")
+    cache.set("b", "compiled-b")
+    # access 'a' so that 'b' becomes the least recently used
+    cache.get("a")
+    cache.set("c", "compiled-c")
+
+    assert cache.get("a") == "compiled-a"
+    assert cache.get("b") is None
+    assert cache.get("c") == "compiled-c"
+
+    cache.clear()
+    assert cache.get("a") is None
+
+
+@pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
+def test_compiled_schedule_loaded_from_disk(tmp_path):
+    """A compiled schedule saved by one cache is loaded from disk by a new one"""
+    from quantify_scheduler.schedules import CompiledSchedule
+
+    from app.libs.quantum_executor.quantify.cache import CompiledScheduleCache
+
+    compiled = _compile_schedule(_build_schedule())
+    CompiledScheduleCache(folder=tmp_path, max_size=2).set("a", compiled)
+
+    # a new cache, as after a restart of the worker, starts with an empty memory
+    cache = CompiledScheduleCache(folder=tmp_path, max_size=2)
+    assert cache._entries == {}
+    got = cache.get("a")
+
+    assert isinstance(got, CompiledSchedule)
+    assert got.to_json() == compiled.to_json()
+    assert list(cache._entries) == ["a"]
+
+
+@pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
+def test_calibration_version_survives_restarts(tmp_path):
+    """The calibration version is the last_calibrated saved in the seed file"""
+    from app.libs.quantum_executor.quantify.cache import get_file_hash
+    from app.libs.quantum_executor.quantify.executor import _get_calibration_version
+
+    last_calibrated = "2026-10-18T10:00:00.000000Z"
+    seed_data = toml.load(TEST_QUANTIFY_SEED_FILE)
+    seed_file = tmp_path / "calibration.seed.toml"
+    seed_file.write_text(toml.dumps(seed_data))
+
+    # seed files not written by a recalibration have no last_calibrated
+    assert _get_calibration_version(seed_file) == get_file_hash(seed_file)
+
+    seed_data["calibration_config"]["last_calibrated"] = last_calibrated
+    seed_file.write_text(toml.dumps(seed_data))
+    backend_config = BackendConfig.from_toml(
+        TEST_BACKEND_SETTINGS_FILE, seed_file=seed_file
+    )
+
+    assert _get_calibration_version(seed_file) == last_calibrated
+    assert DeviceCalibration.from_config(backend_config).last_calibrated == (
+        last_calibrated
+    )
+
+
+def _build_schedule():
+    """Builds the quantify schedule for the first experiment in the two-qubit fixture"""
+    from app.libs.quantum_executor.quantify.experiment import QuantifyExperiment
+    from app.libs.quantum_executor.quantify.utils.config import load_quantify_config
+    from app.libs.quantum_executor.quantify.utils.portclock import generate_hardware_map
+
+    qcfg = load_quantify_config(_QUANTIFY_CONFIG_FILE)
+    hardware_map = generate_hardware_map(["q0", "q1"], {"u0": ("q0", "q1")}, qcfg)
+
+    qobj_dict = load_fixture("two-qubit_cz_qobj.json")
+    qobj = PulseQobj.from_dict(qobj_dict.get("params", {}).get("qobj", qobj_dict))
+    native_cfg = SimpleNamespace(
+        acq_return_type="append",
+        protocol=SimpleNamespace(value="SSBIntegrationComplex"),
+        bin_mode="append",
+        meas_level=qobj.config.meas_level,
+        meas_return=qobj.config.meas_return,
+        meas_return_cols=getattr(qobj.config, "memory_slot_size", 1),
+        n_qubits=qobj.config.n_qubits,
+        shots=qobj.config.shots,
+    )
+    expt = QuantifyExperiment.from_qobj_expt(
+        name="exp",
+        expt=qobj.experiments[0],
+        qobj_config=qobj.config,
+        native_config=native_cfg,
+        hardware_map=hardware_map,
+    )
+    return expt.schedule
+
+
+def _compile_schedule(schedule):
+    """Compiles the schedule for the hardware of the two-qubit fixture"""
+    from quantify_scheduler.backends.graph_compilation import SerialCompiler
+    from quantify_scheduler.device_under_test.quantum_device import QuantumDevice
+
+    from app.libs.quantum_executor.quantify.utils.config import load_quantify_config
+
+    quantum_device = QuantumDevice("cache_test_device")
+    try:
+        quantum_device.hardware_config(load_quantify_config(_QUANTIFY_CONFIG_FILE))
+        compiler = SerialCompiler(name="cache_test_compiler")
+        return compiler.compile(
+            schedule=schedule, config=quantum_device.generate_compilation_config()
+        )
+    finally:
+        quantum_device.close()
@@ -0,0 +1,104 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the lease in redis on the quantum executor"""
+import time
+
+import pytest
+
+from app.libs.quantum_executor.utils.connections import (
+    get_executor_lock,
+    get_executor_lock_metrics,
+)
+from app.utils.exc import ExecutorLeaseLostError
+
+
+def test_executor_lock_is_exclusive(redis_client):
+    """Only one holder has the lease at a time, each acquisition with a greater lease token"""
+    first_lock = get_executor_lock(redis_client, name="foo", purpose="execute")
+    second_lock = get_executor_lock(redis_client, name="foo", purpose="recalibrate")
+    other_lock = get_executor_lock(redis_client, name="bar", purpose="execute")
+
+    with first_lock:
+        with pytest.raises(TimeoutError):
+            second_lock.acquire(timeout=0.3)
+        # executors of other backends are not blocked
+        with other_lock:
+            pass
+        first_lock.ensure_held()
+        first_token = first_lock.token
+
+    with second_lock:
+        second_lock.ensure_held()
+        assert second_lock.token > first_token
+
+    with pytest.raises(ExecutorLeaseLostError):
+        second_lock.ensure_held()
+
+
+def test_executor_lock_renewal(redis_client):
+    """The lease is renewed while it is held, beyond its TTL"""
+    lock = get_executor_lock(redis_client, name="foo", purpose="execute", ttl=0.3)
+    other_lock = get_executor_lock(redis_client, name="foo", purpose="execute")
+
+    with lock:
+        time.sleep(1)
+        lock.ensure_held()
+        with pytest.raises(TimeoutError):
+            other_lock.acquire(timeout=0)
+
+
+def test_executor_lock_expiry(redis_client):
+    """The lease of a holder that stops renewing it expires, which that holder can tell"""
+    crashed_lock = get_executor_lock(
+        redis_client, name="foo", purpose="execute", ttl=0.3
+    )
+    crashed_lock.acquire()
+    # simulate a crash of the holder by stopping its renewals
+    crashed_lock._stop_renewal.set()
+
+    with get_executor_lock(redis_client, name="foo", purpose="recalibrate") as lock:
+        assert lock.token > crashed_lock.token
+
+        with pytest.raises(ExecutorLeaseLostError):
+            crashed_lock.ensure_held()
+
+        # releasing the expired lease does not free the new holder's lease
+        crashed_lock.release()
+        lock.ensure_held()
+
+
+def test_executor_lock_metrics(redis_client):
+    """The acquisitions and waits for the lease are recorded by purpose"""
+    with get_executor_lock(redis_client, name="foo", purpose="execute"):
+        pass
+
+    first_lock = get_executor_lock(redis_client, name="foo", purpose="execute")
+    second_lock = get_executor_lock(redis_client, name="foo", purpose="recalibrate")
+    first_lock.acquire()
+    second_lock.poll_interval = 0.05
+    redis_client.pexpire("__executor_lease__::foo", 300)
+    first_lock._stop_renewal.set()
+    with second_lock:
+        pass
+
+    got = get_executor_lock_metrics(redis_client, name="foo")
+
+    assert [(item.purpose, item.acquisitions) for item in got] == [
+        ("execute", 2),
+        ("recalibrate", 1),
+    ]
+    # the uncontended acquisitions only wait for their own round trips to redis
+    assert got[0].max_wait_seconds < 0.05
+    assert got[1].max_wait_seconds == got[1].total_wait_seconds
+    assert got[1].total_wait_seconds > 0.2
+    assert get_executor_lock_metrics(redis_client, name="bar") == []
@@ -0,0 +1,90 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the per-process registry of long-lived executors"""
+import dataclasses
+import os
+
+import pytest
+
+from app.libs.device_parameters import BackendConfig
+from app.libs.queues.dtos import ExecutorOptions
+from app.services.scheduler import utils
+from app.tests.utils.fixtures import get_fixture_path
+
+_BACKEND_CONFIG_FILE = get_fixture_path("backend_config.simq1.toml")
+_SEED_FILE = get_fixture_path("qiskit_pulse_1q.seed.toml")
+
+
+@pytest.fixture
+def mock_init_executor(mocker):
+    """Patches init_executor to return a new mock executor on every call"""
+    mocker.patch.dict(utils._EXECUTOR_REGISTRY, clear=True)
+    yield mocker.patch.object(
+        utils, "init_executor", side_effect=lambda *args, **kw: mocker.MagicMock()
+    )
+
+
+def test_get_executor_reuses_executor(mock_init_executor, tmp_path):
+    """get_executor returns the same executor for the same options and seed file"""
+    options = _get_executor_options(tmp_path)
+
+    first = utils.get_executor(options)
+    second = utils.get_executor(dataclasses.replace(options))
+
+    assert first is second
+    assert mock_init_executor.call_count == 1
+
+
+def test_get_executor_rebuilds_on_new_options(mock_init_executor, tmp_path):
+    """get_executor closes and rebuilds the executor if the options change"""
+    options = _get_executor_options(tmp_path)
+
+    first = utils.get_executor(options)
+    second = utils.get_executor(
+        dataclasses.replace(options, should_restore_currents=True)
+    )
+
+    assert first is not second
+    assert mock_init_executor.call_count == 2
+    first.close.assert_called_once()
+
+
+def test_get_executor_rebuilds_on_new_seed(mock_init_executor, tmp_path):
+    """get_executor rebuilds the executor if the calibration seed file changes"""
+    options = _get_executor_options(tmp_path)
+
+    first = utils.get_executor(options)
+    stat = os.stat(options.calibration_seed_file)
+    os.utime(
+        options.calibration_seed_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000)
+    )
+    second = utils.get_executor(options)
+
+    assert first is not second
+    assert mock_init_executor.call_count == 2
+
+
+def _get_executor_options(folder) -> ExecutorOptions:
+    """Gets executor options whose seed file is a copy in the given folder"""
+    seed_file = folder / "calibration.seed.toml"
+    with open(_SEED_FILE) as src, open(seed_file, "w") as dst:
+        dst.write(src.read())
+
+    return ExecutorOptions(
+        executor_type="qiskit_pulse_1q",
+        backend_name="qiskit_pulse_1q",
+        backend_config=BackendConfig.from_toml(
+            _BACKEND_CONFIG_FILE, seed_file=seed_file
+        ),
+        calibration_seed_file=seed_file,
+    )
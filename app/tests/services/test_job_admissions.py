@@ -0,0 +1,207 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for running many preprocessing workers on the same jobs concurrently"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+
+from app.libs.queues.dtos import Job, JobStatus, Stage
+from app.services.scheduler import utils as scheduler_utils
+from app.services.scheduler.store import init_job_admissions_store, init_jobs_store
+from app.services.scheduler.tasks import _is_preprocessing_abandoned
+from app.services.scheduler.utils import (
+    _update_job_stage,
+    update_job_stage,
+    update_jobs_stage,
+)
+from app.utils.datetime import get_utc_now
+from app.utils.exc import ItemNotFoundError
+
+
+@pytest.fixture
+def jobs_db(redis_client):
+    """The jobs store with jobs waiting to be preprocessed"""
+    jobs_db = init_jobs_store(redis_client, default_ttl=None)
+    jobs_db.insert_many([_job(f"job-{idx}") for idx in range(4)])
+    yield jobs_db
+
+
+def test_update_job_stage_forward_only(jobs_db):
+    """update_job_stage leaves jobs that are already at or beyond the stage unchanged"""
+    executing_job = update_job_stage(jobs_db, job_id="job-0", stage=Stage.EXEC_W)
+
+    got = update_job_stage(jobs_db, job_id="job-0", stage=Stage.PRE_PROC_W)
+
+    assert got == executing_job
+    assert jobs_db.get_one(("job-0",)) == executing_job
+
+
+def test_update_job_stage_concurrently(jobs_db):
+    """Only one of the workers updating the same job to the same stage updates it"""
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(
+            pool.map(
+                lambda _: _update_job_stage(jobs_db, "job-0", Stage.PRE_PROC_W),
+                range(16),
+            )
+        )
+
+    assert [is_updated for _, is_updated in results].count(True) == 1
+    assert {job.stage for job, _ in results} == {Stage.PRE_PROC_W}
+
+
+def test_update_jobs_stage_forward_only(jobs_db):
+    """update_jobs_stage only updates the jobs behind the stage, returning all in order"""
+    executing_job = update_job_stage(jobs_db, job_id="job-1", stage=Stage.EXEC_W)
+
+    got = update_jobs_stage(jobs_db, job_ids=["job-2", "job-1"], stage=Stage.EXEC_Q)
+
+    assert [job.job_id for job in got] == ["job-2", "job-1"]
+    assert got[0].stage == Stage.EXEC_Q
+    assert got[0].status == JobStatus.PENDING
+    assert got[1] == executing_job
+
+
+def test_update_jobs_stage_with_missing_jobs(jobs_db):
+    """update_jobs_stage skips the missing jobs only if asked to"""
+    job_ids = ["job-2", "job-deleted", "job-1"]
+
+    with pytest.raises(ItemNotFoundError, match="job-deleted"):
+        update_jobs_stage(jobs_db, job_ids=job_ids, stage=Stage.EXEC_Q)
+
+    got = update_jobs_stage(
+        jobs_db, job_ids=job_ids, stage=Stage.EXEC_Q, ignore_missing=True
+    )
+
+    assert [job.job_id for job in got] == ["job-2", "job-1"]
+    assert {job.stage for job in got} == {Stage.EXEC_Q}
+
+
+def test_job_admissions_release_in_order(redis_client):
+    """The ready jobs are released only after the jobs admitted before them"""
+    admissions = init_job_admissions_store(redis_client)
+    positions = [admissions.admit(f"job-{idx}") for idx in range(4)]
+
+    assert admissions.mark_ready("job-2", "payload-2")
+    assert admissions.mark_ready("job-1", "payload-1")
+    assert admissions.get_ready() == []
+
+    assert admissions.mark_ready("job-0", "payload-0")
+    got = admissions.get_ready()
+    for job_id, _ in got:
+        admissions.discard(job_id)
+
+    assert positions == sorted(positions)
+    assert admissions.admit("job-3") == positions[3]
+    assert got == [
+        ("job-0", "payload-0"),
+        ("job-1", "payload-1"),
+        ("job-2", "payload-2"),
+    ]
+    assert admissions.get_ready() == []
+    assert not admissions.mark_ready("job-0", "payload-0")
+
+
+def test_job_admissions_keep_ready_until_discarded(redis_client):
+    """The ready jobs that are not discarded after their release are got again"""
+    admissions = init_job_admissions_store(redis_client)
+    for idx in range(3):
+        admissions.admit(f"job-{idx}")
+        admissions.mark_ready(f"job-{idx}", f"payload-{idx}")
+
+    # the releasing worker stops after releasing the first job
+    admissions.get_ready()
+    admissions.discard("job-0")
+    got = admissions.get_ready()
+
+    assert got == [("job-1", "payload-1"), ("job-2", "payload-2")]
+
+
+def test_job_admissions_skip_abandoned(redis_client):
+    """Abandoned or discarded jobs no longer hold back the jobs admitted after them"""
+    admissions = init_job_admissions_store(redis_client)
+    for idx in range(4):
+        admissions.admit(f"job-{idx}")
+
+    admissions.discard("job-1")
+    admissions.mark_ready("job-2", "payload-2")
+    admissions.mark_ready("job-3", "payload-3")
+    got = admissions.get_ready(is_abandoned=lambda job_id: job_id == "job-0")
+
+    assert got == [("job-2", "payload-2"), ("job-3", "payload-3")]
+    assert not admissions.mark_ready("job-0", "payload-0")
+
+
+@pytest.mark.parametrize("age, is_abandoned", [(10, False), (600, True)])
+def test_never_enqueued_job_abandoned(jobs_db, redis_client, age, is_abandoned):
+    """A job without an rq job is abandoned only long after its submission"""
+    created_at = get_utc_now() - timedelta(seconds=age)
+    jobs_db.update(("job-0",), {"created_at": created_at.isoformat()})
+
+    got = _is_preprocessing_abandoned(
+        jobs_db, redis_client, "job-0", enqueue_timeout=300
+    )
+
+    assert got == is_abandoned
+
+
+def test_update_jobs_stage_with_conflicts(jobs_db, monkeypatch):
+    """update_jobs_stage retries only the jobs changed concurrently, one by one"""
+    update_many = jobs_db.update_many
+
+    def changing_update_many(updates, **kwargs):
+        if len(updates) > 1:
+            # another worker moves job-1 on just before the update of all jobs
+            update_many([(("job-1",), {"stage": Stage.EXEC_Q})])
+        return update_many(updates, **kwargs)
+
+    monkeypatch.setattr(jobs_db, "update_many", changing_update_many)
+    retried = []
+    monkeypatch.setattr(
+        scheduler_utils,
+        "_update_job_stage",
+        _spy(scheduler_utils._update_job_stage, retried),
+    )
+
+    got = update_jobs_stage(
+        jobs_db, job_ids=["job-0", "job-1", "job-2"], stage=Stage.PRE_PROC_W
+    )
+
+    assert [job.stage for job in got] == [
+        Stage.PRE_PROC_W,
+        Stage.EXEC_Q,
+        Stage.PRE_PROC_W,
+    ]
+    assert retried == ["job-1"]
+
+
+def _spy(func, calls: list):
+    """Wraps the stage update so that the ids of the jobs it updates are recorded"""
+
+    def wrapper(jobs_db, job_id, stage):
+        calls.append(job_id)
+        return func(jobs_db, job_id, stage)
+
+    return wrapper
+
+
+def _job(job_id: str) -> Job:
+    """Creates a job waiting to be preprocessed"""
+    return Job(
+        job_id=job_id,
+        user_id="user-0",
+        device="test",
+        calibration_date="2026-01-01",
+        stage=Stage.PRE_PROC_Q,
+    )
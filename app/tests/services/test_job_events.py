@@ -0,0 +1,118 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the stream of the changes in the statuses and stages of jobs"""
+import asyncio
+
+import pytest
+
+from app.libs.queues.dtos import Job, JobStatus, JobStatusEvent, Stage
+from app.services.scheduler import iter_job_events
+from app.services.scheduler.store import init_job_events_store, init_jobs_store
+from app.services.scheduler.utils import (
+    log_job_failure,
+    update_job_stage,
+    update_jobs_stage,
+)
+from app.tests.utils.env import TEST_RQ_REDIS_URL
+from app.utils.exc import InvalidRequestError
+
+_CONTEXT = {"jobs_store_url": TEST_RQ_REDIS_URL}
+
+
+@pytest.fixture
+def jobs_db(redis_client):
+    """The jobs store with jobs of two users"""
+    jobs_db = init_jobs_store(redis_client, default_ttl=None)
+    jobs_db.insert_many(
+        [_job("job-0", "user-0"), _job("job-1", "user-1"), _job("job-2", "user-0")]
+    )
+    yield jobs_db
+
+
+def test_update_job_stage_publishes_events(jobs_db, redis_client):
+    """Updating the stages of jobs or failing them publishes their events"""
+    update_job_stage(jobs_db, job_id="job-0", stage=Stage.PRE_PROC_W)
+    update_jobs_stage(jobs_db, job_ids=["job-1", "job-2"], stage=Stage.EXEC_Q)
+    log_job_failure(jobs_db, job_id="job-0", reason="foo")
+
+    events = init_job_events_store(redis_client).read()
+
+    assert [
+        event.model_dump(exclude={"event_id", "updated_at"}) for event in events
+    ] == [
+        _event("job-0", "user-0", JobStatus.EXECUTING, Stage.PRE_PROC_W),
+        _event("job-1", "user-1", JobStatus.PENDING, Stage.EXEC_Q),
+        _event("job-2", "user-0", JobStatus.PENDING, Stage.EXEC_Q),
+        _event("job-0", "user-0", JobStatus.FAILED, Stage.PRE_PROC_W, "foo"),
+    ]
+    assert all(event.updated_at is not None for event in events)
+
+
+async def test_iter_job_events(jobs_db):
+    """iter_job_events yields the new events of the user's jobs, filtered by job"""
+    batches = iter_job_events(_CONTEXT, user_id="user-0", heartbeat_interval=0.1)
+    # the stream is empty so only an empty heartbeat batch comes
+    assert await anext(batches) == []
+
+    update_jobs_stage(jobs_db, job_ids=["job-0", "job-1"], stage=Stage.EXEC_Q)
+    update_job_stage(jobs_db, job_id="job-2", stage=Stage.EXEC_Q)
+
+    assert [event.job_id for event in await anext(batches)] == ["job-0", "job-2"]
+    await batches.aclose()
+
+
+async def test_iter_job_events_resume(jobs_db, redis_client):
+    """iter_job_events resumes after the given event id"""
+    event_ids = init_job_events_store(redis_client).publish(
+        jobs_db.find_by_keys(("job-0",), ("job-1",), ("job-2",))
+    )
+
+    batches = iter_job_events(
+        _CONTEXT, user_id="user-0", job_id="job-2", after=event_ids[0]
+    )
+    events = await asyncio.wait_for(anext(batches), timeout=1)
+    await batches.aclose()
+
+    assert [(event.event_id, event.job_id) for event in events] == [
+        (event_ids[2], "job-2")
+    ]
+
+
+def test_iter_job_events_invalid_event_id():
+    """iter_job_events raises InvalidRequestError for invalid event ids"""
+    with pytest.raises(InvalidRequestError, match="invalid event id"):
+        iter_job_events(_CONTEXT, user_id="user-0", after="foo")
+
+
+def _job(job_id: str, user_id: str) -> Job:
+    """Creates a pending job of the given id and user"""
+    return Job(
+        job_id=job_id,
+        user_id=user_id,
+        device="test",
+        calibration_date="2026-01-01",
+        stage=Stage.PRE_PROC_Q,
+    )
+
+
+def _event(
+    job_id: str, user_id: str, status: JobStatus, stage: Stage, failure_reason=None
+) -> dict:
+    """Creates the dump of a job event without its event_id and updated_at"""
+    return JobStatusEvent(
+        job_id=job_id,
+        user_id=user_id,
+        status=status,
+        stage=stage,
+        failure_reason=failure_reason,
+    ).model_dump(exclude={"event_id", "updated_at"})
@@ -0,0 +1,92 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the saving and loading of uploaded job files"""
+import hashlib
+import io
+import json
+
+import pytest
+from fastapi import UploadFile
+from pydantic import ValidationError
+
+from app.libs.qiskit.qobj import PulseQobj
+from app.services.scheduler.tasks import _load_job_file
+from app.services.scheduler.utils import decompress_qobj
+from app.tests.utils.fixtures import load_fixture
+from app.utils.api import read_uploaded_file_with_hash, save_uploaded_file
+
+_JOBS = load_fixture("jobs_to_upload.json")
+
+
+def test_save_uploaded_file(tmp_path):
+    """The uploaded file is saved in chunks"""
+    content = json.dumps(_JOBS[0]).encode()
+    upload_file = UploadFile(io.BytesIO(content), filename="job.json")
+    target = tmp_path / "uploads" / "job.json"
+
+    path = save_uploaded_file(upload_file, target=target, chunk_size=7)
+
+    assert path == target
+    assert target.read_bytes() == content
+
+
+def test_read_uploaded_file_with_hash():
+    """The uploaded file is read in chunks and its SHA-256 digest is returned"""
+    content = json.dumps(_JOBS[0]).encode()
+    upload_file = UploadFile(io.BytesIO(content), filename="job.json")
+
+    got, content_hash = read_uploaded_file_with_hash(upload_file, chunk_size=7)
+
+    assert got == content
+    # the buffer the file is read into is returned as is, without copying it
+    assert isinstance(got, bytearray)
+    assert content_hash == hashlib.sha256(content).hexdigest()
+    # the file can be read again
+    assert upload_file.file.read() == content
+
+
+@pytest.mark.parametrize("job", _JOBS)
+def test_load_job_file_with_hash(job):
+    """Job files with hashes are loaded like validated job files"""
+    content = json.dumps(job).encode()
+
+    expected = _load_job_file(content, content_hash=None)
+    got = _load_job_file(content, content_hash=hashlib.sha256(content).hexdigest())
+
+    assert got["job_id"] == expected["job_id"]
+    assert got["params"]["result_format"] == expected["params"]["result_format"]
+    assert _to_qobj_dict(got) == _to_qobj_dict(expected)
+
+
+def test_load_job_file_without_hash():
+    """Job files without hashes i.e. not validated on upload are validated"""
+    job = {**_JOBS[0], "params": {"qobjj": _JOBS[0]["params"]["qobj"]}}
+    content = json.dumps(job).encode()
+
+    with pytest.raises(ValidationError):
+        _load_job_file(content, content_hash=None)
+
+
+def test_load_job_file_with_wrong_hash():
+    """Job files whose contents do not match their hash are validated"""
+    job = {**_JOBS[0], "params": {"qobjj": _JOBS[0]["params"]["qobj"]}}
+    content = json.dumps(job).encode()
+
+    with pytest.raises(ValidationError):
+        _load_job_file(content, content_hash=hashlib.sha256(b"other").hexdigest())
+
+
+def _to_qobj_dict(job_dict: dict) -> dict:
+    """Decompresses and normalizes the qobj of the given job file dict"""
+    qobj = decompress_qobj(job_dict["params"]["qobj"])
+    return PulseQobj.from_dict(qobj).to_dict()
@@ -0,0 +1,71 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the compact binary encoding of job results"""
+import json
+
+import pytest
+
+from app.libs.queues.dtos import JobResult
+from app.libs.queues.results import decode_job_result, encode_job_result
+
+_HEX_MEMORY = [["0x0", "0x1", "0x3", "0x2"], ["0x1", "0x1"]]
+_IQ_MEMORY = [
+    [[[0.5, -0.25], [1.0, 2.0]], [[0.125, 0.75], [-1.5, 3.0]]],
+    [[[4.0, -4.0], [0.0, 0.0]]],
+]
+
+
+@pytest.mark.parametrize(
+    "memory, memory_type",
+    [
+        (_HEX_MEMORY, "hex"),
+        (_IQ_MEMORY, "iq"),
+        # registers wider than 64 bits
+        ([[hex(2**70), "0x1"]], "hex"),
+        # ragged shots
+        ([[[[0.5, 0.5]], [[1.0, 1.0], [2.0, 2.0]]]], "iq"),
+        ([], "hex"),
+    ],
+)
+def test_encode_decode_job_result(memory, memory_type):
+    """Job results decoded from their binary blob equal the original results"""
+    result = JobResult(memory=memory)
+
+    data, info = encode_job_result(result)
+    decoded = decode_job_result(data)
+
+    assert decoded == result
+    assert info.memory_type == memory_type
+    assert info.num_experiments == len(memory)
+    assert info.size == len(data)
+
+
+def test_encode_job_result_keeps_extra_fields():
+    """Extra fields of the job results are kept in the binary blob"""
+    result = JobResult(memory=_HEX_MEMORY, counts=[{"0x0": 1}])
+
+    data, info = encode_job_result(result)
+    decoded = decode_job_result(data)
+
+    assert decoded.model_dump() == result.model_dump()
+    assert info.shots == 4
+
+
+def test_encode_job_result_is_compact():
+    """The binary blob of many shots is smaller than their JSON representation"""
+    memory = [[hex(v % 4) for v in range(10_000)] for _ in range(5)]
+    result = JobResult(memory=memory)
+
+    data, _ = encode_job_result(result)
+
+    assert len(data) < len(json.dumps(memory)) / 10
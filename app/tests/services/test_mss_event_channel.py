@@ -0,0 +1,162 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for sending events to MSS"""
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.libs.queues.dtos import Job
+from app.services.external.mss.dtos import DeviceEvent, DeviceEventName
+from app.services.external.mss.service import (
+    AsyncMssClientPipe,
+    MssClientPipe,
+    connect_to_mss,
+    get_inbox_channel_name,
+    get_mss_event_channel,
+    get_outbox_channel_name,
+)
+from app.tests.utils.env import TEST_RQ_REDIS_URL
+
+_DEVICE = "test-mss-channel"
+
+
+@pytest.fixture
+def mock_mss(redis_client):
+    """Responds to the events in the outbox, in the reverse order of a batch of them"""
+    batch_size = 5
+    outbox = redis_client.pubsub(ignore_subscribe_messages=True)
+    outbox.subscribe(get_outbox_channel_name(_DEVICE))
+    stop_event = threading.Event()
+
+    def respond():
+        batch = []
+        while not stop_event.is_set():
+            message = outbox.get_message(timeout=0.1)
+            if message is None:
+                continue
+
+            event = json.loads(message["data"])
+            if event["data"]["job_id"] == "no-response":
+                continue
+
+            batch.append(event)
+            if len(batch) == batch_size:
+                for event in reversed(batch):
+                    response = {"status": "success", "id": event["id"], "data": {}}
+                    redis_client.publish(
+                        get_inbox_channel_name(_DEVICE), json.dumps(response)
+                    )
+                batch = []
+
+    thread = threading.Thread(target=respond, daemon=True)
+    thread.start()
+    yield batch_size
+    stop_event.set()
+    thread.join()
+    outbox.close()
+    get_mss_event_channel(device=_DEVICE, redis_url=TEST_RQ_REDIS_URL).close()
+
+
+def test_send_event_concurrently(mock_mss):
+    """Events sent concurrently over the shared channel get their own responses"""
+    events = [_job_event(f"job-{idx}") for idx in range(mock_mss * 2)]
+
+    def send(event: DeviceEvent):
+        with MssClientPipe(device=_DEVICE, redis_url=TEST_RQ_REDIS_URL) as pipe:
+            return pipe.send_event(event)
+
+    with ThreadPoolExecutor(max_workers=mock_mss) as executor:
+        responses = list(executor.map(send, events))
+
+    assert [v["id"] for v in responses] == [v.id for v in events]
+
+
+def test_pipes_share_channel(mock_mss):
+    """All MSS client pipes in a process use the same channel"""
+    first = MssClientPipe(device=_DEVICE, redis_url=TEST_RQ_REDIS_URL)
+    first.close()
+    second = MssClientPipe(device=_DEVICE, redis_url=TEST_RQ_REDIS_URL)
+
+    assert first._channel is second._channel
+    assert second._channel.is_alive
+
+
+def test_send_event_timeout(mock_mss):
+    """send_event raises a TimeoutError if no response comes within the timeout"""
+    pipe = MssClientPipe(device=_DEVICE, redis_url=TEST_RQ_REDIS_URL, timeout=0.2)
+
+    with pytest.raises(TimeoutError, match=r"foo: response took longer than timeout"):
+        pipe.send_event(_job_event("no-response"), error_prefix="foo: ")
+
+
+async def test_mss_client_pipelines_events(patched_mss_websockets, redis_client):
+    """The MSS client sends events to MSS without waiting for the previous responses"""
+    connection_event = asyncio.Event()
+    mss_task = asyncio.create_task(
+        connect_to_mss(
+            connection_event,
+            uri="ws://localhost:8002/devices/ws/test-mss-channel",
+            device=_DEVICE,
+            redis_url=TEST_RQ_REDIS_URL,
+        )
+    )
+    await asyncio.wait_for(connection_event.wait(), timeout=5)
+    events = [_job_event(f"job-{idx}") for idx in range(10)]
+
+    async def send(event: DeviceEvent):
+        async with AsyncMssClientPipe(
+            device=_DEVICE, redis_url=TEST_RQ_REDIS_URL, timeout=5
+        ) as pipe:
+            return await pipe.send_event(event)
+
+    try:
+        responses = await asyncio.gather(*[send(event) for event in events])
+    finally:
+        mss_task.cancel()
+
+    assert [v["id"] for v in responses] == [v.id for v in events]
+
+
+async def test_async_pipe_awaits_events_concurrently(mock_mss):
+    """Events sent concurrently through one async pipe get their own responses"""
+    events = [_job_event(f"job-{idx}") for idx in range(mock_mss * 2)]
+
+    async with AsyncMssClientPipe(
+        device=_DEVICE, redis_url=TEST_RQ_REDIS_URL, timeout=5
+    ) as pipe:
+        responses = await asyncio.gather(*[pipe.send_event(v) for v in events])
+        assert pipe._pending == {}
+
+    assert [v["id"] for v in responses] == [v.id for v in events]
+
+
+async def test_async_pipe_send_event_timeout(mock_mss):
+    """AsyncMssClientPipe.send_event raises a TimeoutError if no response comes within the timeout"""
+    async with AsyncMssClientPipe(
+        device=_DEVICE, redis_url=TEST_RQ_REDIS_URL, timeout=0.2
+    ) as pipe:
+        with pytest.raises(
+            TimeoutError, match=r"foo: response took longer than timeout"
+        ):
+            await pipe.send_event(_job_event("no-response"), error_prefix="foo: ")
+
+
+def _job_event(job_id: str) -> DeviceEvent:
+    """Creates a job-updated event for a job with the given id"""
+    return DeviceEvent(
+        name=DeviceEventName.JOB_UPDATED,
+        data=Job(job_id=job_id, device=_DEVICE, calibration_date="2026-01-01"),
+    )
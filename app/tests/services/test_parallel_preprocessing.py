@@ -0,0 +1,149 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the translation of the experiments of a job in a pool of processes"""
+import copy
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from app.libs.qiskit.qobj import PulseQobj, PulseQobjConfig, PulseQobjExperiment
+from app.libs.quantum_executor.base.executor import QuantumExecutor
+from app.libs.quantum_executor.base.experiment import (
+    NativeExperiment,
+    copy_expt_header_with,
+)
+from app.libs.quantum_executor.base.quantum_job import (
+    get_experiment_name,
+    to_native_qobj_config,
+)
+from app.libs.quantum_executor.base.quantum_job.dtos import NativeQobjConfig
+from app.tests.utils.fixtures import load_fixture
+
+_QOBJ_DICT = load_fixture("jobs_to_upload.json")[0]["params"]["qobj"]
+
+
+@pytest.mark.parametrize("pool_size", [0, 1, 2])
+def test_to_native_experiment_dicts(pool_size):
+    """The experiments are translated in order, in other processes if the pool size is above 1"""
+    qobj = _get_qobj(expts_count=5)
+    native_config = to_native_qobj_config(qobj.config)
+    executor = _DummyExecutor(preprocessing_pool_size=pool_size)
+
+    got = executor._to_native_experiment_dicts(qobj, native_config)
+
+    assert [item["header"]["name"] for item in got] == [
+        get_experiment_name(expt.header.name, idx + 1)
+        for idx, expt in enumerate(qobj.experiments)
+    ]
+    assert [item["duration"] for item in got] == [
+        len(expt.instructions) + 1 for expt in qobj.experiments
+    ]
+    pids = {item["schedule"] for item in got}
+    if pool_size > 1:
+        assert os.getpid() not in pids
+    else:
+        assert pids == {os.getpid()}
+
+
+def test_to_native_experiment_dicts_without_kwargs():
+    """Executors without native experiment kwargs translate in the current process"""
+    qobj = _get_qobj(expts_count=3)
+    native_config = to_native_qobj_config(qobj.config)
+    executor = _DummyExecutor(preprocessing_pool_size=2, kwargs=None)
+
+    got = executor._to_native_experiment_dicts(qobj, native_config)
+
+    assert {item["schedule"] for item in got} == {os.getpid()}
+
+
+@dataclass(frozen=True)
+class _DummyExperiment(NativeExperiment[int]):
+    """A native experiment whose schedule is the id of the process that created it"""
+
+    @classmethod
+    def from_qobj_expt(
+        cls,
+        expt: PulseQobjExperiment,
+        name: str,
+        qobj_config: PulseQobjConfig,
+        offset: int,
+    ) -> "_DummyExperiment":
+        return cls(
+            header=copy_expt_header_with(expt.header, name=name),
+            config=qobj_config,
+            schedule=os.getpid(),
+            duration=len(expt.instructions) + offset,
+        )
+
+    @staticmethod
+    def _dump_schedule(schedule: int) -> int:
+        return schedule
+
+    @staticmethod
+    def _load_schedule(value: int) -> int:
+        return value
+
+
+class _DummyExecutor(QuantumExecutor):
+    """An executor of dummy experiments"""
+
+    native_experiment_cls = _DummyExperiment
+
+    def __init__(
+        self,
+        preprocessing_pool_size: int,
+        kwargs: Optional[Dict[str, Any]] = {"offset": 1},
+    ):
+        super().__init__()
+        self.preprocessing_pool_size = preprocessing_pool_size
+        self._kwargs = kwargs
+
+    def _to_native_experiments(
+        self, qobj: PulseQobj, native_config: NativeQobjConfig, /
+    ) -> List[_DummyExperiment]:
+        return [
+            _DummyExperiment.from_qobj_expt(
+                name=get_experiment_name(expt.header.name, idx + 1),
+                expt=expt,
+                qobj_config=qobj.config,
+                offset=1,
+            )
+            for idx, expt in enumerate(qobj.experiments)
+        ]
+
+    def _get_native_experiment_kwargs(
+        self, native_config: NativeQobjConfig, /
+    ) -> Optional[Dict[str, Any]]:
+        return self._kwargs
+
+    def _run_native(self, experiment, /, *, native_config, logger):
+        raise NotImplementedError()
+
+    def recalibrate(self, **kwargs):
+        pass
+
+    def close(self):
+        pass
+
+
+def _get_qobj(expts_count: int) -> PulseQobj:
+    """Gets the qobj of the test job with its experiment repeated with fewer instructions"""
+    qobj_dict = copy.deepcopy(_QOBJ_DICT)
+    expt = qobj_dict["experiments"][0]
+    qobj_dict["experiments"] = [
+        {**copy.deepcopy(expt), "instructions": expt["instructions"][idx:]}
+        for idx in range(expts_count)
+    ]
+    return PulseQobj.from_dict(qobj_dict)
@@ -0,0 +1,191 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the HDF5 files of preprocessed jobs"""
+import copy
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from app.libs.device_parameters.dtos import BackendConfig
+from app.libs.qiskit.qobj import PulseQobj
+from app.libs.qiskit_providers.utils import json_decoder
+from app.libs.quantum_executor.base import executor as executor_module
+from app.libs.quantum_executor.base.executor import (
+    NativeExptMetadata,
+    QuantumExecutor,
+    _get_preprocessed_expt_file,
+)
+from app.libs.quantum_executor.base.quantum_job import to_native_qobj_config
+from app.tests.conftest import HAS_QISKIT_DYNAMICS
+from app.tests.utils.env import (
+    TEST_QISKIT_1Q_SEED_FILE,
+    TEST_SIMQ1_BACKEND_SETTINGS_FILE,
+)
+from app.tests.utils.fixtures import load_fixture
+
+_JOB = load_fixture("jobs_to_upload.json")[0]
+
+
+def test_native_expt_metadata_hdf5(tmp_path):
+    """NativeExptMetadata is saved to and loaded from HDF5 files"""
+    qobj = _get_qobj(
+        pulse_library=[
+            {"name": "foo", "samples": np.linspace(0, 1 + 1j, 1000)},
+            {"name": "bar", "samples": []},
+        ]
+    )
+    native_expts = [{"header": {"name": "expt-0"}, "schedule": b"\x00\x01"}]
+    metadata = NativeExptMetadata(
+        native_config=to_native_qobj_config(qobj.config),
+        tuid="20260101-000000-000-abcdef",
+        qobj=qobj,
+        qobj_tag="tag",
+        native_expts=native_expts,
+    )
+    file = tmp_path / "job-expt-metadata.hdf5"
+
+    metadata.to_hdf5(file)
+    got = NativeExptMetadata.from_hdf5(file)
+
+    assert got.tuid == metadata.tuid
+    assert got.qobj_tag == "tag"
+    assert got.native_config == metadata.native_config
+    assert got.native_expts == native_expts
+    assert got.qobj.experiments == qobj.experiments
+    assert got.qobj.config.pulse_library == qobj.config.pulse_library
+    # the samples are memory-mapped from the file rather than copied into memory
+    assert isinstance(got.qobj.config.pulse_library[0].samples.base, np.memmap)
+
+
+def test_native_expt_metadata_hdf5_without_native_expts(tmp_path):
+    """NativeExptMetadata without native experiments is saved to HDF5 files"""
+    qobj = _get_qobj(pulse_library=[])
+    metadata = NativeExptMetadata(
+        native_config=to_native_qobj_config(qobj.config),
+        tuid="20260101-000000-000-abcdef",
+        qobj=qobj,
+        qobj_tag="",
+    )
+    file = tmp_path / "job-expt-metadata.hdf5"
+
+    metadata.to_hdf5(file)
+    got = NativeExptMetadata.from_hdf5(file)
+
+    assert got.native_expts is None
+    assert got.qobj.config.pulse_library == []
+
+
+@pytest.mark.skipif(not HAS_QISKIT_DYNAMICS, reason="requires qiskit")
+def test_qiskit_native_expts_hdf5(tmp_path):
+    """Qiskit pulse schedules are restored from the HDF5 files of preprocessed jobs"""
+    from app.libs.quantum_executor.qiskit.experiment import QiskitDynamicsExperiment
+
+    qobj = _get_qobj(pulse_library=[])
+    backend_config = BackendConfig.from_toml(
+        TEST_SIMQ1_BACKEND_SETTINGS_FILE, seed_file=TEST_QISKIT_1Q_SEED_FILE
+    )
+    native_expts = [
+        QiskitDynamicsExperiment.from_qobj_expt(
+            expt=expt,
+            name=f"expt-{idx}",
+            qobj_config=qobj.config,
+            backend_config=backend_config,
+        )
+        for idx, expt in enumerate(qobj.experiments)
+    ]
+    metadata = NativeExptMetadata(
+        native_config=to_native_qobj_config(qobj.config),
+        tuid="20260101-000000-000-abcdef",
+        qobj=qobj,
+        qobj_tag="tag",
+        native_expts=[expt.to_dict() for expt in native_expts],
+    )
+    file = tmp_path / "job-expt-metadata.hdf5"
+
+    metadata.to_hdf5(file)
+    got = [
+        QiskitDynamicsExperiment.from_dict(item, config=qobj.config)
+        for item in NativeExptMetadata.from_hdf5(file).native_expts
+    ]
+
+    assert len(got) == len(native_expts) > 0
+    for got_expt, expected_expt in zip(got, native_expts):
+        assert got_expt.header == expected_expt.header
+        assert got_expt.duration == expected_expt.duration
+        assert got_expt.schedule == expected_expt.schedule
+        assert [type(inst) for _, inst in got_expt.schedule.instructions] == [
+            type(inst) for _, inst in expected_expt.schedule.instructions
+        ]
+
+
+def test_run_only_connects_while_running_experiments(tmp_path, monkeypatch):
+    """The executor connects to the hardware only around the experiments of a job, even on errors"""
+    # no experiment data is logged
+    monkeypatch.setattr(
+        executor_module, "create_exp_folder", lambda tuid, name: str(tmp_path)
+    )
+    monkeypatch.setattr(executor_module, "ExperimentLogger", MagicMock())
+    qobj = _get_qobj(pulse_library=[])
+    metadata = NativeExptMetadata(
+        native_config=to_native_qobj_config(qobj.config),
+        tuid="20260101-000000-000-abcdef",
+        qobj=qobj,
+        qobj_tag="tag",
+        native_expts=[],
+    )
+    metadata.to_hdf5(_get_preprocessed_expt_file("job-1", folder=tmp_path))
+    executor = _RecordingExecutor()
+
+    with pytest.raises(RuntimeError, match="measurement failed"):
+        executor.run("job-1", inputs_folder=tmp_path)
+
+    assert executor.events == ["connect", "run", "disconnect"]
+
+
+class _RecordingExecutor(QuantumExecutor):
+    """An executor that records its connections to the hardware and fails to measure"""
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def _to_native_experiments(self, qobj, native_config, /):
+        return []
+
+    def _run_native(self, experiment, /, *, native_config, logger):
+        raise NotImplementedError()
+
+    def _run_native_experiments(self, experiments, *, native_config, logger):
+        self.events.append("run")
+        raise RuntimeError("measurement failed")
+
+    def recalibrate(self, **kwargs):
+        pass
+
+    def connect(self):
+        self.events.append("connect")
+
+    def disconnect(self):
+        self.events.append("disconnect")
+
+    def close(self):
+        pass
+
+
+def _get_qobj(pulse_library: list) -> PulseQobj:
+    """Gets the qobj of the test job with the given pulse library"""
+    qobj_dict = copy.deepcopy(_JOB["params"]["qobj"])
+    qobj_dict["config"]["pulse_library"] = pulse_library
+    json_decoder.decode_pulse_qobj(qobj_dict)
+    return PulseQobj.from_dict(qobj_dict)
@@ -0,0 +1,58 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the decoding of the pulse library of qobjs into complex arrays"""
+import copy
+
+import numpy as np
+import pytest
+
+from app.libs.qiskit.qobj import PulseQobj
+from app.libs.quantum_executor.base.quantum_job.dtos import QobjData
+from app.libs.quantum_executor.utils.serialization import iqx_rld, iqx_rld_complex
+from app.services.scheduler.utils import decompress_qobj
+from app.tests.utils.fixtures import load_fixture
+
+_JOB = load_fixture("jobs_to_upload.json")[0]
+_ENCODED_SAMPLES = [[[0.1, 0.2], 3], [[0.5, -1.0]], [[0.0, 0.0], 2]]
+
+
+@pytest.mark.parametrize(
+    "enc_seq",
+    [_ENCODED_SAMPLES, [((0.25, 0.5),), ((1.0, 0.0), 4)], []],
+)
+def test_iqx_rld_complex(enc_seq):
+    """iqx_rld_complex decodes the [re, im] pairs like iqx_rld into a complex array"""
+    expected = [complex(re, im) for re, im in iqx_rld(enc_seq)]
+
+    got = iqx_rld_complex(enc_seq)
+
+    assert got.dtype == np.complex128
+    assert got.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(got, expected)
+
+
+def test_decompress_qobj_pulse_library():
+    """The pulse library of the decompressed qobj is kept as complex arrays"""
+    qobj_dict = copy.deepcopy(_JOB["params"]["qobj"])
+    qobj_dict["config"]["pulse_library"] = [
+        {"name": "foo", "samples": _ENCODED_SAMPLES}
+    ]
+
+    qobj = PulseQobj.from_dict(decompress_qobj(qobj_dict))
+    restored = QobjData.from_qobj(qobj).to_qobj()
+
+    expected = [0.1 + 0.2j] * 3 + [0.5 - 1.0j] + [0j] * 2
+    for item in (qobj.config.pulse_library[0], restored.config.pulse_library[0]):
+        assert item.samples.dtype == np.complex128
+        np.testing.assert_array_equal(item.samples, expected)
+    assert restored.config.pulse_library == qobj.config.pulse_library
@@ -0,0 +1,164 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the running of the experiments of a job on the quantify executor"""
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.tests.conftest import HAS_QUANTIFY
+
+
+@pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
+def test_pipelined_execution(monkeypatch):
+    """The next experiment is compiled while the current one is measured"""
+    executor = _get_executor(monkeypatch, pipelined_execution=True)
+    experiments = [_experiment(f"expt-{idx}") for idx in range(3)]
+    compiled = {expt.header.name: threading.Event() for expt in experiments}
+    events = []
+
+    def compile_(experiment):
+        events.append(("compile", experiment.header.name))
+        compiled[experiment.header.name].set()
+        return f"compiled-{experiment.header.name}"
+
+    def measure(experiment, compiled_schedule, *, logger):
+        idx = experiments.index(experiment)
+        if idx + 1 < len(experiments):
+            # the next experiment is compiled before this measurement ends
+            assert compiled[experiments[idx + 1].header.name].wait(timeout=5)
+        events.append(("measure", experiment.header.name))
+        return compiled_schedule
+
+    executor._compile = compile_
+    executor._measure = measure
+
+    got = executor._run_native_experiments(experiments, native_config=None, logger=None)
+
+    assert got == {
+        "expt-0": "compiled-expt-0",
+        "expt-1": "compiled-expt-1",
+        "expt-2": "compiled-expt-2",
+    }
+    assert [item for item in events if item[0] == "measure"] == [
+        ("measure", "expt-0"),
+        ("measure", "expt-1"),
+        ("measure", "expt-2"),
+    ]
+    assert events.index(("compile", "expt-1")) < events.index(("measure", "expt-0"))
+
+
+@pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
+def test_bias_currents_only_ramped_on_change(monkeypatch):
+    """Only the coupler currents that differ from those applied in the job are ramped"""
+    executor = _get_executor(monkeypatch)
+    spi_dac = executor.spi_dacs["spi"]
+    biases = {
+        "expt-0": {"u0": 0.1, "u1": 0.2},
+        "expt-1": {"u0": 0.1, "u1": 0.2},
+        "expt-2": {"u0": 0.1, "u1": 0.3},
+    }
+    executor._compile = lambda experiment: experiment
+    executor._extract_bias = lambda experiment: biases[experiment.header.name]
+    experiments = [_experiment(name) for name in biases]
+
+    executor._run_native_experiments(
+        experiments, native_config=None, logger=MagicMock()
+    )
+
+    assert [
+        call.args[0] for call in spi_dac.ramp_to_target_currents.call_args_list
+    ] == [
+        {"u0": 0.1, "u1": 0.2},
+        {"u1": 0.3},
+    ]
+
+
+@pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
+def test_bias_currents_reramped_after_job_or_error(monkeypatch):
+    """The applied bias currents are not trusted in a new job or after an error"""
+    executor = _get_executor(monkeypatch)
+    spi_dac = executor.spi_dacs["spi"]
+    executor._compile = lambda experiment: experiment
+    executor._extract_bias = lambda experiment: {"u0": 0.1}
+    logger = MagicMock()
+
+    executor._run_native_experiments(
+        [_experiment("expt-0")], native_config=None, logger=logger
+    )
+    executor._coordinator.wait_done.side_effect = TimeoutError("timed out")
+    with pytest.raises(TimeoutError):
+        executor._run_native_experiments(
+            [_experiment("expt-1")], native_config=None, logger=logger
+        )
+    executor._coordinator.wait_done.side_effect = None
+    executor._run_native_experiments(
+        [_experiment("expt-2")], native_config=None, logger=logger
+    )
+
+    assert spi_dac.ramp_to_target_currents.call_count == 3
+    assert executor._applied_bias_currents == {}
+
+
+@pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
+def test_disconnect_closes_instruments(monkeypatch):
+    """disconnect() closes the SPI racks and clusters and does nothing if not connected"""
+    from app.libs.quantum_executor.quantify import executor as executor_module
+
+    close_all_clusters = MagicMock()
+    monkeypatch.setattr(
+        executor_module.qblox_instruments.Cluster, "close_all", close_all_clusters
+    )
+    executor = _get_executor(monkeypatch)
+    executor.device_name = "test_device"
+    monkeypatch.setitem(executor._non_gc_instruments, "test_device", {})
+    coordinator = executor._coordinator
+    spi_dac = executor.spi_dacs["spi"]
+
+    executor.disconnect()
+    executor.disconnect()
+
+    coordinator.stop.assert_called_once()
+    coordinator.close_all.assert_called_once()
+    spi_dac.close.assert_called_once()
+    close_all_clusters.assert_called_once()
+    assert executor._coordinator is None
+    assert executor.spi_dacs == {}
+
+
+def _get_executor(monkeypatch, pipelined_execution: bool = False):
+    """Creates a quantify executor with mocked instruments, without connecting to any"""
+    from app.libs.quantum_executor.quantify import executor as executor_module
+    from app.libs.quantum_executor.quantify.executor import QuantifyExecutor
+
+    # the acquisitions of the mocked instruments are returned as they are
+    monkeypatch.setattr(
+        executor_module,
+        "QExperimentResult",
+        SimpleNamespace(from_xarray=lambda value: value),
+    )
+
+    executor = QuantifyExecutor.__new__(QuantifyExecutor)
+    executor.pipelined_execution = pipelined_execution
+    executor.should_restore_currents = False
+    executor.spi_dacs = {"spi": MagicMock()}
+    executor._applied_bias_currents = {}
+    executor._experiment_delay = 0
+    executor._coordinator = MagicMock()
+    return executor
+
+
+def _experiment(name: str) -> SimpleNamespace:
+    """Creates a stand-in for a quantify experiment of the given name"""
+    return SimpleNamespace(header=SimpleNamespace(name=name))
@@ -27,16 +27,18 @@ _CALIBRATION_SEED_FILE = get_fixture_path("quantify.seed.toml")
 
 @pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
 def test_attempts_to_connect_to_real_hardware():
-    """Loads the config for the real hardware in the appropriate way"""
-    with pytest.raises(socket.timeout):
-        backend_conf = BackendConfig.from_toml(
-            _BACKEND_CONFIG_PATH, seed_file=_CALIBRATION_SEED_FILE
-        )
+    """Loads the config for the real hardware in the appropriate way, connecting only on connect()"""
+    backend_conf = BackendConfig.from_toml(
+        _BACKEND_CONFIG_PATH, seed_file=_CALIBRATION_SEED_FILE
+    )
+
+    from ...libs.quantum_executor.quantify.executor import QuantifyExecutor
 
-        from ...libs.quantum_executor.quantify.executor import QuantifyExecutor
+    executor = QuantifyExecutor(
+        quantify_config_file=_REAL_HARDWARE_QUANTIFY_CONFIG_FILE,
+        quantify_metadata_file=_REAL_HARDWARE_QUANTIFY_METADATA_FILE,
+        backend_config=backend_conf,
+    )
 
-        QuantifyExecutor(
-            quantify_config_file=_REAL_HARDWARE_QUANTIFY_CONFIG_FILE,
-            quantify_metadata_file=_REAL_HARDWARE_QUANTIFY_METADATA_FILE,
-            backend_config=backend_conf,
-        )
+    with pytest.raises(socket.timeout):
+        executor.connect()
@@ -17,12 +17,20 @@ import numpy as np
 import pytest
 import xarray as xr
 
+from ...libs.qiskit.qobj import PulseQobj
 from ...libs.quantum_executor.base.quantum_job import (
     ByteOrder,
     discriminate_results,
+    to_native_qobj_config,
+)
+from ...libs.quantum_executor.base.quantum_job.dtos import (
+    MeasLvl,
+    MeasRet,
+    QuantumJob,
+    ResultFormat,
 )
-from ...libs.quantum_executor.base.quantum_job.dtos import MeasLvl, MeasRet, QuantumJob
 from ...libs.quantum_executor.base.quantum_job.typing import QDataset
+from ..utils.fixtures import load_fixture
 
 
 def _make_qdataset(channels: Dict[int, np.ndarray]) -> QDataset:
@@ -171,3 +179,100 @@ def test_discriminate_compacted_mapping():
     # rep0: slot0=0, slot1=1 => 0b0010 => 0x2
     # rep1: slot0=1, slot1=0 => 0b0001 => 0x1
     assert got == [["0x2", "0x1"]]
+
+
+@pytest.mark.parametrize("byteorder", [ByteOrder.LITTLE_ENDIAN, ByteOrder.BIG_ENDIAN])
+def test_discriminate_batched_matches_per_qubit(byteorder):
+    """Discriminating all channels in one batch gives the same results as one by one"""
+    rng = np.random.default_rng(42)
+    channels = {idx: rng.integers(0, 2, size=50) for idx in range(5)}
+    job = _dummy_job(mem_slots=5, channels=channels)
+    calibration = _dummy_calibration(qubits=list(range(5)))
+
+    def disc(idx, iq):
+        return iq.real.astype(np.int8)
+
+    def batch_disc(idxs, iq):
+        assert iq.shape == (5, 50)
+        return iq.real.astype(np.int8)
+
+    expected = discriminate_results(
+        job, disc, byteorder=byteorder, calibration=calibration
+    )
+    got = discriminate_results(
+        job,
+        batch_discriminator=batch_disc,
+        byteorder=byteorder,
+        calibration=calibration,
+    )
+
+    assert got == expected
+
+
+def test_discriminate_counts():
+    """The 'counts' output returns the number of shots per hex string"""
+    job = _dummy_job(
+        mem_slots=2, channels={0: np.array([1, 0, 1, 1]), 1: np.array([0, 0, 1, 1])}
+    )
+    calibration = _dummy_calibration(qubits=[0, 1])
+
+    def disc(idx, iq):
+        return iq.real.astype(np.int8)
+
+    got = discriminate_results(job, disc, calibration=calibration, output="counts")
+
+    assert got == [{"0x0": 1, "0x1": 1, "0x3": 2}]
+
+
+def test_discriminate_wide_register():
+    """Registers wider than 64 bits are converted to the right hex strings"""
+    mem_slots = 70
+    job = _dummy_job(
+        mem_slots=mem_slots, channels={0: np.array([1, 0]), 69: np.array([1, 1])}
+    )
+    calibration = _dummy_calibration(qubits=list(range(mem_slots)))
+
+    def disc(idx, iq):
+        return iq.real.astype(np.int8)
+
+    memory = discriminate_results(job, disc, calibration=calibration)
+    counts = discriminate_results(job, disc, calibration=calibration, output="counts")
+
+    assert memory == [[hex(2**69 + 1), hex(2**69)]]
+    assert counts == [{hex(2**69): 1, hex(2**69 + 1): 1}]
+
+
+@pytest.mark.parametrize(
+    "result_format, expected",
+    [
+        (None, ResultFormat.MEMORY),
+        ("memory", ResultFormat.MEMORY),
+        ("counts", ResultFormat.COUNTS),
+    ],
+)
+def test_native_qobj_config_result_format(result_format, expected):
+    """The result_format in the qobj config is passed on to the native qobj config"""
+    qobj_dict = load_fixture("two-qubit_cz_qobj.json")
+    qobj = PulseQobj.from_dict(qobj_dict.get("params", {}).get("qobj", qobj_dict))
+    if result_format is not None:
+        qobj.config.result_format = result_format
+
+    native_config = to_native_qobj_config(qobj.config)
+
+    assert native_config.result_format == expected
+
+
+def _dummy_job(mem_slots: int, channels: Dict[int, np.ndarray]) -> QuantumJob:
+    """Creates a quantum job whose raw results are the given bits per channel"""
+    ds = _make_qdataset(channels)
+    qubits = sorted(channels.keys())
+    return QuantumJob(
+        tuid="t",
+        meas_return=MeasRet.APPENDED,
+        meas_level=MeasLvl.DISCRIMINATED,
+        meas_return_cols=ds[list(ds.data_vars)[0]].shape[0],
+        n_qubits=mem_slots,
+        memory_slot_size=mem_slots,
+        raw_results={"exp~0": ds},
+        qobj=_dummy_qobj(mem_slots, qubits),
+    )
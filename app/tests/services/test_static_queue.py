@@ -0,0 +1,151 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the static queue used as the waitlist"""
+from typing import List
+
+import pytest
+from pydantic import ValidationError
+
+from app.libs.queues.dtos import Job
+from app.libs.queues.types import StaticQueue
+
+_DURATIONS = [5, 30, 2, 10, 1, 20]
+
+
+@pytest.fixture
+def waitlist(redis_client) -> StaticQueue:
+    """A static queue with jobs of the durations in _DURATIONS, in that order"""
+    queue = StaticQueue("test_waitlist", connection=redis_client)
+    for idx, duration in enumerate(_DURATIONS):
+        queue.add(_job(idx, duration), idx, foo=duration)
+    yield queue
+
+
+@pytest.mark.parametrize(
+    "max_duration, expected",
+    [
+        (None, "job-0"),
+        (6, "job-0"),
+        (3, "job-2"),
+        (2, "job-4"),
+        (1, None),
+    ],
+)
+def test_pop_first(waitlist, max_duration, expected):
+    """pop_first pops the first job in FIFO order that is shorter than max_duration"""
+    job_tuple = waitlist.pop_first(max_duration=max_duration)
+
+    if expected is None:
+        assert job_tuple is None
+        assert waitlist.total_duration == sum(_DURATIONS)
+        return
+
+    job, args, kwargs = job_tuple
+    idx = int(job.job_id.split("-")[1])
+    assert job.job_id == expected
+    assert args == (idx,)
+    assert kwargs == {"foo": _DURATIONS[idx]}
+    assert waitlist.total_duration == sum(_DURATIONS) - _DURATIONS[idx]
+
+
+@pytest.mark.parametrize(
+    "max_total_duration, expected",
+    [
+        (None, ["job-0", "job-1", "job-2", "job-3", "job-4", "job-5"]),
+        (18, ["job-0", "job-2", "job-3", "job-4"]),
+        (7, ["job-0", "job-2"]),
+        (0.5, []),
+    ],
+)
+def test_pop_many(waitlist, max_total_duration, expected):
+    """pop_many pops the jobs in FIFO order that fit in max_total_duration"""
+    jobs = [job for job, _, _ in waitlist.pop_many(max_total_duration)]
+
+    assert [job.job_id for job in jobs] == expected
+    assert waitlist.total_duration == sum(
+        _DURATIONS[idx] for idx in range(6) if f"job-{idx}" not in expected
+    )
+    assert _job_ids(waitlist) == [
+        f"job-{idx}" for idx in range(6) if f"job-{idx}" not in expected
+    ]
+
+
+def test_pop_job(waitlist):
+    """pop_job removes the given job from the queue keeping the order of the rest"""
+    job = _job(3, _DURATIONS[3])
+
+    popped_job, args, kwargs = waitlist.pop_job(job.storage_id)
+
+    assert popped_job.job_id == job.job_id
+    assert (args, kwargs) == ((3,), {"foo": 10})
+    assert _job_ids(waitlist) == ["job-0", "job-1", "job-2", "job-4", "job-5"]
+
+
+def test_pop_job_not_in_queue(waitlist):
+    """pop_job raises a ValidationError for jobs not in the queue, leaving the total duration as is"""
+    with pytest.raises(ValidationError):
+        waitlist.pop_job(_job(10, 3).storage_id)
+
+    assert waitlist.total_duration == sum(_DURATIONS)
+
+
+def test_next(waitlist):
+    """next pops the head of the queue and sets it as the current job"""
+    job, args, kwargs = waitlist.next()
+
+    assert job.job_id == "job-0"
+    assert (args, kwargs) == ((0,), {"foo": 5})
+    assert waitlist.get_total_duration_and_current_job() == (
+        sum(_DURATIONS[1:]),
+        job,
+    )
+
+
+def test_next_empty_queue(redis_client):
+    """next returns None for an empty queue"""
+    queue = StaticQueue("test_waitlist", connection=redis_client)
+
+    assert queue.next() is None
+    assert queue.get_total_duration_and_current_job() == (0, None)
+
+
+def test_legacy_list_queue(redis_client):
+    """Jobs in queues kept as lists by older versions are popped in FIFO order"""
+    queue = StaticQueue("test_waitlist", connection=redis_client)
+    for idx, duration in enumerate(_DURATIONS):
+        queue.add(_job(idx, duration))
+    redis_client.delete(queue._fifo, queue._durations)
+    redis_client.rpush(
+        queue.name, *[_job(idx, v).storage_id for idx, v in enumerate(_DURATIONS)]
+    )
+
+    job, _, _ = queue.pop_first(max_duration=3)
+
+    assert job.job_id == "job-2"
+    assert _job_ids(queue) == ["job-0", "job-1", "job-3", "job-4", "job-5"]
+    assert not redis_client.exists(queue.name)
+
+
+def _job(idx: int, duration: float) -> Job:
+    """Creates a job of the given index and duration"""
+    return Job(
+        job_id=f"job-{idx}",
+        device="test",
+        calibration_date="2026-01-01",
+        estimated_duration=duration,
+    )
+
+
+def _job_ids(queue: StaticQueue) -> List[str]:
+    """Gets the ids of the jobs left in the queue in FIFO order"""
+    return [job.job_id for job, _, _ in queue.pop_many()]
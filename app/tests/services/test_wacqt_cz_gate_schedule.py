@@ -11,6 +11,7 @@
 # that they have been altered from the originals.
 
 import math
+import pickle
 from pathlib import Path
 from types import SimpleNamespace
 
@@ -55,6 +56,34 @@ def test_compiled_schedule_matches_fixture():
     )
 
 
+@pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
+def test_serialized_experiment_compiles_like_original():
+    """
+    A QuantifyExperiment restored from its pickled dict, as is done between
+    preprocessing and execution, compiles to the same timing table as the original.
+    """
+    fixture_path = Path(get_fixture_path())
+    quantify_config_path = fixture_path / "two-qubit_quantify-config.json"
+
+    # the qobj dict is loaded for each call as PulseQobj.from_dict() mutates it
+    _, original_df = _compile_schedule_from_qobj(
+        load_fixture("two-qubit_cz_qobj.json"), quantify_config_path
+    )
+    _, restored_df = _compile_schedule_from_qobj(
+        load_fixture("two-qubit_cz_qobj.json"), quantify_config_path, roundtrip=True
+    )
+
+    pd.testing.assert_frame_equal(
+        restored_df.reset_index(drop=True),
+        original_df.reset_index(drop=True),
+        check_dtype=False,
+        atol=1e-12,
+        rtol=0,
+        check_exact=False,
+        obj="restored compiled schedule timing table",
+    )
+
+
 def _normalize_timing_table(df: pd.DataFrame) -> pd.DataFrame:
     """
     Produce a stable, comparable view of the timing table:
@@ -146,7 +175,9 @@ def _timing_table_df(compiled_schedule):
     return tt  # assume DataFrame
 
 
-def _compile_schedule_from_qobj(qobj_dict: dict, quantify_config_path: Path):
+def _compile_schedule_from_qobj(
+    qobj_dict: dict, quantify_config_path: Path, roundtrip: bool = False
+):
     # SUT pieces
     from quantify_scheduler.backends.graph_compilation import SerialCompiler
     from quantify_scheduler.device_under_test.quantum_device import QuantumDevice
@@ -158,41 +189,48 @@ def _compile_schedule_from_qobj(qobj_dict: dict, quantify_config_path: Path):
     # 1) Load config into QuantumDevice
     qcfg = load_quantify_config(quantify_config_path)
     qdev = QuantumDevice("DUT")
-    qdev.hardware_config(qcfg)
-    compiler = SerialCompiler(name="compiler")
-    comp_cfg = qdev.generate_compilation_config()
-
-    # 2) Hardware map for 2 qubits (q0, q1) + coupler u0
-    qubit_ids = ["q0", "q1"]
-    coupling_dict = {"u0": ("q0", "q1")}
-    hardware_map = generate_hardware_map(qubit_ids, coupling_dict, qcfg)
-
-    # 3) Build PulseQobj from dict – use the INNER object if wrapped under params.qobj
-    qdict = qobj_dict.get("params", {}).get("qobj", qobj_dict)
-    qobj = PulseQobj.from_dict(qdict)
-
-    # 4) Duck-typed native config (the mappers only need these attributes)
-    native_cfg = SimpleNamespace(
-        acq_return_type="append",
-        protocol=SimpleNamespace(value="SSBIntegrationComplex"),
-        bin_mode="append",
-        meas_level=qobj.config.meas_level,
-        meas_return=qobj.config.meas_return,
-        meas_return_cols=getattr(qobj.config, "memory_slot_size", 1),
-        n_qubits=qobj.config.n_qubits,
-        shots=qobj.config.shots,
-    )
-
-    # 5) Translate to native
-    expt = QuantifyExperiment.from_qobj_expt(
-        name=getattr(qobj.experiments[0].header, "name", "exp"),
-        expt=qobj.experiments[0],
-        qobj_config=qobj.config,
-        native_config=native_cfg,
-        hardware_map=hardware_map,
-    )
-
-    # 6) Compile and normalize timing table
-    compiled = compiler.compile(schedule=expt.schedule, config=comp_cfg)
-    df = _timing_table_df(compiled)
-    return compiled, _normalize_timing_table(pd.DataFrame(df))
+    # the device is closed at the end so that the name can be reused by the next call
+    try:
+        qdev.hardware_config(qcfg)
+        compiler = SerialCompiler(name="compiler")
+        comp_cfg = qdev.generate_compilation_config()
+
+        # 2) Hardware map for 2 qubits (q0, q1) + coupler u0
+        qubit_ids = ["q0", "q1"]
+        coupling_dict = {"u0": ("q0", "q1")}
+        hardware_map = generate_hardware_map(qubit_ids, coupling_dict, qcfg)
+
+        # 3) Build PulseQobj from dict – use the INNER object if wrapped under params.qobj
+        qdict = qobj_dict.get("params", {}).get("qobj", qobj_dict)
+        qobj = PulseQobj.from_dict(qdict)
+
+        # 4) Duck-typed native config (the mappers only need these attributes)
+        native_cfg = SimpleNamespace(
+            acq_return_type="append",
+            protocol=SimpleNamespace(value="SSBIntegrationComplex"),
+            bin_mode="append",
+            meas_level=qobj.config.meas_level,
+            meas_return=qobj.config.meas_return,
+            meas_return_cols=getattr(qobj.config, "memory_slot_size", 1),
+            n_qubits=qobj.config.n_qubits,
+            shots=qobj.config.shots,
+        )
+
+        # 5) Translate to native
+        expt = QuantifyExperiment.from_qobj_expt(
+            name=getattr(qobj.experiments[0].header, "name", "exp"),
+            expt=qobj.experiments[0],
+            qobj_config=qobj.config,
+            native_config=native_cfg,
+            hardware_map=hardware_map,
+        )
+        if roundtrip:
+            expt_dict = pickle.loads(pickle.dumps(expt.to_dict()))
+            expt = QuantifyExperiment.from_dict(expt_dict, config=qobj.config)
+
+        # 6) Compile and normalize timing table
+        compiled = compiler.compile(schedule=expt.schedule, config=comp_cfg)
+        df = _timing_table_df(compiled)
+        return compiled, _normalize_timing_table(pd.DataFrame(df))
+    finally:
+        qdev.close()
@@ -17,7 +17,10 @@ import numpy as np
 import pytest
 import xarray as xr
 
-from ...libs.quantum_executor.base.quantum_job import xarray_to_list
+from ...libs.quantum_executor.base.quantum_job import (
+    iter_xarray_to_list,
+    xarray_to_list,
+)
 
 
 def _make_iq_dataset(slots: Dict[int, np.ndarray]) -> xr.Dataset:
@@ -84,9 +87,9 @@ def test_xarray_to_list_multi_rep_multi_channel():
 
     expected = [
         [
-            [(1.0, 1.0), (5.0, 5.0)],  # repetition 0
-            [(3.0, 3.0), (7.0, 7.0)],  # repetition 1
-            [(4.0, 0.0), (3.0, 6.0)],  # repetition 2
+            [[1.0, 1.0], [5.0, 5.0]],  # repetition 0
+            [[3.0, 3.0], [7.0, 7.0]],  # repetition 1
+            [[4.0, 0.0], [3.0, 6.0]],  # repetition 2
         ]
     ]
     assert got == expected
@@ -101,7 +104,7 @@ def test_xarray_to_list_averaged_data():
 
     got = xarray_to_list(_stub_job(raw_results, qobj=qobj))
 
-    expected = [[[(1.0, 0.0), (3.0, 0.0)]]]
+    expected = [[[[1.0, 0.0], [3.0, 0.0]]]]
     assert got == expected
 
 
@@ -145,8 +148,46 @@ def test_xarray_to_list_orders_by_memory_slot_not_qubit_order():
 
     expected = [
         [
-            [(10.0, 1.0), (20.0, 3.0)],  # rep0: slot0 then slot3
-            [(11.0, 2.0), (21.0, 4.0)],  # rep1
+            [[10.0, 1.0], [20.0, 3.0]],  # rep0: slot0 then slot3
+            [[11.0, 2.0], [21.0, 4.0]],  # rep1
         ]
     ]
     assert got == expected
+
+
+def test_xarray_to_list_replaces_non_finite_values():
+    """Non-finite IQ values are replaced with zeros"""
+    ch0 = np.array([[np.nan + 1j], [2 + 2j]])
+    ch1 = np.array([[1 + np.inf * 1j], [3 + 3j]])
+
+    raw_results = {"exp~0": _make_iq_dataset({0: ch0, 1: ch1})}
+    qobj = _dummy_qobj(qubits=[0, 1], slots=[0, 1])
+
+    got = xarray_to_list(_stub_job(raw_results, qobj=qobj))
+
+    expected = [
+        [
+            [[0.0, 0.0], [0.0, 0.0]],
+            [[2.0, 2.0], [3.0, 3.0]],
+        ]
+    ]
+    assert got == expected
+
+
+def test_iter_xarray_to_list_yields_one_experiment_at_a_time():
+    """iter_xarray_to_list yields the same experiments as xarray_to_list, one by one"""
+    raw_results = {
+        "exp~0": _make_iq_dataset({0: np.array([[1 + 1j], [2 + 2j]])}),
+        "exp~1": _make_iq_dataset({0: np.array([[3 + 3j], [4 + 4j]])}),
+    }
+    job = _stub_job(raw_results)
+
+    iterator = iter_xarray_to_list(job)
+
+    assert next(iterator) == [[[1.0, 1.0]], [[2.0, 2.0]]]
+    assert next(iterator) == [[[3.0, 3.0]], [[4.0, 4.0]]]
+    assert next(iterator, None) is None
+    assert xarray_to_list(job) == [
+        [[[1.0, 1.0]], [[2.0, 2.0]]],
+        [[[3.0, 3.0]], [[4.0, 4.0]]],
+    ]
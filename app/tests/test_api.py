@@ -43,8 +43,9 @@ from rq import Queue as RqQueue
 from rq import SimpleWorker
 from rq.job import Job as RqJob
 
-from app.libs.queues.dtos import Job, JobStatus, Stage, Timestamps
+from app.libs.queues.dtos import Job, JobResult, JobStatus, Stage, Timestamps
 from app.services.booking.models import Booking
+from app.services.scheduler.store import init_job_results_store, init_jobs_store
 from app.tests.conftest import (
     CLIENT_AND_RQ_WORKER_TUPLES,
     FASTAPI_CLIENTS,
@@ -706,6 +707,7 @@ def test_submit_jobs_no_booking(
                 stage=Stage.FINAL_W,
                 timestamps=job_in_db.timestamps,
                 result=job_in_db.result,
+                result_info=job_in_db.result_info,
                 created_at=job_in_db.created_at,
                 updated_at=job_in_db.updated_at,
                 calibration_date=job_in_db.calibration_date,
@@ -733,8 +735,11 @@ def test_submit_jobs_no_booking(
 
             # Check that the results are appropriate
             # This can be seen as testing gate fidelity ~70%
+            # Check that the results are stored apart from the job
+            assert job_in_db.result is None
+            job_result = init_job_results_store(redis_conn).get(job_in_db.job_id)
             assert _job_results_match(
-                results=job_in_db.result.memory[0], expected_min_counts=expected_counts
+                results=job_result.memory[0], expected_min_counts=expected_counts
             )
 
             # Check that the timestamps are appropriately filled
@@ -1509,6 +1514,7 @@ def test_view_job(
             stage=Stage.FINAL_W,
             status=JobStatus.SUCCESSFUL,
             result=complete_job.result,
+            result_info=complete_job.result_info,
             timestamps=complete_job.timestamps,
             estimated_duration=complete_job.estimated_duration,
             actual_duration=complete_job.actual_duration,
@@ -1611,6 +1617,31 @@ def test_admin_view_job(
         assert received_job == expected_job
 
 
+@pytest.mark.parametrize("client, _redis, worker, job, device", _VIEW_JOBS_PARAMS)
+def test_view_legacy_job_result(client, _redis, worker, job, device):
+    """Get to /jobs/{job_id}/result returns the inline results of jobs saved by older versions"""
+    with client as client:
+        user_id, _ = _create_user(client, user=USERS[0])
+        result = JobResult(memory=[["0x0", "0x1", "0x1"]])
+        legacy_job = Job(
+            job_id=job["job_id"],
+            device=device,
+            calibration_date="2026-01-01",
+            user_id=user_id,
+            stage=Stage.FINAL_W,
+            status=JobStatus.SUCCESSFUL,
+            result=result,
+        )
+        init_jobs_store(_redis).insert(legacy_job)
+
+        response = client.get(
+            f"/jobs/{legacy_job.job_id}/result", headers=create_mss_headers(user_id)
+        )
+
+        assert response.status_code == 200
+        assert JobResult.model_validate(response.json()) == result
+
+
 @pytest.mark.parametrize("client, _redis, worker, job, device", _VIEW_JOBS_PARAMS)
 def test_view_jobs(
     client, _redis, worker, job, device, jobs_folder, mocker: MockerFixture
@@ -1683,6 +1714,7 @@ def test_view_jobs(
                 "stage": Stage.FINAL_W.value,
                 "updated_at": jobs_in_resp[v["job_id"]]["updated_at"],
                 "result": jobs_in_resp[v["job_id"]]["result"],
+                "result_info": jobs_in_resp[v["job_id"]]["result_info"],
                 "timestamps": jobs_in_resp[v["job_id"]]["timestamps"],
                 "estimated_duration": jobs_in_resp[v["job_id"]]["estimated_duration"],
                 "actual_duration": jobs_in_resp[v["job_id"]]["actual_duration"],
@@ -1794,6 +1826,7 @@ def test_view_jobs_by_status(
                 stage=Stage.FINAL_W,
                 status=JobStatus.SUCCESSFUL,
                 result=jobs_in_resp[job_id]["result"],
+                result_info=jobs_in_resp[job_id]["result_info"],
                 timestamps=Timestamps(**jobs_in_resp[job_id]["timestamps"]),
                 estimated_duration=jobs_in_resp[job_id]["estimated_duration"],
                 actual_duration=jobs_in_resp[job_id]["actual_duration"],
@@ -1826,6 +1859,92 @@ def test_view_jobs_by_status(
         assert all_jobs_resp == _paginate(expected_all_jobs)
 
 
+@pytest.mark.parametrize("client, _redis, worker, job, device", _VIEW_JOBS_PARAMS)
+def test_view_jobs_with_cursor(
+    client, _redis, worker, job, device, jobs_folder, mocker: MockerFixture
+):
+    """GET '/jobs' with the returned next_cursor pages through the user's jobs, newest first"""
+    with client as client:
+        users = _create_many_users(client)
+        user_id = users[0]["id"]
+
+        raw_jobs = [{**job, "job_id": f"{uuid4()}"} for _ in range(7)]
+        job_metadata_list = _get_job_submission_metadata(
+            client, jobs=raw_jobs, users=users, mocker=mocker, jobs_folder=jobs_folder
+        )
+        job_ids = _submit_multiple_jobs_v2(client, data=job_metadata_list)
+        expected_job_ids = [
+            job_id
+            for idx, job_id in reversed(list(enumerate(job_ids)))
+            if idx % len(users) == 0
+        ]
+
+        headers = create_mss_headers(user_id)
+        params = {"limit": 2, "fields": "job_id,status"}
+        received_jobs = []
+        while True:
+            response = client.get("/jobs", headers=headers, params=params)
+            assert response.status_code == 200
+
+            page = response.json()
+            received_jobs.extend(page["data"])
+            if "next_cursor" not in page:
+                break
+            params["cursor"] = page["next_cursor"]
+
+        assert received_jobs == [
+            {"job_id": job_id, "status": JobStatus.PENDING.value}
+            for job_id in expected_job_ids
+        ]
+
+
+@pytest.mark.parametrize("client, _redis, worker, job, device", _VIEW_JOBS_PARAMS)
+def test_stream_jobs(
+    client, _redis, worker, job, device, jobs_folder, mocker: MockerFixture
+):
+    """GET '/jobs' accepting application/x-ndjson streams the user's jobs, one per line"""
+    with client as client:
+        users = _create_many_users(client)
+        user_id = users[0]["id"]
+
+        raw_jobs = [{**job, "job_id": f"{uuid4()}"} for _ in range(7)]
+        job_metadata_list = _get_job_submission_metadata(
+            client, jobs=raw_jobs, users=users, mocker=mocker, jobs_folder=jobs_folder
+        )
+        job_ids = _submit_multiple_jobs_v2(client, data=job_metadata_list)
+        expected_job_ids = [
+            job_id
+            for idx, job_id in reversed(list(enumerate(job_ids)))
+            if idx % len(users) == 0
+        ]
+
+        headers = {**create_mss_headers(user_id), "Accept": "application/x-ndjson"}
+        response = client.get(
+            "/jobs", headers=headers, params={"fields": "job_id,user_id"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert [json.loads(line) for line in response.text.splitlines()] == [
+            {"job_id": job_id, "user_id": user_id} for job_id in expected_job_ids
+        ]
+
+
+@pytest.mark.parametrize("client, _redis, worker, job, device", _VIEW_JOBS_PARAMS)
+def test_view_jobs_unknown_fields(
+    client, _redis, worker, job, device, jobs_folder, mocker: MockerFixture
+):
+    """GET '/jobs' with unknown fields returns 400"""
+    with client as client:
+        users = _create_many_users(client)
+        headers = create_mss_headers(users[0]["id"])
+
+        response = client.get("/jobs", headers=headers, params={"fields": "foo,status"})
+
+        assert response.status_code == 400
+        assert response.json() == {"detail": "unknown fields ['foo']"}
+
+
 @pytest.mark.parametrize("client, _redis, worker, job, device", _VIEW_JOBS_PARAMS)
 def test_unauthenticated_view_jobs(
     client, _redis, worker, job, device, jobs_folder, mocker: MockerFixture
@@ -2343,6 +2462,8 @@ def test_init_recalibration_with_interval(
         ).total_seconds()
         with open(quantify_seed_file, "r") as file:
             seed_file_content = toml.load(file)
+        # the time of the recalibration is also saved in the seed file
+        last_calibrated = seed_file_content["calibration_config"].pop("last_calibrated")
 
         assert initial_rq_interval == initial_interval
         assert final_rq_interval == new_interval
@@ -2350,6 +2471,7 @@ def test_init_recalibration_with_interval(
         assert initial_rq_job.is_canceled
         assert math.isclose(final_actual_interval, new_interval, abs_tol=1)
         assert seed_file_content == _EXPECTED_RECALIBRATION_SEED_CONTENT
+        assert datetime.fromisoformat(last_calibrated) >= before_request_timestamp
 
 
 @pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
@@ -2398,6 +2520,8 @@ def test_init_recalibration_without_interval(
         ).total_seconds()
         with open(quantify_seed_file, "r") as file:
             seed_file_content = toml.load(file)
+        # the time of the recalibration is also saved in the seed file
+        last_calibrated = seed_file_content["calibration_config"].pop("last_calibrated")
 
         assert initial_rq_interval == initial_interval
         assert final_rq_interval == initial_interval
@@ -2405,6 +2529,7 @@ def test_init_recalibration_without_interval(
         assert initial_rq_job.is_canceled
         assert math.isclose(final_actual_interval, initial_interval, abs_tol=1)
         assert seed_file_content == _EXPECTED_RECALIBRATION_SEED_CONTENT
+        assert datetime.fromisoformat(last_calibrated) >= before_request_timestamp
 
 
 @pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
@@ -2448,12 +2573,17 @@ def test_init_recalibration_with_start_time(
         first_rq_job = RqJob.fetch(first_rq_job_id, connection=redis_conn)
         with open(quantify_seed_file, "r") as file:
             seed_file_content = toml.load(file)
+        # the time of the recalibration is also saved in the seed file
+        last_calibrated = seed_file_content["calibration_config"].pop("last_calibrated")
 
         assert first_rq_job.is_finished
         assert math.isclose(
             first_rq_job.started_at.timestamp(), start_timestamp.timestamp(), abs_tol=1
         )
         assert seed_file_content == _EXPECTED_RECALIBRATION_SEED_CONTENT
+        assert datetime.fromisoformat(last_calibrated) >= start_timestamp - timedelta(
+            seconds=1
+        )
 
 
 @pytest.mark.skipif(not HAS_QUANTIFY, reason="requires quantify")
@@ -0,0 +1,59 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Tests for the shared sql engines"""
+import pytest
+from sqlalchemy import inspect
+from sqlmodel import SQLModel
+
+from app.services.booking.models import Booking, User
+from app.utils.sql_db import dispose_sql_engines, get_sql_engine
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    """The URL to a temporary SQLite database"""
+    yield f"sqlite:///{tmp_path / 'test.db'}"
+    dispose_sql_engines()
+
+
+def test_get_sql_engine_reuses_engine(db_url, mocker):
+    """get_sql_engine returns the same engine for the same URL, creating tables once"""
+    create_all = mocker.spy(SQLModel.metadata, "create_all")
+
+    first = get_sql_engine(db_url, models=[Booking, User])
+    second = get_sql_engine(db_url, models=[Booking, User])
+
+    assert first is second
+    assert create_all.call_count == 1
+    assert set(inspect(first).get_table_names()) == {"booking", "user"}
+
+
+def test_get_sql_engine_creates_new_tables(db_url):
+    """get_sql_engine creates the tables of models not used before with the same URL"""
+    first = get_sql_engine(db_url, models=[User])
+    second = get_sql_engine(db_url, models=[Booking, User])
+
+    assert first is second
+    assert set(inspect(first).get_table_names()) == {"booking", "user"}
+
+
+def test_dispose_sql_engines(db_url):
+    """dispose_sql_engines makes get_sql_engine create a new engine with its tables"""
+    first = get_sql_engine(db_url, models=[Booking, User])
+    SQLModel.metadata.drop_all(first)
+
+    dispose_sql_engines()
+    second = get_sql_engine(db_url, models=[Booking, User])
+
+    assert first is not second
+    assert set(inspect(second).get_table_names()) == {"booking", "user"}
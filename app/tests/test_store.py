@@ -12,17 +12,20 @@
 #
 """Module containing tests for the store library"""
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, List, Tuple, Type, Union
+from typing import Dict, List, Optional, Tuple, Type, Union
 from uuid import uuid4
 
 import pytest
-from pydantic import Field, ValidationError
+from pydantic import BaseModel, Field, ValidationError
 from redis import Redis
 
 from app.libs.queues.dtos import JobStatus
 from app.tests.utils.datetime import get_current_timestamp_str
 from app.tests.utils.records import with_current_timestamps
+from app.utils import redis_store
+from app.utils.exc import ConflictError, InvalidRequestError, UpdateConflictError
 from app.utils.model import create_partial_schema
 from app.utils.redis_store import Collection, ItemNotFoundError, Schema
 
@@ -44,6 +47,33 @@ class AuthLog(Credentials):
     updated_at: str = Field(default_factory=get_current_timestamp_str)
 
 
+class SortedAuthLog(AuthLog):
+    """An auth log sorted by the time it was created"""
+
+    __sort_field__ = "created_at"
+
+
+class Period(BaseModel):
+    """The start and end of a period"""
+
+    started: Optional[str] = None
+    finished: Optional[str] = None
+
+
+class ScheduledAuthLog(AuthLog):
+    """An auth log with a nested model"""
+
+    period: Optional[Period] = None
+
+
+class ScoredAuthLog(Credentials):
+    """An auth log indexed by fields that are not strings"""
+
+    __index_fields__ = ("is_valid", "score")
+    is_valid: bool = True
+    score: float = 0.0
+
+
 # derived models
 PartialAuthLog = create_partial_schema(
     "PartialAuthLog", original=AuthLog, exclude=("created_at",)
@@ -458,6 +488,217 @@ def test_update_indexes(redis_client, payload):
     )
 
 
+@pytest.mark.parametrize("payload", _AUTH_LOG_LIST)
+def test_update_concurrently(redis_client, payload):
+    """Concurrent calls to update() different fields of the same item are not lost"""
+    auth_logs = Collection(redis_client, schema=AuthLog)
+    original_item = AuthLog(**{"status": "pending", **payload})
+    auth_logs.insert(original_item)
+    key = _get_redis_key(original_item)
+    timestamps = [_get_current_timestamp() for _ in range(20)]
+    statuses = [JobStatus.EXECUTING, JobStatus.SUCCESSFUL] * 10
+
+    # each field is updated in order by its own thread
+    with (
+        ThreadPoolExecutor(max_workers=1) as status_updater,
+        ThreadPoolExecutor(max_workers=1) as timestamp_updater,
+    ):
+        status_updates = [
+            status_updater.submit(auth_logs.update, key, {"status": status})
+            for status in statuses
+        ]
+        timestamp_updates = [
+            timestamp_updater.submit(auth_logs.update, key, {"updated_at": timestamp})
+            for timestamp in timestamps
+        ]
+
+    for future in status_updates + timestamp_updates:
+        future.result()
+
+    item_in_db = _get_redis_value(redis_client, original_item)
+    status_idx_prefix = _INDEX_PREFIXES["status"]
+
+    expected_item = original_item.model_copy(
+        update={"status": statuses[-1], "updated_at": timestamps[-1]}
+    )
+
+    assert item_in_db == expected_item.model_dump_json()
+    assert redis_client.zrange(f"{status_idx_prefix}{statuses[-1]}", 0, -1) == [
+        key.encode()
+    ]
+    assert redis_client.zrange(f"{status_idx_prefix}{statuses[0]}", 0, -1) == []
+    assert redis_client.zrange(f"{status_idx_prefix}{JobStatus.PENDING}", 0, -1) == []
+
+
+@pytest.mark.parametrize("payload", _AUTH_LOG_LIST)
+def test_update_with_missing_defaults(redis_client, payload, freezer):
+    """Calling update() on an item stored without some fields that have defaults fills them"""
+    auth_logs = Collection(redis_client, schema=AuthLog)
+    original_item = AuthLog(**{"status": "pending", **payload})
+    hashmap_name = _get_redis_hashmap_name(AuthLog)
+    key = _get_redis_key(original_item)
+    redis_client.hset(
+        hashmap_name,
+        key,
+        original_item.model_dump_json(exclude={"created_at", "updated_at"}),
+    )
+
+    new_item = auth_logs.update(key, {"status": "successful"})
+    new_item_in_db = _get_redis_value(redis_client, original_item)
+
+    assert new_item_in_db == new_item.model_dump_json()
+    assert new_item.model_dump() == {
+        **original_item.model_dump(),
+        "status": "successful",
+    }
+
+
+def test_update_many(redis_client, freezer):
+    """Calling update_many() updates each item with its own updates and moves their indexes"""
+    auth_logs = Collection(redis_client, schema=AuthLog)
+    original_items = [
+        AuthLog(**{"status": "pending", **payload}) for payload in _AUTH_LOG_LIST
+    ]
+    auth_logs.insert_many(original_items)
+    statuses = [JobStatus.EXECUTING, JobStatus.SUCCESSFUL, JobStatus.FAILED]
+
+    got = auth_logs.update_many(
+        [
+            (_get_redis_key(item), {"status": status})
+            for item, status in zip(original_items, statuses)
+        ]
+    )
+
+    expected = [
+        item.model_copy(update={"status": status})
+        for item, status in zip(original_items, statuses)
+    ]
+    status_idx_prefix = _INDEX_PREFIXES["status"]
+    assert got == expected
+    assert [_get_redis_value(redis_client, item) for item in original_items] == [
+        item.model_dump_json() for item in expected + original_items[len(statuses) :]
+    ]
+    for item, status in zip(original_items, statuses):
+        assert redis_client.zrange(f"{status_idx_prefix}{status}", 0, -1) == [
+            _get_redis_key(item).encode()
+        ]
+    assert sorted(
+        redis_client.zrange(f"{status_idx_prefix}{JobStatus.PENDING}", 0, -1)
+    ) == sorted(_get_redis_key(item).encode() for item in original_items[3:])
+
+
+def test_update_many_not_found(redis_client, freezer):
+    """Calling update_many() fails for the items that do not exist, updating the rest"""
+    auth_logs = Collection(redis_client, schema=AuthLog)
+    original_item = AuthLog(**{"status": "pending", **_AUTH_LOG_LIST[0]})
+    auth_logs.insert(original_item)
+
+    with pytest.raises(ItemNotFoundError, match=r"'foo@@@baz' not found"):
+        auth_logs.update_many(
+            [
+                (_get_redis_key(original_item), {"status": "successful"}),
+                ("foo@@@baz", {"status": "failed"}),
+            ]
+        )
+
+    expected_item = original_item.model_copy(update={"status": JobStatus.SUCCESSFUL})
+    assert _get_redis_hmap(redis_client, model=AuthLog) == {
+        _get_redis_key(original_item): expected_item.model_dump_json()
+    }
+
+
+def test_update_many_expected(redis_client, freezer):
+    """Calling update_many() with expected values fails for the items that do not have them"""
+    auth_logs = Collection(redis_client, schema=AuthLog)
+    original_items = [
+        AuthLog(**{"status": "pending", **payload}) for payload in _AUTH_LOG_LIST[:3]
+    ]
+    auth_logs.insert_many(original_items)
+    keys = [_get_redis_key(item) for item in original_items]
+
+    with pytest.raises(UpdateConflictError, match=rf"'{keys[1]}' does not have") as exc:
+        auth_logs.update_many(
+            [(key, {"status": "successful"}) for key in keys],
+            expected=[{"status": "pending"}, {"status": "pending"}, None],
+        )
+
+    got = auth_logs.update(
+        keys[1], {"status": "cancelled"}, expected={"status": JobStatus.EXECUTING}
+    )
+
+    assert exc.value.keys == [keys[1]]
+    assert exc.value.updated_items == [
+        original_items[0].model_copy(update={"status": JobStatus.SUCCESSFUL}),
+        original_items[2].model_copy(update={"status": JobStatus.SUCCESSFUL}),
+    ]
+    assert got == original_items[1].model_copy(update={"status": JobStatus.CANCELLED})
+    assert [_get_redis_value(redis_client, item) for item in original_items] == [
+        original_items[0].model_copy(update={"status": "successful"}).model_dump_json(),
+        got.model_dump_json(),
+        original_items[2].model_copy(update={"status": "successful"}).model_dump_json(),
+    ]
+
+
+def test_update_nested(redis_client, freezer):
+    """Calling update() merges nested models field by field"""
+    logs = Collection(redis_client, schema=ScheduledAuthLog)
+    original_item = ScheduledAuthLog(
+        **_AUTH_LOG_LIST[0], status="pending", period=Period(started="2026-01-01")
+    )
+    logs.insert(original_item)
+    key = _get_redis_key(original_item)
+
+    got = logs.update(key, {"period": {"finished": "2026-01-02"}})
+
+    expected = original_item.model_copy(
+        update={"period": Period(started="2026-01-01", finished="2026-01-02")}
+    )
+    assert got == expected
+    assert _get_redis_value(redis_client, original_item) == expected.model_dump_json()
+
+
+def test_update_non_string_indexes(redis_client):
+    """Calling update() moves the index entries of fields that are not strings"""
+    logs = Collection(redis_client, schema=ScoredAuthLog)
+    original_item = ScoredAuthLog(**_AUTH_LOG_LIST[0], score=0.00001)
+    logs.insert(original_item)
+    key = _get_redis_key(original_item)
+    prefix = f"__index__{__name__}.scoredauthlog_"
+
+    logs.update(key, {"is_valid": False, "score": 2.5})
+
+    assert redis_client.zrange(f"{prefix}::is_valid::False", 0, -1) == [key.encode()]
+    assert redis_client.zrange(f"{prefix}::is_valid::True", 0, -1) == []
+    assert redis_client.zrange(f"{prefix}::score::2.5", 0, -1) == [key.encode()]
+    assert redis_client.zrange(f"{prefix}::score::1e-05", 0, -1) == []
+
+
+def test_update_rewritten_once(redis_client, freezer):
+    """Calling update() on items that are rewritten as the schema dumps them applies the updates once"""
+    auth_logs = Collection(redis_client, schema=AuthLog)
+    original_item = AuthLog(**_AUTH_LOG_LIST[0], status="pending")
+    hashmap_name = _get_redis_hashmap_name(AuthLog)
+    key = _get_redis_key(original_item)
+    # stored without the fields that have defaults, so the patched item is rewritten
+    redis_client.hset(
+        hashmap_name,
+        key,
+        original_item.model_dump_json(exclude={"created_at", "updated_at"}),
+    )
+    concurrent_item = original_item.model_copy(update={"status": JobStatus.FAILED})
+    update_optimistically = auth_logs._update_optimistically
+
+    def update_after_concurrent_change(*args, **kwargs):
+        redis_client.hset(hashmap_name, key, concurrent_item.model_dump_json())
+        return update_optimistically(*args, **kwargs)
+
+    auth_logs._update_optimistically = update_after_concurrent_change
+    got = auth_logs.update(key, {"status": "successful"})
+
+    assert got == concurrent_item
+    assert _get_redis_value(redis_client, original_item) == got.model_dump_json()
+
+
 @pytest.mark.parametrize("payload", _AUTH_LOG_LIST)
 def test_insert(redis_client, payload):
     """Calling insert() replaces the entire item with a new one, the optional TTL expiring"""
@@ -580,6 +821,22 @@ def test_insert_index(redis_client):
         assert sorted(got) == sorted(expected)
 
 
+def test_insert_many(redis_client):
+    """Calling insert_many() inserts all the items and their indexes"""
+    auth_logs = Collection(redis_client, schema=AuthLog)
+    items = [AuthLog(**{"status": "pending", **payload}) for payload in _AUTH_LOG_LIST]
+
+    got = auth_logs.insert_many(items)
+
+    assert got == items
+    assert _get_redis_hmap(redis_client, model=AuthLog) == {
+        _get_redis_key(item): item.model_dump_json() for item in items
+    }
+    for item in items:
+        for idx_key in _get_redis_index_keys(item):
+            assert _get_redis_key(item).encode() in redis_client.zrange(idx_key, 0, -1)
+
+
 @pytest.mark.parametrize("payload", _AUTH_LOG_LIST)
 def test_insert_invalid_model(redis_client, payload, freezer):
     """insert() fails if the payload passed does not satisfy the model"""
@@ -737,6 +994,155 @@ def test_find_by_index(redis_client, freezer):
     )
 
 
+@pytest.mark.parametrize("desc", [True, False])
+@pytest.mark.parametrize("skip, limit", [(0, None), (1, 2), (3, 10), (10, 2)])
+def test_find_by_index_sorted(redis_client, skip, limit, desc):
+    """Calling find_by_index() pages through the items in the order of the sort field"""
+    db = Collection(redis_client, schema=SortedAuthLog)
+    items = _get_sorted_auth_logs()
+    db.insert_many(items)
+    db.insert(SortedAuthLog(job_id="other", app_token="bar", status="executing"))
+
+    got = db.find_by_index({"status": "pending"}, skip=skip, limit=limit, desc=desc)
+
+    expected = list(reversed(items)) if desc else items
+    assert got == _slice(expected, skip=skip, limit=limit)
+
+
+def test_find_by_index_sorted_without_filters(redis_client):
+    """Calling find_by_index() without filters pages through all items that have not expired"""
+    db = Collection(redis_client, schema=SortedAuthLog)
+    items = _get_sorted_auth_logs()
+    db.insert_many(items)
+    # the item expires
+    redis_client.hdel(_get_redis_hashmap_name(SortedAuthLog), _get_redis_key(items[1]))
+
+    got = db.find_by_index({}, skip=2, limit=2, desc=True)
+
+    assert got == [items[2], items[0]]
+    assert redis_client.zcard(f"__sort__{_get_redis_hashmap_name(SortedAuthLog)}") == 4
+
+
+def test_find_by_index_sorted_with_unsorted_items(redis_client):
+    """Calling find_by_index() returns items stored before the sort index was kept"""
+    db = Collection(redis_client, schema=SortedAuthLog)
+    items = _get_sorted_auth_logs()
+    db.insert_many(items)
+    redis_client.zrem(
+        f"__sort__{_get_redis_hashmap_name(SortedAuthLog)}", _get_redis_key(items[2])
+    )
+
+    got = db.find_by_index({"status": "pending"})
+
+    assert got == [items[2], *items[:2], *items[3:]]
+
+
+def test_find_by_index_with_expired_index_entries(redis_client):
+    """Calling find_by_index() with many filters skips the items whose index entries expired"""
+    db = Collection(redis_client, schema=SortedAuthLog)
+    items = _get_sorted_auth_logs()
+    db.insert_many(items)
+    expired_timestamp = datetime.now(timezone.utc).timestamp() - 60
+    # the index entries of the first item expire, before its record is removed
+    for index_key in (
+        db._get_index_key("app_token", "bar"),
+        db._get_index_key("status", JobStatus.PENDING),
+    ):
+        redis_client.zadd(index_key, {_get_redis_key(items[0]): expired_timestamp})
+
+    filters = {"app_token": "bar", "status": "pending"}
+    got = db.find_by_index(filters)
+    first_page = db.find_by_index(filters, skip=0, limit=1)
+    second_page = db.find_by_index(filters, skip=1, limit=1)
+
+    assert got == [items[1]]
+    assert first_page == [items[1]]
+    assert second_page == []
+
+
+def test_cleanup_sort_index_in_batches(redis_client, monkeypatch):
+    """The keys of expired items are removed from the sort index a batch at a time"""
+    monkeypatch.setattr(redis_store, "_PRUNE_BATCH_SIZE", 2)
+    db = Collection(redis_client, schema=SortedAuthLog, cleanup_interval=0)
+    items = _get_sorted_auth_logs()
+    db.insert_many(items)
+    hashmap_name = _get_redis_hashmap_name(SortedAuthLog)
+    # the items expire
+    redis_client.hdel(hashmap_name, _get_redis_key(items[0]), _get_redis_key(items[3]))
+
+    new_item = SortedAuthLog(job_id="new", app_token="bar", status="pending")
+    db.insert(new_item)
+
+    sort_index = redis_client.zrange(f"__sort__{hashmap_name}", 0, -1)
+    assert sorted(sort_index) == sorted(
+        _get_redis_key(item).encode() for item in [*items[1:3], items[4], new_item]
+    )
+
+
+@pytest.mark.parametrize("filters", [{}, {"status": "pending"}])
+@pytest.mark.parametrize("desc", [True, False])
+def test_find_page_by_index_cursor(redis_client, filters, desc):
+    """Calling find_page_by_index() with the returned cursors pages through all items once,
+    even when items are inserted in between pages"""
+    db = Collection(redis_client, schema=SortedAuthLog)
+    items = _get_sorted_auth_logs()
+    db.insert_many(items)
+    expected = list(reversed(items)) if desc else items
+    new_item = SortedAuthLog(
+        job_id="new", app_token="bar", status="pending", created_at="2026-02-01"
+    )
+
+    got, cursor = db.find_page_by_index(filters, limit=2, desc=desc)
+    db.insert(new_item)
+    while cursor is not None:
+        page, cursor = db.find_page_by_index(filters, cursor=cursor, limit=2, desc=desc)
+        got.extend(page)
+
+    assert got == (expected if desc else [*expected, new_item])
+
+
+def test_find_page_by_index_cursor_equal_scores(redis_client):
+    """Calling find_page_by_index() with the returned cursors pages through items
+    of the same sort value once"""
+    db = Collection(redis_client, schema=SortedAuthLog)
+    items = [
+        item.model_copy(update={"created_at": "2026-01-01"})
+        for item in _get_sorted_auth_logs()
+    ]
+    db.insert_many(items)
+
+    got, cursor = db.find_page_by_index({"status": "pending"}, limit=2)
+    while cursor is not None:
+        page, cursor = db.find_page_by_index(
+            {"status": "pending"}, cursor=cursor, limit=2
+        )
+        got.extend(page)
+
+    assert got == _sort_by_key(items)
+
+
+def test_find_page_by_index_invalid_cursor(redis_client):
+    """Calling find_page_by_index() with an invalid cursor raises InvalidRequestError"""
+    db = Collection(redis_client, schema=SortedAuthLog)
+    db.insert_many(_get_sorted_auth_logs())
+
+    with pytest.raises(InvalidRequestError, match="invalid cursor"):
+        db.find_page_by_index({"status": "pending"}, cursor="foo", limit=2)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 100])
+@pytest.mark.parametrize("skip, limit", [(0, None), (1, 3), (4, 10)])
+def test_iter_by_index(redis_client, batch_size, skip, limit):
+    """Calling iter_by_index() yields the items in batches in the order of the sort field"""
+    db = Collection(redis_client, schema=SortedAuthLog)
+    items = _get_sorted_auth_logs()
+    db.insert_many(items)
+
+    got = db.iter_by_index({}, skip=skip, limit=limit, desc=True, batch_size=batch_size)
+
+    assert list(got) == _slice(list(reversed(items)), skip=skip, limit=limit)
+
+
 @pytest.mark.parametrize("bounds", _DELETE_SLICES)
 def test_delete_many_by_single_keys(redis_client, bounds: Tuple[int, int], freezer):
     """Calling delete_many() removes items with matching single key strings in the collection"""
@@ -1028,6 +1434,36 @@ def _get_redis_index_keys(item: Schema) -> List[str]:
     ]
 
 
+def _get_sorted_auth_logs() -> List[SortedAuthLog]:
+    """Gets pending sorted auth logs for _AUTH_LOG_LIST created a day apart, oldest first"""
+    return [
+        SortedAuthLog(
+            **{
+                **payload,
+                "status": "pending",
+                "created_at": f"2026-01-0{idx + 1}T00:00:00.000Z",
+            }
+        )
+        for idx, payload in enumerate(_AUTH_LOG_LIST)
+    ]
+
+
+def _slice(items: List[Schema], skip: int, limit: Optional[int]) -> List[Schema]:
+    """Gets the page of the items after skipping some of them
+
+    Args:
+        items: the items to page through
+        skip: the number of items to skip
+        limit: the maximum number of items in the page
+
+    Returns:
+        the page of items
+    """
+    if limit is None:
+        return items[skip:]
+    return items[skip : skip + limit]
+
+
 def _sort_by_key(items: List[Schema], desc: bool = False) -> List[Schema]:
     """Sorts the items by the key
 
@@ -17,6 +17,7 @@ from typing import Tuple
 
 from app.libs.qiskit.qobj import PulseQobj
 from app.libs.quantum_executor.qiskit.executor import QiskitDynamicsExecutor
+from app.libs.quantum_executor.utils.connections import ExecutorLease
 from app.services.scheduler.store import get_jobs_store
 from app.tests.utils.env import TEST_RQ_REDIS_URL
 
@@ -34,7 +35,9 @@ class MockQiskitDynamicsExecutor(QiskitDynamicsExecutor):
         duration = qobj_header.get("test_duration")
         return duration, results[1]
 
-    def run(self, job_id: str, inputs_folder: Path = None) -> str:
+    def run(
+        self, job_id: str, inputs_folder: Path = None, lease: ExecutorLease = None
+    ) -> str:
         from settings import PREPROCESSED_JOB_POOL
 
         inputs_folder = PREPROCESSED_JOB_POOL
@@ -45,7 +48,9 @@ class MockQiskitDynamicsExecutor(QiskitDynamicsExecutor):
         if job.estimated_duration:
             estimated_duration = job.estimated_duration
 
-        result = super(self.__class__, self).run(job_id, inputs_folder=inputs_folder)
+        result = super(self.__class__, self).run(
+            job_id, inputs_folder=inputs_folder, lease=lease
+        )
         end_timestamp = datetime.now()
         actual_duration = (end_timestamp - start_timestamp).total_seconds()
         sleep_duration = estimated_duration - actual_duration
@@ -12,6 +12,7 @@
 # that they have been altered from the originals.
 
 """Utilities for stuff related to MSS connection"""
+import asyncio
 import json
 import logging
 import re
@@ -40,7 +41,7 @@ class MockWebsocket(websockets.ClientConnection):
         self.__url: Optional[str] = None
         self.__conn_kwargs: Dict[str, str] = {}
         self.__outbox: List[Union[bytes, str]] = []
-        self.__inbox: List[str] = []
+        self.__inbox: asyncio.Queue[str] = asyncio.Queue()
         self.__pings: List[datetime] = []
         self._connected = False
 
@@ -58,7 +59,7 @@ class MockWebsocket(websockets.ClientConnection):
         _verify_headers(additional_headers)
 
         self.__outbox = []
-        self.__inbox = []
+        self.__inbox = asyncio.Queue()
         self.__pings = []
         self._connected = True
 
@@ -113,16 +114,16 @@ class MockWebsocket(websockets.ClientConnection):
                 "id": event_id,
             }
 
-        self.__inbox.append(json.dumps(response_json))
+        self.__inbox.put_nowait(json.dumps(response_json))
 
     async def recv(self, decode: bool | None = None) -> Union[bytes, str]:
-        """Receive a payload and returns the opcode"""
+        """Receive a payload, waiting for one if none has been received yet"""
         if not self._connected:
             raise websockets.ConnectionClosed(
                 rcvd=websockets.Close(code=1008, reason="socket is already closed."),
                 sent=None,
             )
-        return self.__inbox.pop()
+        return await self.__inbox.get()
 
     async def close(self, code: int = 1000, reason: str = ""):
         """Shutdown the connection"""
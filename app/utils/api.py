@@ -13,6 +13,7 @@
 # that they have been altered from the originals.
 """Utilities to do with HTTP APIs"""
 import base64
+import hashlib
 import logging
 import shutil
 from pathlib import Path
@@ -25,6 +26,9 @@ from typing import (
     Literal,
     NotRequired,
     Optional,
+    Set,
+    Tuple,
+    Type,
     TypedDict,
     TypeVar,
     Union,
@@ -41,12 +45,16 @@ from redis import Redis
 import settings
 
 from .datetime import utc_now_str
+from .exc import InvalidRequestError
 from .model import IncEx
 from .redis import get_redis_connection
 from .redis_store import Collection, Schema
 
 ITEM = TypeVar("ITEM", bound=BaseModel)
 
+# the number of bytes of uploaded files to copy at a time
+_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 _MSS_PUBLIC_KEY: Optional[RSAPublicKey] = None
 _REQUEST_LOGS_STORE: Optional[Collection["RequestLog"]] = None
 
@@ -113,6 +121,7 @@ class PaginatedListResponse(BaseModel, Generic[ITEM]):
     skip: int = 0
     limit: Optional[int] = None
     data: List[ITEM] = []
+    next_cursor: Optional[str] = None
 
     def model_dump(
         self,
@@ -130,7 +139,7 @@ class PaginatedListResponse(BaseModel, Generic[ITEM]):
         serialize_as_any: bool = False,
         **kwargs,
     ) -> dict[str, Any]:
-        return {
+        result = {
             "skip": self.skip,
             "limit": self.limit,
             "data": [
@@ -150,14 +159,22 @@ class PaginatedListResponse(BaseModel, Generic[ITEM]):
                 for item in self.data
             ],
         }
+        if self.next_cursor is not None:
+            result["next_cursor"] = self.next_cursor
+        return result
 
 
-def save_uploaded_file(file: UploadFile, target: Path) -> Path:
+def save_uploaded_file(
+    file: UploadFile, target: Path, chunk_size: int = _UPLOAD_CHUNK_SIZE
+) -> Path:
     """Saves the uploaded file to the given target path
 
+    The file is copied in chunks so that it is never held in memory as a whole.
+
     Args:
         file: the file to upload
         target: the target path to save to
+        chunk_size: the number of bytes to copy at a time
 
     Returns:
         the new path to the saved file
@@ -165,12 +182,62 @@ def save_uploaded_file(file: UploadFile, target: Path) -> Path:
     target.parent.mkdir(parents=True, exist_ok=True)
     file.file.seek(0)
     with target.open("wb") as destination:
-        shutil.copyfileobj(file.file, destination)
+        shutil.copyfileobj(file.file, destination, chunk_size)
     file.file.close()
 
     return target
 
 
+def read_uploaded_file_with_hash(
+    file: UploadFile, chunk_size: int = _UPLOAD_CHUNK_SIZE
+) -> Tuple[bytearray, str]:
+    """Reads the contents of the uploaded file, hashing them on the way
+
+    The file is rewound after it is read, so that it can be read again.
+    The contents are returned in the buffer they were read into, not copied
+    into bytes, so that large files are held in memory only once.
+
+    Args:
+        file: the uploaded file
+        chunk_size: the number of bytes to read at a time
+
+    Returns:
+        the contents of the file and their hex SHA-256 digest
+    """
+    file.file.seek(0)
+    hasher = hashlib.sha256()
+    content = bytearray()
+    while chunk := file.file.read(chunk_size):
+        hasher.update(chunk)
+        content += chunk
+    file.file.seek(0)
+
+    return content, hasher.hexdigest()
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[Set[str]]:
+    """Parses the comma-separated fields to project the items of the given model on
+
+    Args:
+        fields: the comma-separated names of the fields e.g. "job_id,status"
+        model: the model whose fields are to be returned
+
+    Returns:
+        the set of field names, or None if fields is not set i.e. all fields
+
+    Raises:
+        InvalidRequestError: unknown fields {unknown_fields}
+    """
+    if fields is None:
+        return None
+
+    field_set = {v.strip() for v in fields.split(",") if v.strip()}
+    unknown_fields = field_set - set(model.model_fields)
+    if unknown_fields:
+        raise InvalidRequestError(f"unknown fields {sorted(unknown_fields)}")
+    return field_set
+
+
 def to_http_error(
     status_code: int, custom_message: Optional[str] = None
 ) -> Callable[[Request, Exception], Union[Response, Awaitable[Response]]]:
@@ -12,6 +12,7 @@
 # that they have been altered from the originals.
 #
 """Utilities for exceptions"""
+from typing import Any, Sequence
 
 
 class BaseBccException(Exception):
@@ -37,6 +38,27 @@ class ConflictError(BaseBccException):
     """Error when an item conflicts with another"""
 
 
+class UpdateConflictError(ConflictError):
+    """Error when some of the items updated at once conflict with concurrent changes
+
+    The rest of the items are updated all the same.
+
+    Attributes:
+        keys: the keys of the items that were not updated, as they were given
+        updated_items: the items that were updated
+    """
+
+    def __init__(
+        self,
+        message: str = "",
+        keys: Sequence[Any] = (),
+        updated_items: Sequence[Any] = (),
+    ):
+        super().__init__(message)
+        self.keys = list(keys)
+        self.updated_items = list(updated_items)
+
+
 class MaxBookingsError(BaseBccException):
     """Error when there are too many bookings in a given period"""
 
@@ -80,6 +102,10 @@ class JobAlreadyCancelled(BaseBccException):
     """Exception when Job is already cancelled"""
 
 
+class ExecutorLeaseLostError(BaseBccException):
+    """Exception when the lease on the quantum executor expired while it was still in use"""
+
+
 class InvalidJobIdInUploadedFileError(BaseBccException):
     pass
 
@@ -2,7 +2,7 @@ import logging
 import os
 import sys
 
-from rq import Worker
+from rq import SimpleWorker, Worker
 
 import settings
 
@@ -35,3 +35,7 @@ class LoggingRqWorker(Worker):
             h.setFormatter(fmt)
             root.addHandler(h)
         root.setLevel(level)
+
+
+class LoggingRqSimpleWorker(LoggingRqWorker, SimpleWorker):
+    """A logging RQ worker that runs jobs in its own process without forking"""
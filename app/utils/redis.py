@@ -11,16 +11,56 @@
 # that they have been altered from the originals.
 #
 """Module containing the utils for redis"""
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+from weakref import WeakKeyDictionary
+
 import redis
 import redis.asyncio as async_redis
 from pydantic import RedisDsn
 
+# the connection pools shared in this process, by redis URL
+_POOL_REGISTRY: Dict[str, redis.ConnectionPool] = {}
+# asyncio connections are bound to the event loop in which they were opened
+# so the asyncio connection pools are shared per event loop, by redis URL
+_ASYNC_POOL_REGISTRY: WeakKeyDictionary[
+    asyncio.AbstractEventLoop, Dict[str, async_redis.ConnectionPool]
+] = WeakKeyDictionary()
+_POOL_REGISTRY_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class RedisPoolMetrics:
+    """Utilization of a redis connection pool shared in this process
+
+    Attributes:
+        url: the URL of the redis server, without the password
+        is_async: whether the pool is for asyncio connections
+        max_connections: the maximum number of connections the pool can open
+        in_use_connections: the number of connections currently used by clients
+        available_connections: the number of open connections waiting to be used
+    """
+
+    url: str
+    is_async: bool
+    max_connections: int
+    in_use_connections: int
+    available_connections: int
+
 
 def get_redis_connection(
     url: RedisDsn | str, is_async: bool = False
 ) -> redis.Redis | async_redis.Redis:
     """Gets the redis connection
 
+    The connection uses the connection pool shared in this process for the given URL.
+    Closing the connection returns it to the pool without closing the pool.
+
+    Asyncio connections share a pool only within the running event loop.
+    If no event loop is running, the asyncio connection gets its own pool.
+
     Args:
         url: the URL to the redis server
         is_async: whether to use async redis connection
@@ -28,9 +68,113 @@ def get_redis_connection(
     Returns:
         the redis connection
     """
-    cls = async_redis.Redis if is_async else redis.Redis
+    if not is_async:
+        return redis.Redis(connection_pool=get_redis_connection_pool(url))
+
+    try:
+        pool = get_async_redis_connection_pool(url)
+    except RuntimeError:
+        # no running event loop
+        return async_redis.Redis.from_url(f"{url}")
+    return async_redis.Redis(connection_pool=pool)
+
+
+def get_redis_connection_pool(url: RedisDsn | str) -> redis.ConnectionPool:
+    """Gets the connection pool shared in this process for the given redis URL
 
+    Args:
+        url: the URL to the redis server
+
+    Returns:
+        the connection pool for the redis server
+    """
     redis_url = f"{url}"
-    if redis_url.startswith("rediss:"):
-        return cls.from_url(redis_url, ssl=True)
-    return cls.from_url(redis_url)
+    with _POOL_REGISTRY_LOCK:
+        try:
+            return _POOL_REGISTRY[redis_url]
+        except KeyError:
+            pool = redis.ConnectionPool.from_url(redis_url)
+            _POOL_REGISTRY[redis_url] = pool
+            return pool
+
+
+def get_async_redis_connection_pool(url: RedisDsn | str) -> async_redis.ConnectionPool:
+    """Gets the asyncio connection pool shared in the running event loop for the given redis URL
+
+    Args:
+        url: the URL to the redis server
+
+    Returns:
+        the asyncio connection pool for the redis server
+
+    Raises:
+        RuntimeError: no running event loop
+    """
+    redis_url = f"{url}"
+    loop = asyncio.get_running_loop()
+    with _POOL_REGISTRY_LOCK:
+        loop_pools = _ASYNC_POOL_REGISTRY.setdefault(loop, {})
+        try:
+            return loop_pools[redis_url]
+        except KeyError:
+            pool = async_redis.ConnectionPool.from_url(redis_url)
+            loop_pools[redis_url] = pool
+            return pool
+
+
+def get_redis_pool_metrics() -> List[RedisPoolMetrics]:
+    """Gets the utilization of the redis connection pools shared in this process
+
+    Returns:
+        the metrics of each connection pool
+    """
+    with _POOL_REGISTRY_LOCK:
+        pools: List[Tuple[str, bool, redis.ConnectionPool]] = [
+            (url, False, pool) for url, pool in _POOL_REGISTRY.items()
+        ]
+        pools += [
+            (url, True, pool)
+            for loop_pools in _ASYNC_POOL_REGISTRY.values()
+            for url, pool in loop_pools.items()
+        ]
+
+    return [
+        RedisPoolMetrics(
+            url=_hide_password(url),
+            is_async=is_async,
+            max_connections=pool.max_connections,
+            in_use_connections=len(pool._in_use_connections),
+            available_connections=len(pool._available_connections),
+        )
+        for url, is_async, pool in pools
+    ]
+
+
+def disconnect_redis_connection_pools():
+    """Disconnects the synchronous redis connection pools shared in this process
+
+    The next call to get_redis_connection() creates a new pool.
+    The asyncio pools are left to be closed with their event loops.
+    """
+    with _POOL_REGISTRY_LOCK:
+        for pool in _POOL_REGISTRY.values():
+            pool.disconnect()
+        _POOL_REGISTRY.clear()
+        _ASYNC_POOL_REGISTRY.clear()
+
+
+def _hide_password(url: str) -> str:
+    """Replaces the password in the redis URL with asterisks
+
+    Args:
+        url: the URL to the redis server
+
+    Returns:
+        the URL without the password
+    """
+    scheme, sep, rest = url.partition("://")
+    credentials, at, host = rest.rpartition("@")
+    username, colon, password = credentials.partition(":")
+    if not password:
+        return url
+    return f"{scheme}{sep}{username}{colon}***{at}{host}"
@@ -11,9 +11,11 @@
 # that they have been altered from the originals.
 #
 """Module containing the source code for storing data"""
+import base64
+import json
 import math
 from contextlib import suppress
-from datetime import timedelta
+from datetime import datetime, timedelta
 from functools import cached_property
 from typing import (
     Any,
@@ -21,6 +23,7 @@ from typing import (
     Dict,
     Final,
     Generic,
+    Iterator,
     List,
     Literal,
     Optional,
@@ -33,17 +36,26 @@ from typing import (
 )
 
 from pydantic import BaseModel
+from pydantic_core import to_json
 from redis import Redis
 from redis.client import Pipeline
+from redis.exceptions import WatchError
 
 from app.utils.datetime import get_relative_time, get_utc_now
-from app.utils.exc import ItemNotFoundError
+from app.utils.exc import (
+    ConflictError,
+    InvalidRequestError,
+    ItemNotFoundError,
+    UpdateConflictError,
+)
 from app.utils.model import create_partial_schema
 
 IncEx = Union[Set[str], Set[int], Dict[int, Any], Dict[str, Any], None]
 _KEY_SEPARATOR = "@@@"
 _IDX_SEPARATOR = "::"
 _UNDEFINED: Final = object()
+_MAX_UPDATE_RETRIES = 10
+_PRUNE_BATCH_SIZE = 1000
 
 _TTL_Type = Union[int, None, Type[_UNDEFINED]]
 
@@ -75,12 +87,431 @@ redis_call("ZADD", new_set, score, member)
 return score
 """
 
+_UPDATE_LUA = """
+-- v0.0.3
+-- Script to apply a JSON merge-patch to an item in a hash and move its indexes
+--
+-- The members of the stored JSON object are scanned as raw text
+-- so that values that are not patched are never re-encoded.
+-- Nested objects are merged member by member, any other value is replaced.
+-- All parsing is done before any write so that a failure leaves no partial update.
+--
+-- KEYS[1] = hashmap_name
+-- ARGV[1] = record_key
+-- ARGV[2] = patch i.e. JSON object of the fields to update
+-- ARGV[3] = ttl i.e. 'keep', 'persist' or the number of seconds
+-- ARGV[4] = expiry score for the moved index entries
+-- ARGV[5] = JSON list of the patched index fields each with 'key' (the JSON-encoded field name),
+--           'value' (the value of the field when the index keys were computed),
+--           'old_key' (the index key of that value) and 'new_key' (the index key of the new value)
+-- ARGV[6] = JSON list of the expected scalar fields of the stored item each with 'key'
+--           (the JSON-encoded field name) and 'value' (the expected value)
+--
+-- Returns 0 if the item does not exist, -1 if the stored item could not be patched,
+-- -2 if the stored item does not have the expected values, -3 if its indexed fields
+-- have changed since the index keys were computed, or the new JSON of the item
+
+local redis_call = redis.call
+local str_find = string.find
+local str_sub = string.sub
+
+local hashmap_name = KEYS[1]
+local record_key = ARGV[1]
+local patch = ARGV[2]
+local ttl = ARGV[3]
+local expiry = ARGV[4]
+local indexes = cjson.decode(ARGV[5])
+local expected = cjson.decode(ARGV[6])
+
+local function skip_whitespace(s, i)
+    return str_find(s, "[^ \\t\\r\\n]", i) or (#s + 1)
+end
+
+local function skip_string(s, i)
+    local j = i + 1
+    while true do
+        local k = str_find(s, '["\\\\]', j)
+        if not k then
+            return nil
+        end
+        if str_sub(s, k, k) == '"' then
+            return k + 1
+        end
+        j = k + 2
+    end
+end
+
+local function skip_value(s, i)
+    local c = str_sub(s, i, i)
+    if c == '"' then
+        return skip_string(s, i)
+    end
+
+    if c == "{" or c == "[" then
+        local depth = 0
+        local j = i
+        while true do
+            local k = str_find(s, '[%[%]{}"]', j)
+            if not k then
+                return nil
+            end
+            local ch = str_sub(s, k, k)
+            if ch == '"' then
+                j = skip_string(s, k)
+                if not j then
+                    return nil
+                end
+            else
+                if ch == "{" or ch == "[" then
+                    depth = depth + 1
+                else
+                    depth = depth - 1
+                end
+                j = k + 1
+                if depth == 0 then
+                    return j
+                end
+            end
+        end
+    end
+
+    -- numbers, true, false and null
+    local k = str_find(s, "[,}%]%s]", i)
+    if not k or k == i then
+        return nil
+    end
+    return k
+end
+
+-- returns the ordered list of {raw_key, raw_value} pairs or nil if s is not a JSON object
+local function parse_members(s)
+    local i = skip_whitespace(s, 1)
+    if str_sub(s, i, i) ~= "{" then
+        return nil
+    end
+
+    local members = {}
+    i = skip_whitespace(s, i + 1)
+    if str_sub(s, i, i) == "}" then
+        return members
+    end
+
+    while true do
+        if str_sub(s, i, i) ~= '"' then
+            return nil
+        end
+        local key_end = skip_string(s, i)
+        if not key_end then
+            return nil
+        end
+        local key = str_sub(s, i, key_end - 1)
+
+        i = skip_whitespace(s, key_end)
+        if str_sub(s, i, i) ~= ":" then
+            return nil
+        end
+
+        i = skip_whitespace(s, i + 1)
+        local value_end = skip_value(s, i)
+        if not value_end then
+            return nil
+        end
+        members[#members + 1] = { key, str_sub(s, i, value_end - 1) }
+
+        i = skip_whitespace(s, value_end)
+        local c = str_sub(s, i, i)
+        if c == "}" then
+            return members
+        end
+        if c ~= "," then
+            return nil
+        end
+        i = skip_whitespace(s, i + 1)
+    end
+end
+
+local merge_value
+
+-- merges the patch members into the old members, keeping the order of the old members,
+-- and returns the merged JSON object or nil if some nested object could not be parsed
+local function merge_members(old_members, patch_members)
+    local positions = {}
+    for pos, member in ipairs(old_members) do
+        positions[member[1]] = pos
+    end
+
+    for _, member in ipairs(patch_members) do
+        local pos = positions[member[1]]
+        if pos then
+            local value = merge_value(old_members[pos][2], member[2])
+            if not value then
+                return nil
+            end
+            old_members[pos] = { member[1], value }
+        else
+            old_members[#old_members + 1] = member
+        end
+    end
+
+    local parts = {}
+    for pos, member in ipairs(old_members) do
+        parts[pos] = member[1] .. ":" .. member[2]
+    end
+    return "{" .. table.concat(parts, ",") .. "}"
+end
+
+-- merges two raw JSON objects member by member; any other patch value replaces the old one
+merge_value = function(old_raw, patch_raw)
+    if str_sub(old_raw, 1, 1) ~= "{" or str_sub(patch_raw, 1, 1) ~= "{" then
+        return patch_raw
+    end
+
+    local old_members = parse_members(old_raw)
+    local patch_members = parse_members(patch_raw)
+    if not old_members or not patch_members then
+        return nil
+    end
+    return merge_members(old_members, patch_members)
+end
+
+local old_data = redis_call("HGET", hashmap_name, record_key)
+if not old_data then
+    return 0
+end
+
+local old_members = parse_members(old_data)
+local patch_members = parse_members(patch)
+if not old_members or not patch_members then
+    return -1
+end
+
+local old_values = {}
+for _, member in ipairs(old_members) do
+    old_values[member[1]] = member[2]
+end
+
+local function decode_old_value(key)
+    local old_value = old_values[key]
+    if not old_value then
+        return cjson.null
+    end
+    return cjson.decode(old_value)
+end
+
+for _, field in ipairs(expected) do
+    if not old_values[field.key] then
+        return -1
+    end
+    if decode_old_value(field.key) ~= field.value then
+        return -2
+    end
+end
+
+for _, index in ipairs(indexes) do
+    if decode_old_value(index.key) ~= index.value then
+        return -3
+    end
+end
+
+local new_data = merge_members(old_members, patch_members)
+if not new_data then
+    return -1
+end
+
+-- write the item, its ttl and its indexes
+redis_call("HSET", hashmap_name, record_key, new_data)
+if ttl == "persist" then
+    redis_call("HPERSIST", hashmap_name, "FIELDS", 1, record_key)
+elseif ttl ~= "keep" then
+    redis_call("HEXPIRE", hashmap_name, ttl, "FIELDS", 1, record_key)
+end
+
+for _, index in ipairs(indexes) do
+    local score = expiry
+
+    if ttl == "keep" then
+        -- copy the old score to the new index entry
+        score = redis_call("ZSCORE", index.old_key, record_key) or expiry
+    end
+
+    redis_call("ZREM", index.old_key, record_key)
+    redis_call("ZADD", index.new_key, score, record_key)
+end
+
+return new_data
+"""
+
+_FIND_LUA = """
+-- v0.0.2
+-- Script to find the items matching all the given indexes, one page at a time
+--
+-- KEYS[1] = hashmap
+-- KEYS[2] = temporary key for the matched keys
+-- KEYS[3] = temporary key for the sorted matched keys
+-- KEYS[4] = sort_index, used only if ARGV[5] = "1"
+-- KEYS[5..] = index_keys
+-- ARGV[1] = current_timestamp
+-- ARGV[2] = skip
+-- ARGV[3] = limit, or -1 for no limit
+-- ARGV[4] = "1" for descending order, else "0"
+-- ARGV[5] = "1" if items are to be sorted by the sort index, else "0"
+-- ARGV[6] = score of the cursor after which to start the page, or "" to start from the top
+-- ARGV[7] = key of the cursor after which to start the page
+--
+-- Returns the list of the JSON strings of the matched items,
+-- and the key and the score of the last of them
+
+local redis_call = redis.call
+local to_num = tonumber
+
+local hashmap = KEYS[1]
+local matches = KEYS[2]
+local sorted_matches = KEYS[3]
+local sort_index = KEYS[4]
+local index_keys = {unpack(KEYS, 5)}
+local current_timestamp = ARGV[1]
+local skip = to_num(ARGV[2])
+local limit = to_num(ARGV[3])
+local is_desc = ARGV[4] == "1"
+local is_sorted = ARGV[5] == "1"
+local cursor_score = ARGV[6]
+local cursor_key = ARGV[7]
+local has_cursor = cursor_score ~= ""
+
+local source = sort_index
+if #index_keys > 0 then
+    -- the scores of index entries are the expiry timestamps of their items,
+    -- which are not summed lest expired items seem to be unexpired
+    local args = {matches, #index_keys, unpack(index_keys)}
+    args[#args + 1] = "AGGREGATE"
+    args[#args + 1] = "MAX"
+    redis_call("ZINTERSTORE", unpack(args))
+    redis_call("ZREMRANGEBYSCORE", matches, "-inf", "(" .. current_timestamp)
+    source = matches
+
+    if is_sorted then
+        -- zero the expiry scores first as redis turns inf * 0 into nan
+        local count = redis_call("ZUNIONSTORE", matches, 1, matches, "WEIGHTS", 0)
+        local sorted_count = redis_call(
+            "ZINTERSTORE", sorted_matches, 2, matches, sort_index
+        )
+        if sorted_count < count then
+            -- items stored before the sort index was kept are sorted with a score of 0
+            redis_call("ZUNIONSTORE", sorted_matches, 2, sorted_matches, matches)
+        end
+        source = sorted_matches
+    end
+end
+
+-- fetches the keys and scores of the page, starting at the offset from the top or from the cursor
+local function get_entries(offset, count)
+    if not has_cursor then
+        local command = is_desc and "ZREVRANGE" or "ZRANGE"
+        return redis_call(command, source, offset, offset + count - 1, "WITHSCORES")
+    elseif is_desc then
+        return redis_call(
+            "ZREVRANGEBYSCORE", source, cursor_score, "-inf",
+            "WITHSCORES", "LIMIT", offset, count
+        )
+    end
+    return redis_call(
+        "ZRANGEBYSCORE", source, cursor_score, "+inf", "WITHSCORES", "LIMIT", offset, count
+    )
+end
+
+-- keys of equal scores are ordered lexicographically
+local function is_after_cursor(key, score)
+    if not has_cursor or score ~= cursor_score then
+        return true
+    elseif is_desc then
+        return key < cursor_key
+    end
+    return key > cursor_key
+end
+
+local items = {}
+local last_key = false
+local last_score = false
+local offset = has_cursor and 0 or skip
+local to_skip = has_cursor and skip or 0
+while limit < 0 or #items < limit do
+    local batch_size = 1000
+    if limit >= 0 then
+        batch_size = math.min(batch_size, limit - #items + to_skip)
+    end
+
+    local entries = get_entries(offset, batch_size)
+    if #entries == 0 then
+        break
+    end
+
+    local keys = {}
+    local scores = {}
+    for idx = 1, #entries, 2 do
+        keys[#keys + 1] = entries[idx]
+        scores[#scores + 1] = entries[idx + 1]
+    end
+
+    local values = redis_call("HMGET", hashmap, unpack(keys))
+    local removed = 0
+    for idx = 1, #keys do
+        if not values[idx] then
+            if source == sort_index then
+                -- the item has expired
+                redis_call("ZREM", sort_index, keys[idx])
+                removed = removed + 1
+            end
+        elseif is_after_cursor(keys[idx], scores[idx]) then
+            if to_skip > 0 then
+                to_skip = to_skip - 1
+            elseif limit < 0 or #items < limit then
+                items[#items + 1] = values[idx]
+                last_key = keys[idx]
+                last_score = scores[idx]
+            end
+        end
+    end
+    offset = offset + #keys - removed
+end
+
+redis_call("DEL", matches, sorted_matches)
+return {items, last_key, last_score}
+"""
+
+_PRUNE_SORT_INDEX_LUA = """
+-- v0.0.2
+-- Script to remove the given keys from the sort index if their items have expired
+--
+-- KEYS[1] = hashmap
+-- KEYS[2] = sort_index
+-- ARGV[1..] = the keys in the sort index to check
+--
+-- Returns the number of keys removed
+
+local redis_call = redis.call
+
+local hashmap = KEYS[1]
+local sort_index = KEYS[2]
+local removed = 0
+
+for _, key in ipairs(ARGV) do
+    if redis_call("HEXISTS", hashmap, key) == 0 then
+        redis_call("ZREM", sort_index, key)
+        removed = removed + 1
+    end
+end
+
+return removed
+"""
+
 
 class Schema(BaseModel):
     """The base class for all schemas to be used in collections"""
 
     __primary_key_fields__: Tuple[str, ...] = ("id",)
     __index_fields__: Tuple[str, ...] = ()
+    # the field, of numbers, datetimes or ISO datetime strings, by which items are sorted
+    __sort_field__: Optional[str] = None
 
     @classmethod
     def construct_redis_key(
@@ -181,10 +612,19 @@ class Collection(Generic[T]):
         self._partial_schema = partial_schema
         self._hashmap_name = f"{schema.__module__}.{schema.__qualname__}".lower()
         self._index_prefix = f"__index__{self._hashmap_name}_"
+        self._sort_index = f"__sort__{self._hashmap_name}"
+        self._find_items = connection.register_script(_FIND_LUA)
+        self._prune_sort_index = connection.register_script(_PRUNE_SORT_INDEX_LUA)
         self._zset_move = connection.register_script(_SORTED_SET_MOVE_LUA)
+        self._patch_item = connection.register_script(_UPDATE_LUA)
         self.__last_cleanup_timestamp = get_utc_now().timestamp()
         self.__cleanup_interval = cleanup_interval
 
+    @property
+    def connection(self) -> Redis:
+        """The redis connection to which this collection is attached"""
+        return self._connection
+
     @cached_property
     def _index_fields(self) -> Tuple[str, ...]:
         """The index fields for the schema in this store
@@ -200,6 +640,11 @@ class Collection(Generic[T]):
         """Set of all fields that are indexed"""
         return set(self._index_fields)
 
+    @cached_property
+    def _index_json_keys(self) -> Dict[str, str]:
+        """Map of the indexed fields to their names as encoded in the stored JSON"""
+        return {field: to_json(field).decode() for field in self._index_fields}
+
     def exists(self, key: Union[str, Tuple[Any, ...], Dict[str, Any]]) -> bool:
         """Checks if an item with the same primary keys exists
 
@@ -291,13 +736,20 @@ class Collection(Generic[T]):
         filters: Union[Dict[str, Any], T],
         skip: int = 0,
         limit: int | None = None,
+        desc: bool = False,
     ) -> List[T]:
         """Get the items with the given values in the given indexed fields
 
+        The matching, expiry filtering and pagination are done on the redis server
+        so only the items in the requested page are returned over the wire.
+        If the schema has a sort field, the items are sorted by it,
+        else they are sorted by their expiry.
+
         Args:
             filters: the dict of key and value that should be matched
             skip: number of records to ignore at the top of the returned results; default is 0
             limit: maximum number of records to return; default is None.
+            desc: if the items should come in descending order; default is False
 
         Returns:
             the list of items that match
@@ -307,27 +759,95 @@ class Collection(Generic[T]):
             ValueError: the fields {non_indexed_fields} are not indexed
             ValidationError: if filters does not satisfy the partial schema of the collection
         """
-        parsed_filters = self._partial_schema.model_validate(filters)
-        filters = parsed_filters.model_dump(exclude_unset=True, exclude_defaults=True)
+        items, _ = self.find_page_by_index(filters, skip=skip, limit=limit, desc=desc)
+        return items
 
-        non_indexed_fields = set(filters) - self._index_field_set
-        if len(non_indexed_fields) > 0:
-            raise ValueError(f"the fields {non_indexed_fields} are not indexed")
+    def find_page_by_index(
+        self,
+        filters: Union[Dict[str, Any], T],
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        limit: int | None = None,
+        desc: bool = False,
+    ) -> Tuple[List[T], Optional[str]]:
+        """Get a page of the items with the given values in the given indexed fields
 
-        index_keys = self._get_index_keys_from_dict(filters)
-        matched_key_score_pairs = self._connection.zinter(
-            index_keys, aggregate="MAX", withscores=True
+        Unlike skip, the cursor marks the position of the last item of the previous page
+        so pages do not shift when items are inserted or deleted in between requests.
+
+        Args:
+            filters: the dict of key and value that should be matched
+            cursor: the cursor returned with the previous page; default is None i.e. the top
+            skip: number of records to ignore after the cursor; default is 0
+            limit: maximum number of records to return; default is None.
+            desc: if the items should come in descending order; default is False
+
+        Returns:
+            the list of items that match, and the cursor of the next page
+            or None if there are no more pages
+
+        Raises:
+            ValidationError: item does not match the given schema
+            ValueError: the fields {non_indexed_fields} are not indexed
+            ValidationError: if filters does not satisfy the partial schema of the collection
+            InvalidRequestError: invalid cursor
+        """
+        raw_data, next_cursor = self._find_raw_page(
+            filters, cursor=cursor, skip=skip, limit=limit, desc=desc
         )
-        current_timestamp = get_utc_now().timestamp()
-        matched_keys = [
-            k for (k, v) in matched_key_score_pairs if v >= current_timestamp
-        ]
-        matched_keys = _paginate(matched_keys, skip=skip, limit=limit)
-        if len(matched_keys) == 0:
-            return []
+        return [
+            self._schema.model_validate_json(item) for item in raw_data
+        ], next_cursor
+
+    def iter_by_index(
+        self,
+        filters: Union[Dict[str, Any], T],
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        limit: int | None = None,
+        desc: bool = False,
+        batch_size: int = 100,
+    ) -> Iterator[T]:
+        """Iterates over the items with the given values in the given indexed fields
 
-        raw_data = self._connection.hmget(self._hashmap_name, matched_keys)
-        return [self._schema.model_validate_json(item) for item in raw_data]
+        The items are fetched from redis in batches of batch_size,
+        each batch starting at the cursor of the previous one.
+        The first batch is fetched straight away so that invalid filters
+        or cursors raise before the iteration starts.
+
+        Args:
+            filters: the dict of key and value that should be matched
+            cursor: the cursor after which to start; default is None i.e. the top
+            skip: number of records to ignore after the cursor; default is 0
+            limit: maximum number of records to return; default is None.
+            desc: if the items should come in descending order; default is False
+            batch_size: the number of items to fetch from redis at a time; default is 100
+
+        Returns:
+            an iterator of the items that match
+
+        Raises:
+            ValidationError: item does not match the given schema
+            ValueError: the fields {non_indexed_fields} are not indexed
+            ValidationError: if filters does not satisfy the partial schema of the collection
+            InvalidRequestError: invalid cursor
+        """
+        remaining = math.inf if limit is None else limit
+        raw_data, next_cursor = self._find_raw_page(
+            filters,
+            cursor=cursor,
+            skip=skip,
+            limit=int(min(batch_size, remaining)),
+            desc=desc,
+        )
+        return self._iter_raw_pages(
+            filters,
+            raw_data=raw_data,
+            cursor=next_cursor,
+            remaining=remaining - len(raw_data),
+            desc=desc,
+            batch_size=batch_size,
+        )
 
     def insert(self, payload: T, ttl: _TTL_Type = _UNDEFINED) -> T:
         """Inserts the item identified by the primary key, replacing it if it exists
@@ -346,40 +866,86 @@ class Collection(Generic[T]):
             ValidationError: payload does not satisfy the schema of the collection
             AttributeError: some primary key fields were not set
         """
+        return self.insert_many([payload], ttl=ttl)[0]
+
+    def insert_many(
+        self, payloads: Sequence[T], ttl: _TTL_Type = _UNDEFINED
+    ) -> List[T]:
+        """Inserts the items identified by their primary keys, replacing those that exist
+
+        All items and their indexes are written in a single pipeline.
+        TTL=None ensures that the inserted items never expire.
+        If TTL is not passed, the default TTL of this collection will be used.
+
+        Args:
+            payloads: the items to update or insert
+            ttl: time to live for these items; defaults to self._default_ttl
+
+        Returns:
+            the current items in the collection
+
+        Raises:
+            ValidationError: some payload does not satisfy the schema of the collection
+            AttributeError: some primary key fields were not set
+        """
+        if len(payloads) == 0:
+            return []
+
         if ttl is _UNDEFINED:
             ttl = self._default_ttl
 
-        key = _get_redis_key(self._schema, payload)
+        data = {}
+        for payload in payloads:
+            self._schema.model_validate(payload, from_attributes=True)
+            data[_get_redis_key(self._schema, payload)] = payload.model_dump_json()
 
-        self._schema.model_validate(payload, from_attributes=True)
-        data = payload.model_dump_json()
         pipe = self._connection.pipeline()
 
         # attempt cleanup of indexes
         self._cleanup_expired_indexes(pipe)
 
-        # insert the record and its indexes
-        pipe.hset(self._hashmap_name, key, data)
+        # insert the records and their indexes
+        pipe.hset(self._hashmap_name, mapping=data)
         if isinstance(ttl, (int, float)):
-            pipe.hexpire(self._hashmap_name, timedelta(seconds=ttl), key)
-
-        self._insert_indexes(pipe, payload, ttl=ttl)
+            pipe.hexpire(self._hashmap_name, timedelta(seconds=ttl), *data)
+
+        self._insert_indexes(pipe, payloads, ttl=ttl)
+        sort_field = self._schema.__sort_field__
+        if sort_field is not None:
+            pipe.zadd(
+                self._sort_index,
+                {
+                    _get_redis_key(self._schema, payload): _get_sort_score(
+                        getattr(payload, sort_field)
+                    )
+                    for payload in payloads
+                },
+            )
         pipe.execute()
 
-        return payload
+        return list(payloads)
 
     def update(
         self,
         key: Union[str, Tuple[Any, ...], Dict[str, Any]],
         updates: Union[Dict[str, Any], T],
         ttl: _TTL_Type = _UNDEFINED,
+        expected: Optional[Dict[str, Any]] = None,
     ) -> T:
         """Updates the item identified by the primary key with the new updates
 
+        The updates are applied as a JSON merge-patch together with the moves
+        of the indexes in a single lua script on the redis server, so concurrent
+        updates of different fields of the same item are not lost.
+        If the stored item cannot be patched that way, it falls back to
+        an optimistic read-modify-write.
+
         Args:
             key: the unique key that identifies that item
             updates: the new fields and values to add.
             ttl: time to live for this item; default: _UNDEFINED (i.e. don't alter)
+            expected: the values of scalar fields that the stored item should have
+                for the updates to be applied; default: None (i.e. no expectations)
 
         Returns:
             the item after updating
@@ -387,39 +953,219 @@ class Collection(Generic[T]):
         Raises:
             ValidationError: updates does not satisfy the partial schema of the collection
             ItemNotFound: '{key}' not found
+            ConflictError: '{key}' kept being changed concurrently
+            ConflictError: '{key}' does not have the expected values
         """
-        if ttl is _UNDEFINED:
-            ttl = self._default_ttl
+        expected_list = None if expected is None else [expected]
+        return self.update_many([(key, updates)], ttl=ttl, expected=expected_list)[0]
 
-        parsed_updates = self._partial_schema.model_validate(updates)
-        updates_dict = parsed_updates.model_dump(
-            exclude_unset=True, exclude_defaults=True
-        )
+    def update_many(
+        self,
+        updates: Sequence[
+            Tuple[Union[str, Tuple[Any, ...], Dict[str, Any]], Union[Dict[str, Any], T]]
+        ],
+        ttl: _TTL_Type = _UNDEFINED,
+        expected: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+    ) -> List[T]:
+        """Updates the items identified by the primary keys, each with its own updates
 
-        old_item = self.get_one(key)
-        new_props = {**old_item.model_dump(), **updates_dict}
-        updated_item = self._schema.model_validate(new_props)
-        redis_key = self._schema.construct_redis_key(key)
-        pipe = self._connection.pipeline()
+        The lua scripts that patch the items are all sent in a single pipeline.
+        The index keys of the items whose indexed fields are updated are computed
+        from the stored items, read beforehand in one command; the items whose indexed
+        fields change in between are patched again.
+        The items that cannot be patched that way fall back to
+        an optimistic read-modify-write, one at a time.
 
-        # attempt cleanup of indexes
-        self._cleanup_expired_indexes(pipe)
+        Args:
+            updates: the sequence of (key, updates) for each item to update
+            ttl: time to live for these items; default: _UNDEFINED (i.e. don't alter)
+            expected: the values of scalar fields that each stored item should have
+                for its updates to be applied, in the order of the updates;
+                default: None (i.e. no expectations)
+
+        Returns:
+            the items after updating, in the order of the updates
+
+        Raises:
+            ValidationError: some updates do not satisfy the partial schema of the collection
+            ItemNotFound: '{key}' not found
+            UpdateConflictError: '{key}' kept being changed concurrently
+            UpdateConflictError: '{key}' does not have the expected values
+        """
+        if len(updates) == 0:
+            return []
 
-        # update record and indexes
-        pipe.hset(self._hashmap_name, redis_key, updated_item.model_dump_json())
+        if expected is None:
+            expected = [None] * len(updates)
+
+        if ttl is _UNDEFINED:
+            ttl = self._default_ttl
 
         # ttl=_UNDEFINED means no alteration, ttl=None means persist forever
+        ttl_arg = "keep"
+        new_expiry = math.inf
         if ttl is None:
-            pipe.hpersist(self._hashmap_name, redis_key)
+            ttl_arg = "persist"
         elif isinstance(ttl, (int, float)):
-            pipe.hexpire(self._hashmap_name, timedelta(seconds=ttl), redis_key)
+            ttl_arg = int(timedelta(seconds=ttl).total_seconds())
+            new_expiry = get_relative_time(seconds=ttl).timestamp()
 
-        self._update_indexes(pipe, original=old_item, updates=updates_dict, ttl=ttl)
-        pipe.execute()
-        return updated_item
+        redis_keys = []
+        patches = []
+        updates_dicts = []
+        expected_dicts = []
+        for (key, item_updates), item_expected in zip(updates, expected):
+            expected_dict = {}
+            if item_expected is not None:
+                expected_dict = self._partial_schema.model_validate(
+                    item_expected
+                ).model_dump(mode="json", exclude_unset=True)
+            expected_dicts.append(expected_dict)
+
+            parsed_updates = self._partial_schema.model_validate(item_updates)
+            updates_dicts.append(
+                parsed_updates.model_dump(exclude_unset=True, exclude_defaults=True)
+            )
+            patches.append(
+                parsed_updates.model_dump_json(
+                    exclude_unset=True, exclude_defaults=True, exclude_none=True
+                )
+            )
+            redis_keys.append(self._schema.construct_redis_key(key))
+
+        results: List[Any] = [None] * len(updates)
+        pending = list(range(len(updates)))
+        for attempt in range(_MAX_UPDATE_RETRIES):
+            indexed = [
+                idx
+                for idx in pending
+                if not self._index_field_set.isdisjoint(updates_dicts[idx])
+            ]
+            old_data = {}
+            if len(indexed) > 0:
+                old_data = dict(
+                    zip(
+                        indexed,
+                        self._connection.hmget(
+                            self._hashmap_name, [redis_keys[idx] for idx in indexed]
+                        ),
+                    )
+                )
+
+            pipe = self._connection.pipeline()
+            if attempt == 0:
+                # attempt cleanup of indexes
+                self._cleanup_expired_indexes(pipe)
+
+            first_result_idx = len(pipe)
+            patched = []
+            for idx in pending:
+                indexes = []
+                if idx in old_data:
+                    if old_data[idx] is None:
+                        results[idx] = 0
+                        continue
+                    indexes = self._get_index_moves(old_data[idx], updates_dicts[idx])
+
+                # merge the updates and move the indexes on the redis server in one atomic step
+                self._patch_item(
+                    keys=[self._hashmap_name],
+                    args=[
+                        redis_keys[idx],
+                        patches[idx],
+                        ttl_arg,
+                        new_expiry,
+                        json.dumps(indexes),
+                        json.dumps(
+                            [
+                                {"key": json.dumps(field), "value": value}
+                                for field, value in expected_dicts[idx].items()
+                            ]
+                        ),
+                    ],
+                    client=pipe,
+                )
+                patched.append(idx)
+
+            pending = []
+            for idx, new_data in zip(patched, pipe.execute()[first_result_idx:]):
+                if new_data == -3:
+                    # the indexed fields were changed since they were read
+                    pending.append(idx)
+                else:
+                    results[idx] = new_data
+
+            if len(pending) == 0:
+                break
+
+        missing_keys = [
+            key for (key, _), result in zip(updates, results) if result == 0
+        ]
+        conflicting_keys = [
+            key for (key, _), result in zip(updates, results) if result == -2
+        ]
+        changing_keys = [updates[idx][0] for idx in pending]
+        updated_items = []
+        sort_field = self._schema.__sort_field__
+        sort_scores: Dict[str, float] = {}
+        for (key, _), redis_key, updates_dict, expected_dict, new_data in zip(
+            updates, redis_keys, updates_dicts, expected_dicts, results
+        ):
+            if new_data is None or new_data == 0 or new_data == -2:
+                continue
+
+            try:
+                if new_data == -1:
+                    # nothing was written since the stored item could not be patched as raw JSON
+                    updated_item = self._update_optimistically(
+                        key, updates=updates_dict, ttl=ttl, expected=expected_dict
+                    )
+                else:
+                    updated_item = self._schema.model_validate_json(new_data)
+                    if updated_item.model_dump_json().encode() != _to_bytes(new_data):
+                        # some fields of the item are derived from the patched fields by the schema
+                        # so the patched item is only rewritten as the schema dumps it
+                        updated_item = self._update_optimistically(
+                            key, updates={}, ttl=_UNDEFINED
+                        )
+            except ConflictError:
+                if len(expected_dict) == 0 or new_data != -1:
+                    raise
+                conflicting_keys.append(key)
+                continue
+
+            updated_items.append(updated_item)
+            if sort_field in updates_dict:
+                sort_scores[redis_key] = _get_sort_score(updates_dict[sort_field])
+
+        if len(sort_scores) > 0:
+            # only the items already in the sort index are moved
+            self._connection.zadd(self._sort_index, sort_scores, xx=True)
+
+        if len(missing_keys) > 0:
+            quoted_keys = ", ".join(f"'{key}'" for key in missing_keys)
+            raise ItemNotFoundError(f"{quoted_keys} not found")
+
+        if len(changing_keys) > 0:
+            quoted_keys = ", ".join(f"'{key}'" for key in changing_keys)
+            raise UpdateConflictError(
+                f"{quoted_keys} kept being changed concurrently",
+                keys=[*changing_keys, *conflicting_keys],
+                updated_items=updated_items,
+            )
+
+        if len(conflicting_keys) > 0:
+            quoted_keys = ", ".join(f"'{key}'" for key in conflicting_keys)
+            raise UpdateConflictError(
+                f"{quoted_keys} does not have the expected values",
+                keys=conflicting_keys,
+                updated_items=updated_items,
+            )
+
+        return updated_items
 
     def delete_many(self, keys: Sequence[Union[str, Tuple[Any, ...], Dict[str, Any]]]):
-        """Get many items by their keys
+        """Deletes many items by their keys
 
         The keys can be the tuples of the raw keys used in redis,
         or sequence of tuples of the values of the primary fields in the right order,
@@ -444,6 +1190,8 @@ class Collection(Generic[T]):
 
         # delete the index entries for the deleted items
         self._delete_indexes(pipe, old_items)
+        if self._schema.__sort_field__ is not None and len(redis_keys) > 0:
+            pipe.zrem(self._sort_index, *redis_keys)
         pipe.execute()
 
     def clear(self):
@@ -451,21 +1199,207 @@ class Collection(Generic[T]):
         # delete hashmap and all associated indexes
         all_index_keys = self._get_all_index_keys()
         pipe = self._connection.pipeline()
-        pipe.delete(self._hashmap_name, *all_index_keys)
+        pipe.delete(self._hashmap_name, self._sort_index, *all_index_keys)
         pipe.execute()
 
+    def _find_raw_page(
+        self,
+        filters: Union[Dict[str, Any], T],
+        cursor: Optional[str],
+        skip: int,
+        limit: int | None,
+        desc: bool,
+    ) -> Tuple[List[Union[str, bytes]], Optional[str]]:
+        """Get the JSON strings of a page of the items with the given values in the given indexed fields
+
+        Args:
+            filters: the dict of key and value that should be matched
+            cursor: the cursor after which to start, or None to start at the top
+            skip: number of records to ignore after the cursor
+            limit: maximum number of records to return
+            desc: if the items should come in descending order
+
+        Returns:
+            the list of JSON strings of the items that match, and the cursor of the next page
+            or None if there are no more pages
+
+        Raises:
+            ValueError: the fields {non_indexed_fields} are not indexed
+            ValidationError: if filters does not satisfy the partial schema of the collection
+            InvalidRequestError: invalid cursor
+        """
+        parsed_filters = self._partial_schema.model_validate(filters)
+        filters = parsed_filters.model_dump(exclude_unset=True, exclude_defaults=True)
+
+        non_indexed_fields = set(filters) - self._index_field_set
+        if len(non_indexed_fields) > 0:
+            raise ValueError(f"the fields {non_indexed_fields} are not indexed")
+
+        index_keys = self._get_index_keys_from_dict(filters)
+        is_sorted = self._schema.__sort_field__ is not None
+        if len(index_keys) == 0 and not is_sorted:
+            if cursor is not None:
+                raise InvalidRequestError("cursors need filters or a sorted collection")
+            raw_map = self._connection.hgetall(self._hashmap_name)
+            raw_data = [raw_map[k] for k in sorted(raw_map, reverse=desc)]
+            return _paginate(raw_data, skip=skip, limit=limit), None
+
+        cursor_score, cursor_key = (
+            ("", "") if cursor is None else _decode_cursor(cursor)
+        )
+        raw_data, last_key, last_score = self._find_items(
+            keys=[
+                self._hashmap_name,
+                f"__tmp__{self._hashmap_name}_matches",
+                f"__tmp__{self._hashmap_name}_sorted_matches",
+                self._sort_index,
+                *index_keys,
+            ],
+            args=[
+                get_utc_now().timestamp(),
+                skip,
+                -1 if limit is None else limit,
+                int(desc),
+                int(is_sorted),
+                cursor_score,
+                cursor_key,
+            ],
+        )
+
+        next_cursor = None
+        if limit is not None and len(raw_data) == limit and last_key is not None:
+            next_cursor = _encode_cursor(last_score, last_key)
+        return raw_data, next_cursor
+
+    def _iter_raw_pages(
+        self,
+        filters: Union[Dict[str, Any], T],
+        raw_data: List[Union[str, bytes]],
+        cursor: Optional[str],
+        remaining: float,
+        desc: bool,
+        batch_size: int,
+    ) -> Iterator[T]:
+        """Iterates over the given page of JSON strings of items and the pages after it
+
+        Args:
+            filters: the dict of key and value that should be matched
+            raw_data: the JSON strings of the items in the current page
+            cursor: the cursor of the next page or None if there are no more pages
+            remaining: the maximum number of items to fetch after the current page
+            desc: if the items should come in descending order
+            batch_size: the number of items to fetch from redis at a time
+
+        Returns:
+            an iterator of the items
+
+        Raises:
+            ValidationError: item does not match the given schema
+        """
+        while True:
+            for item in raw_data:
+                yield self._schema.model_validate_json(item)
+
+            if cursor is None or remaining <= 0:
+                return
+
+            raw_data, cursor = self._find_raw_page(
+                filters,
+                cursor=cursor,
+                skip=0,
+                limit=int(min(batch_size, remaining)),
+                desc=desc,
+            )
+            remaining -= len(raw_data)
+
+    def _update_optimistically(
+        self,
+        key: Union[str, Tuple[Any, ...], Dict[str, Any]],
+        updates: Dict[str, Any],
+        ttl: _TTL_Type,
+        expected: Optional[Dict[str, Any]] = None,
+    ) -> T:
+        """Updates the item by reading, merging and writing it back if it was not changed in between
+
+        The hashmap is watched so that the write is aborted and retried
+        if any other client changes the hashmap after the item is read.
+
+        Args:
+            key: the unique key that identifies that item
+            updates: the validated partial updates
+            ttl: time to live for this item; _UNDEFINED means don't alter
+            expected: the JSON values of the fields that the stored item should have
+
+        Returns:
+            the item after updating
+
+        Raises:
+            ItemNotFound: '{key}' not found
+            ConflictError: '{key}' kept being changed concurrently
+            ConflictError: '{key}' does not have the expected values
+        """
+        redis_key = self._schema.construct_redis_key(key)
+
+        with self._connection.pipeline() as pipe:
+            for _ in range(_MAX_UPDATE_RETRIES):
+                try:
+                    pipe.watch(self._hashmap_name)
+                    data = pipe.hget(self._hashmap_name, redis_key)
+                    if data is None:
+                        raise ItemNotFoundError(f"'{key}' not found")
+
+                    old_item = self._schema.model_validate_json(data)
+                    if expected:
+                        old_values = old_item.model_dump(
+                            mode="json", include=set(expected)
+                        )
+                        if old_values != expected:
+                            raise ConflictError(
+                                f"'{key}' does not have the expected values"
+                            )
+
+                    new_props = _merge_patch(old_item.model_dump(), updates)
+                    updated_item = self._schema.model_validate(new_props)
+
+                    pipe.multi()
+
+                    # attempt cleanup of indexes
+                    self._cleanup_expired_indexes(pipe)
+
+                    # update record and indexes
+                    pipe.hset(
+                        self._hashmap_name, redis_key, updated_item.model_dump_json()
+                    )
+
+                    if ttl is None:
+                        pipe.hpersist(self._hashmap_name, redis_key)
+                    elif isinstance(ttl, (int, float)):
+                        pipe.hexpire(
+                            self._hashmap_name, timedelta(seconds=ttl), redis_key
+                        )
+
+                    self._update_indexes(
+                        pipe, original=old_item, updates=updates, ttl=ttl
+                    )
+                    pipe.execute()
+                    return updated_item
+                except WatchError:
+                    continue
+
+        raise ConflictError(f"'{key}' kept being changed concurrently")
+
     def _insert_indexes(
-        self, conn: Union[Pipeline, Redis], record: T, ttl: _TTL_Type
+        self, conn: Union[Pipeline, Redis], records: Sequence[T], ttl: _TTL_Type
     ) -> None:
-        """Inserts the index entries for the given record
+        """Inserts the index entries for the given records
+
+        The entries of all records in the same index are added in one command
 
         Args:
             conn: the redis connection or pipeline
-            record: the item whose indexes are to be inserted
-            ttl: time to live for this item
+            records: the items whose indexes are to be inserted
+            ttl: time to live for these items
         """
-        record_key = _get_redis_key(self._schema, record)
-        idx_keys = self._get_index_keys(record)
         effective_ttl = ttl
         if effective_ttl is _UNDEFINED:
             effective_ttl = self._default_ttl
@@ -475,22 +1409,32 @@ class Collection(Generic[T]):
         if isinstance(effective_ttl, (int, float)):
             expiry_timestamp = get_relative_time(seconds=effective_ttl).timestamp()
 
-        for idx_key in idx_keys:
-            conn.zadd(idx_key, {record_key: expiry_timestamp})
+        index_members: Dict[str, Dict[str, float]] = {}
+        for record in records:
+            record_key = _get_redis_key(self._schema, record)
+            for idx_key in self._get_index_keys(record):
+                index_members.setdefault(idx_key, {})[record_key] = expiry_timestamp
+
+        for idx_key, members in index_members.items():
+            conn.zadd(idx_key, members)
 
     def _delete_indexes(self, conn: Union[Pipeline, Redis], records: List[T]):
         """Deletes the index entries associated with the given records
 
+        The entries of all records in the same index are removed in one command
+
         Args:
             conn: the redis connection or pipeline
             records: the items whose index entries are to be removed
         """
+        index_members: Dict[str, List[str]] = {}
         for item in records:
-            idx_keys = self._get_index_keys(item)
             key = _get_redis_key(self._schema, item)
+            for idx_key in self._get_index_keys(item):
+                index_members.setdefault(idx_key, []).append(key)
 
-            for idx_key in idx_keys:
-                conn.zrem(idx_key, key)
+        for idx_key, members in index_members.items():
+            conn.zrem(idx_key, *members)
 
     def _update_indexes(
         self,
@@ -536,6 +1480,33 @@ class Collection(Generic[T]):
                 conn.zrem(old_idx_key, record_key)
                 conn.zadd(new_idx_key, {record_key: new_expiry})
 
+    def _get_index_moves(
+        self, data: Union[str, bytes], updates: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Gets the moves of the index entries of the stored item for the given updates
+
+        Args:
+            data: the JSON of the stored item
+            updates: the validated partial updates
+
+        Returns:
+            the list of the updated index fields each with 'key' (the JSON-encoded field name),
+            'value' (the JSON value of the field in the stored item), 'old_key' (the index key
+            of the stored item) and 'new_key' (the index key of the updated item)
+        """
+        old_item = self._schema.model_validate_json(data)
+        old_values = json.loads(data)
+        return [
+            {
+                "key": self._index_json_keys[field],
+                "value": old_values.get(field),
+                "old_key": self._get_index_key(field, getattr(old_item, field)),
+                "new_key": self._get_index_key(field, value),
+            }
+            for field, value in updates.items()
+            if field in self._index_field_set
+        ]
+
     def _get_all_index_keys(self) -> List[str]:
         """Gets all the index keys for the collection
 
@@ -556,6 +1527,18 @@ class Collection(Generic[T]):
 
         return all_index_keys
 
+    def _get_index_key(self, field: str, value: Any) -> str:
+        """Gets the key of the index of the given field for the given value
+
+        Args:
+            field: the indexed field
+            value: the value of the field
+
+        Returns:
+            the redis set key of the index
+        """
+        return f"{self._index_prefix}{_IDX_SEPARATOR}{field}{_IDX_SEPARATOR}{value}"
+
     def _get_index_keys(self, item: T) -> List[str]:
         """Gets the keys for the index of this schema
 
@@ -571,10 +1554,7 @@ class Collection(Generic[T]):
         index_keys = []
         for field in self._index_fields:
             try:
-                value = getattr(item, field)
-                index_keys.append(
-                    f"{self._index_prefix}{_IDX_SEPARATOR}{field}{_IDX_SEPARATOR}{value}"
-                )
+                index_keys.append(self._get_index_key(field, getattr(item, field)))
             except AttributeError as exp:
                 raise AttributeError(f"some index key fields were not set: {exp}")
 
@@ -592,9 +1572,7 @@ class Collection(Generic[T]):
         index_keys = []
         for field in self._index_fields:
             with suppress(KeyError):
-                index_keys.append(
-                    f"{self._index_prefix}{_IDX_SEPARATOR}{field}{_IDX_SEPARATOR}{item[field]}"
-                )
+                index_keys.append(self._get_index_key(field, item[field]))
 
         return index_keys
 
@@ -613,8 +1591,31 @@ class Collection(Generic[T]):
             for idx_key in idx_keys:
                 conn.zremrangebyscore(idx_key, 0, current_timestamp)
 
+            if self._schema.__sort_field__ is not None:
+                self._prune_expired_sort_keys()
+
             self.__last_cleanup_timestamp = current_timestamp
 
+    def _prune_expired_sort_keys(self):
+        """Removes the keys of expired items from the sort index
+
+        The sort index is scanned in batches so that redis is not blocked
+        for the whole of a large index at once.
+        """
+        cursor = 0
+        while True:
+            cursor, entries = self._connection.zscan(
+                self._sort_index, cursor, count=_PRUNE_BATCH_SIZE
+            )
+            if entries:
+                self._prune_sort_index(
+                    keys=[self._hashmap_name, self._sort_index],
+                    args=[key for key, _ in entries],
+                )
+
+            if cursor == 0:
+                break
+
 
 def _get_redis_key(schema: Type[Schema], item: Any) -> str:
     """Gets the redis key for this item
@@ -651,6 +1652,92 @@ def _get_index_prop(index_key: str) -> str:
     return index_key.rsplit(_IDX_SEPARATOR, 1)[0]
 
 
+def _merge_patch(original: Dict[str, Any], updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Merges the updates into the original dict, merging nested dicts key by key
+
+    Args:
+        original: the original dict
+        updates: the updates to merge into it
+
+    Returns:
+        a new dict with the updates merged in
+    """
+    merged = {**original}
+    for field, value in updates.items():
+        original_value = merged.get(field)
+        if isinstance(original_value, dict) and isinstance(value, dict):
+            value = _merge_patch(original_value, value)
+        merged[field] = value
+    return merged
+
+
+def _get_sort_score(value: Any) -> float:
+    """Gets the score in the sort index for the value of the sort field of an item
+
+    Args:
+        value: the value of the sort field; a number, a datetime or an ISO datetime string
+
+    Returns:
+        the score of the item in the sort index; 0 if the value is not set
+    """
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def _encode_cursor(score: Union[str, bytes], key: Union[str, bytes]) -> str:
+    """Encodes the position of an item in a sorted set into an opaque cursor
+
+    Args:
+        score: the score of the item as returned by redis
+        key: the key of the item as returned by redis
+
+    Returns:
+        the URL-safe cursor string
+    """
+    raw_cursor = json.dumps([_to_bytes(score).decode(), _to_bytes(key).decode()])
+    return base64.urlsafe_b64encode(raw_cursor.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decodes the cursor into the position of an item in a sorted set
+
+    Args:
+        cursor: the cursor as returned by _encode_cursor
+
+    Returns:
+        the score and the key of the item
+
+    Raises:
+        InvalidRequestError: invalid cursor
+    """
+    try:
+        score, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        float(score)
+    except (ValueError, TypeError) as exp:
+        raise InvalidRequestError("invalid cursor") from exp
+
+    return str(score), str(key)
+
+
+def _to_bytes(value: Union[str, bytes]) -> bytes:
+    """Converts the value returned by redis into bytes
+
+    Args:
+        value: the value as returned by redis, depending on decode_responses
+
+    Returns:
+        the value as bytes
+    """
+    if isinstance(value, str):
+        return value.encode()
+    return value
+
+
 def _paginate(
     data: List[_AnyT], skip: int = 0, limit: Optional[int] = None
 ) -> List[_AnyT]:
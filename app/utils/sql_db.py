@@ -12,33 +12,96 @@
 #
 """Module the SQL store"""
 
-from typing import Iterable, List, Type
+import os
+import threading
+from typing import Dict, Iterable, List, Set, Tuple, Type
 
-from sqlalchemy import Engine
+from sqlalchemy import Engine, make_url
 from sqlmodel import SQLModel, col, create_engine, desc
 
 from .exc import InvalidRequestError
 
+# the sql engines shared in this process, by database URL,
+# together with the names of the tables already created in them
+_SQL_ENGINE_REGISTRY: Dict[str, Tuple[Engine, Set[str]]] = {}
+_SQL_ENGINE_REGISTRY_LOCK = threading.Lock()
+
 
 def get_sql_engine(
-    url: str, models: List[Type[SQLModel]] = (), checkfirst: bool = True
+    url: str,
+    models: List[Type[SQLModel]] = (),
+    checkfirst: bool = True,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_recycle: int = 1800,
 ) -> Engine:
     """Gets the sql engine for the given url and models
 
+    The engine, together with its connection pool, is created only once per process
+    for each URL. The tables of the models are created only the first time
+    the models are used with that URL. Use create_sql_tables() to create them anew.
+
     Args:
         url: the database URL for the store
         models: the models that are in that engine
         checkfirst: Defaults to True, don't issue CREATEs for tables already present in the target database
+        pool_size: the number of connections to keep open in the pool; ignored for SQLite
+        max_overflow: the number of connections to open beyond the pool_size; ignored for SQLite
+        pool_recycle: the number of seconds after which connections are replaced; ignored for SQLite
 
     Returns:
         the SQLStore associated with the given URL
     """
     tables = [v.__table__ for v in models if hasattr(v, "__table__")]
-    engine = create_engine(url)
-    SQLModel.metadata.create_all(engine, tables=tables, checkfirst=checkfirst)
+
+    with _SQL_ENGINE_REGISTRY_LOCK:
+        try:
+            engine, created_tables = _SQL_ENGINE_REGISTRY[url]
+        except KeyError:
+            engine = _create_sql_engine(
+                url,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_recycle=pool_recycle,
+            )
+            created_tables = set()
+            _SQL_ENGINE_REGISTRY[url] = (engine, created_tables)
+
+        new_tables = [v for v in tables if v.name not in created_tables]
+        if len(new_tables) > 0:
+            SQLModel.metadata.create_all(
+                engine, tables=new_tables, checkfirst=checkfirst
+            )
+            created_tables.update(v.name for v in new_tables)
+
     return engine
 
 
+def create_sql_tables(
+    engine: Engine, models: List[Type[SQLModel]] = (), checkfirst: bool = True
+):
+    """Creates the tables of the given models in the database of the engine
+
+    Args:
+        engine: the sql engine of the database
+        models: the models whose tables are to be created
+        checkfirst: Defaults to True, don't issue CREATEs for tables already present in the target database
+    """
+    tables = [v.__table__ for v in models if hasattr(v, "__table__")]
+    SQLModel.metadata.create_all(engine, tables=tables, checkfirst=checkfirst)
+
+
+def dispose_sql_engines():
+    """Disposes all the sql engines shared in this process, closing their pooled connections
+
+    The next call to get_sql_engine() creates a new engine and its tables
+    """
+    with _SQL_ENGINE_REGISTRY_LOCK:
+        for engine, _ in _SQL_ENGINE_REGISTRY.values():
+            engine.dispose()
+        _SQL_ENGINE_REGISTRY.clear()
+
+
 def convert_http_sort_to_db_sort(model: Type[SQLModel], http_sort: Iterable[str] = ()):
     """Coverts an HTTP sort list comprising strings into a sort tuple for the database
 
@@ -79,3 +142,44 @@ def _get_field(model: Type[SQLModel], field: str):
         return getattr(model, field)
     except AttributeError as exp:
         raise InvalidRequestError(f"field {field} does not exist") from exp
+
+
+def _create_sql_engine(
+    url: str, pool_size: int, max_overflow: int, pool_recycle: int
+) -> Engine:
+    """Creates a new sql engine with a connection pool suited to its database
+
+    Args:
+        url: the database URL
+        pool_size: the number of connections to keep open in the pool
+        max_overflow: the number of connections to open beyond the pool_size
+        pool_recycle: the number of seconds after which connections are replaced
+
+    Returns:
+        the new sql engine
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        # sqlalchemy picks the pool for sqlite itself i.e. a singleton for in-memory databases.
+        # The connections are shared by the threads of the API server.
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    return create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=True,
+    )
+
+
+def _reset_sql_engines_after_fork():
+    """Empties the connection pools of the shared sql engines in a forked child process
+
+    The connections of the parent process are left open for the parent to use.
+    """
+    for engine, _ in _SQL_ENGINE_REGISTRY.values():
+        engine.dispose(close=False)
+
+
+# forked processes e.g. rq work horses should not reuse the pooled connections of their parent
+os.register_at_fork(after_in_child=_reset_sql_engines_after_fork)
@@ -0,0 +1,110 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2026
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Benchmarks the shared SQL engine of the bookings service
+
+It compares creating a new engine (and its tables) on every call, as was done
+before the engine was shared, against getting the shared engine,
+with and without a one-row query of the bookings.
+
+It runs in the test environment, so that it needs no configured backend.
+Run it from the root of the repository:
+
+    python -m benchmarks.bench_sql_engine --iterations 200
+"""
+import argparse
+import tempfile
+import timeit
+from pathlib import Path
+from typing import Callable, Dict
+
+from app.tests.utils.env import setup_test_env
+
+setup_test_env()
+
+from sqlmodel import Session, SQLModel, create_engine, select  # noqa: E402
+
+from app.services.booking.models import Booking, User  # noqa: E402
+from app.services.booking.store import (  # noqa: E402
+    get_bookings_sql_engine,
+    init_bookings_sql_engine,
+)
+from app.utils.sql_db import dispose_sql_engines  # noqa: E402
+
+_TABLES = [Booking.__table__, User.__table__]
+
+
+def _get_new_engine(url: str):
+    """Creates a new engine and its tables, as was done on every call before"""
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine, tables=_TABLES)
+    return engine
+
+
+def _query_one_booking(engine):
+    """Queries a single booking from the database"""
+    with Session(engine) as session:
+        return session.exec(select(Booking).limit(1)).first()
+
+
+def _get_cases(url: str) -> Dict[str, Callable[[], None]]:
+    """Gets the benchmark cases for the given database URL"""
+
+    def new_engine():
+        _get_new_engine(url).dispose()
+
+    def new_engine_and_query():
+        engine = _get_new_engine(url)
+        _query_one_booking(engine)
+        engine.dispose()
+
+    def shared_engine():
+        get_bookings_sql_engine(url)
+
+    def shared_engine_and_query():
+        _query_one_booking(get_bookings_sql_engine(url))
+
+    return {
+        "new engine": new_engine,
+        "shared engine": shared_engine,
+        "new engine + query": new_engine_and_query,
+        "shared engine + query": shared_engine_and_query,
+    }
+
+
+def main(iterations: int, repeat: int):
+    """Runs the benchmark and prints the best time per call of each case
+
+    Args:
+        iterations: the number of calls in each timed run
+        repeat: the number of timed runs of each case
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = f"sqlite:///{Path(tmp_dir) / 'bookings.db'}"
+        init_bookings_sql_engine(url)
+
+        try:
+            for name, case in _get_cases(url).items():
+                case()  # warm up
+                timings = timeit.repeat(case, number=iterations, repeat=repeat)
+                best_us = min(timings) / iterations * 1e6
+                print(f"{name:<24}{best_us:>12.1f} us/call")
+        finally:
+            dispose_sql_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(iterations=args.iterations, repeat=args.repeat)
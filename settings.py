@@ -144,6 +144,8 @@ MSS_DEVICE_EVENTS_ENDPOINT: URL = config(
 )
 MSS_CONNECTION_TIMEOUT = config("MSS_CONNECTION_TIMEOUT", cast=float, default=5)
 MSS_CONNECTION_MAX_ATTEMPTS = config("MSS_CONNECTION_MAX_ATTEMPTS", cast=int, default=5)
+# the maximum number of events sent to MSS that can wait for their responses at the same time
+MSS_MAX_IN_FLIGHT_EVENTS = config("MSS_MAX_IN_FLIGHT_EVENTS", cast=int, default=16)
 
 BCC_MACHINE_ROOT_URL = config(
     "BCC_MACHINE_ROOT_URL", cast=URL, default="http://localhost:8000"
@@ -179,6 +181,27 @@ JOBS_STORE_CLEAN_INTERVAL = config(
     "JOBS_STORE_CLEAN_INTERVAL", cast=float, default=3600 * 5
 )
 
+# approximate maximum number of job status events kept in the job events stream
+# default: 100000
+JOB_EVENTS_STREAM_MAXLEN = config("JOB_EVENTS_STREAM_MAXLEN", cast=int, default=100000)
+
+# seconds without job events after which a keep-alive is sent to subscribers; default: 15
+JOB_EVENTS_HEARTBEAT_INTERVAL = config(
+    "JOB_EVENTS_HEARTBEAT_INTERVAL", cast=float, default=15
+)
+
+# seconds after which the lock held while releasing preprocessed jobs for execution
+# in the order they were submitted expires; default: 60
+JOB_ADMISSIONS_LOCK_TIMEOUT = config(
+    "JOB_ADMISSIONS_LOCK_TIMEOUT", cast=float, default=60
+)
+
+# seconds after its submission after which a job that was never enqueued for preprocessing
+# e.g. due to a crash, no longer holds back the jobs submitted after it; default: 300
+JOB_ADMISSIONS_ENQUEUE_TIMEOUT = config(
+    "JOB_ADMISSIONS_ENQUEUE_TIMEOUT", cast=float, default=300
+)
+
 PRIVATE_KEY_FILE = config(
     "PRIVATE_KEY_FILE", cast=Path, default=_ROOT_PATH / "private-bcc-key.pem"
 ).resolve()
@@ -211,6 +234,30 @@ QUANTIFY_METADATA_FILE = config(
     "QUANTIFY_METADATA_FILE", cast=Path, default=_ROOT_PATH / "quantify-metadata.yml"
 )
 
+# The number of compiled quantify schedules to keep in memory and on disk respectively;
+# default: 64 in memory, 512 on disk
+COMPILED_SCHEDULE_CACHE_SIZE = max(
+    0, config("COMPILED_SCHEDULE_CACHE_SIZE", cast=int, default=64)
+)
+COMPILED_SCHEDULE_CACHE_DISK_SIZE = max(
+    0, config("COMPILED_SCHEDULE_CACHE_DISK_SIZE", cast=int, default=512)
+)
+COMPILED_SCHEDULE_CACHE_DIR = EXECUTOR_DATA_DIR / "compiled_schedules"
+
+# If set to true, the quantify executor compiles the next experiment of a job
+# while the current one is being measured; default: True
+QUANTIFY_PIPELINED_EXECUTION = config(
+    "QUANTIFY_PIPELINED_EXECUTION", cast=bool, default=True
+)
+
+# The number of processes translating the experiments of a job in parallel during preprocessing;
+# 0 or 1 translates them one after the other in the worker; default: 0
+PREPROCESSING_POOL_SIZE = max(0, config("PREPROCESSING_POOL_SIZE", cast=int, default=0))
+
+# The seconds after which the lock on the quantum executor, held while executing jobs
+# or recalibrating, expires if its holder stops renewing it e.g. after a crash; default: 30
+EXECUTOR_LOCK_TTL = config("EXECUTOR_LOCK_TTL", cast=float, default=30)
+
 # If set to true, it should write currents to redis and return them to previous values during circuit execution
 SHOULD_RESTORE_CURRENTS = config("SHOULD_RESTORE_CURRENTS", cast=bool, default=False)
 ARE_CLUSTERS_RESETTABLE = config("ARE_CLUSTERS_RESETTABLE", cast=bool, default=False)
@@ -272,6 +319,15 @@ IS_ASYNC = config("IS_ASYNC", cast=bool, default="True")
 # default: "sqlite:///booking_db.db"
 BOOKING_DB_URL = config("BOOKING_DB_URL", default="sqlite:///booking_db.db")
 
+# default: 5
+BOOKING_DB_POOL_SIZE = config("BOOKING_DB_POOL_SIZE", cast=int, default=5)
+
+# default: 10
+BOOKING_DB_MAX_OVERFLOW = config("BOOKING_DB_MAX_OVERFLOW", cast=int, default=10)
+
+# default: 1800 (seconds)
+BOOKING_DB_POOL_RECYCLE = config("BOOKING_DB_POOL_RECYCLE", cast=int, default=1800)
+
 # default: "redis://localhost:6379/0"
 _REDIS_URL = f"{REDIS_SCHEME}://{REDIS_USER or ''}:{REDIS_PASSWORD or ''}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
 RQ_REDIS_URL = config("RQ_REDIS_URL", default=_REDIS_URL)
@@ -200,6 +200,12 @@ DEP_GROUP="${EXECUTOR_TYPE%%_*}";
 PORT_NUMBER="${BCC_PORT:-8000}"
 should_be_int "$PORT_NUMBER" "Config Error. Use BCC_PORT=<int> in the .env file.";
 
+PREPROCESSING_WORKERS="${PREPROCESSING_WORKERS:-1}"
+should_be_int "$PREPROCESSING_WORKERS" "Config Error. Use PREPROCESSING_WORKERS=<int> in the .env file.";
+
+POSTPROCESSING_WORKERS="${POSTPROCESSING_WORKERS:-1}"
+should_be_int "$POSTPROCESSING_WORKERS" "Config Error. Use POSTPROCESSING_WORKERS=<int> in the .env file.";
+
 REDIS_HOST="${REDIS_HOST:-localhost}"
 
 REDIS_PORT="${REDIS_PORT:-6379}"
@@ -227,6 +233,8 @@ echo "Backend '$DEFAULT_PREFIX' starting on $BCC_MACHINE_ROOT_URL...";
 echo "Port: $PORT_NUMBER";
 echo "MSS: $MSS_MACHINE_ROOT_URL";
 echo "Storage: $STORAGE_ROOT";
+echo "Preprocessing workers: $PREPROCESSING_WORKERS";
+echo "Postprocessing workers: $POSTPROCESSING_WORKERS";
 echo "Redis host: redis://******@$REDIS_HOST:$REDIS_PORT/$REDIS_DB";
 echo
 echo
@@ -255,17 +263,24 @@ fi
 set -e # exit if any step fails
 
 WORKER_FLAG="";
+# workers that use the executor run jobs without forking so that the executor
+# is kept alive across jobs. It only holds connections to the hardware while
+# executing a job under the executor lease
+EXECUTOR_WORKER_CLASS="rq.SimpleWorker";
 if [[ "${DEBUG:-}" = "true" ]]; then
   WORKER_FLAG="-w app.utils.logging.LoggingRqWorker";
+  EXECUTOR_WORKER_CLASS="app.utils.logging.LoggingRqSimpleWorker";
 fi
 
 # Worker processes
+# The execution and recalibration queues use the quantum hardware so they have one worker each.
+# Preprocessing and postprocessing do not, so they are run by pools of workers.
 rq worker -u "$REDIS_URL" "$WORKER_FLAG" "${DEFAULT_PREFIX}_general" &
-rq worker -u "$REDIS_URL" "$WORKER_FLAG" "${DEFAULT_PREFIX}_preprocessing" &
-rq worker -u "$REDIS_URL" "$WORKER_FLAG" "${DEFAULT_PREFIX}_normal_execution" &
-rq worker -u "$REDIS_URL" "$WORKER_FLAG" "${DEFAULT_PREFIX}_booked_execution" &
-rq worker -u "$REDIS_URL" "$WORKER_FLAG" "${DEFAULT_PREFIX}_postprocessing" &
-rq worker -u "$REDIS_URL" "$WORKER_FLAG" "${DEFAULT_PREFIX}_recalibration" &
+rq worker-pool -u "$REDIS_URL" -n "$PREPROCESSING_WORKERS" -w "$EXECUTOR_WORKER_CLASS" "${DEFAULT_PREFIX}_preprocessing" &
+rq worker -u "$REDIS_URL" -w "$EXECUTOR_WORKER_CLASS" "${DEFAULT_PREFIX}_normal_execution" &
+rq worker -u "$REDIS_URL" -w "$EXECUTOR_WORKER_CLASS" "${DEFAULT_PREFIX}_booked_execution" &
+rq worker-pool -u "$REDIS_URL" -n "$POSTPROCESSING_WORKERS" "$WORKER_FLAG" "${DEFAULT_PREFIX}_postprocessing" &
+rq worker -u "$REDIS_URL" -w "$EXECUTOR_WORKER_CLASS" "${DEFAULT_PREFIX}_recalibration" &
 
 # REST-API
 extra_params=$([[ "$IS_SYSTEMD" = "true" ]] && echo "--proxy-headers" || echo "--reload")